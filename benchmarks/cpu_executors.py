@@ -0,0 +1,140 @@
+"""
+CPU-Bound Activity Benchmarks
+Runs a CPU-bound activity on the event loop, in a thread pool and in a
+process pool, and measures throughput and how long the event loop stalls
+
+The event loop is what polls for tasks and sends heartbeats, so its stall
+(the longest delay of a 10ms ticker while the activities run) is how long a
+worker would stop responding. Calls are dispatched the way the worker runs
+sync activities (run_in_executor). The process pool runs twice: with the
+document body pickled to the pool process, and handed over through shared
+memory as SharedBufferInterceptor does.
+
+Usage (from the repository root):
+    python benchmarks/cpu_executors.py
+    python benchmarks/cpu_executors.py --tasks 32 --document-kib 4096 --workers 4
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loan_common.process_pool import call_with_shared_buffers, shared_buffer
+
+TICK_SECONDS = 0.01
+
+
+def score_document(body) -> int:
+    """
+    Stand-in for document parsing or risk scoring: a pure-Python pass over
+    every byte, so it holds the GIL throughout
+    """
+    score = 0
+    for byte in body:
+        score = (score * 31 + byte) & 0xFFFFFFFF
+    return score
+
+
+async def on_event_loop(body: bytes) -> int:
+    return score_document(body)
+
+
+async def measure(name: str, tasks: int, run) -> dict:
+    """
+    Run tasks calls of run() concurrently while a ticker records how late
+    the event loop wakes it up
+    """
+    stalls = []
+    done = asyncio.Event()
+
+    async def tick():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            stalls.append(time.perf_counter() - before - TICK_SECONDS)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    scores = await asyncio.gather(*(run() for _ in range(tasks)))
+    seconds = time.perf_counter() - started
+    done.set()
+    await ticker
+    return {
+        "mode": name,
+        "seconds": round(seconds, 3),
+        "tasks_per_sec": round(tasks / seconds, 2),
+        "max_stall_ms": round(max(stalls, default=seconds) * 1000, 1),
+        "mean_stall_ms": round(sum(stalls) / len(stalls) * 1000 if stalls else seconds * 1000, 1),
+        # Every call scores the same document, so every mode must agree
+        "score": scores[0] if len(set(scores)) == 1 else None,
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> list[dict]:
+    loop = asyncio.get_running_loop()
+    body = bytes(range(256)) * (args.document_kib * 4)
+    results = [await measure("event loop", args.tasks, lambda: on_event_loop(body))]
+
+    with concurrent.futures.ThreadPoolExecutor(args.workers) as threads:
+        results.append(await measure(
+            "thread pool", args.tasks, lambda: loop.run_in_executor(threads, score_document, body)
+        ))
+
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=context) as processes:
+        # Start every process before measuring
+        await asyncio.gather(*(loop.run_in_executor(processes, time.sleep, 0.2) for _ in range(args.workers)))
+        results.append(await measure(
+            "process pool (pickled)", args.tasks,
+            lambda: loop.run_in_executor(processes, score_document, body),
+        ))
+        with shared_buffer(body) as shared:
+            results.append(await measure(
+                "process pool (shared memory)", args.tasks,
+                lambda: loop.run_in_executor(
+                    processes, functools.partial(call_with_shared_buffers, score_document), shared
+                ),
+            ))
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare executors for a CPU-bound activity")
+    parser.add_argument("--tasks", type=int, default=16, help="Activities to run (default 16)")
+    parser.add_argument("--document-kib", type=int, default=1024, help="Document size in KiB (default 1024)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Threads or processes in each pool (default: CPU count)",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"🧮 {args.tasks} activities over {args.document_kib}KiB documents, {args.workers} workers")
+    results = asyncio.run(benchmark(args))
+    for result in results:
+        print(
+            f"   {result['mode']:<30} {result['seconds']:>7.2f}s  {result['tasks_per_sec']:>7.2f}/s  "
+            f"loop stall max {result['max_stall_ms']:>8.1f}ms, mean {result['mean_stall_ms']:>7.1f}ms"
+        )
+    scores = {result["score"] for result in results}
+    if None in scores or len(scores) != 1:
+        print("❌ Modes computed different scores")
+        sys.exit(1)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
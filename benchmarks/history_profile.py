@@ -0,0 +1,286 @@
+"""
+Workflow History Profiler
+Reports what loan workflow histories are made of and how long they take to replay
+
+Works offline on exported histories: JSON files as written by
+`temporal workflow show --output json` or WorkflowHistory.to_json(). For
+each history it counts events by type, measures the payload bytes of every
+activity input and result (and of workflow, child workflow, signal, update
+and local activity payloads), lists the largest payloads and times a
+deterministic replay with the SDK Replayer. A summary across all histories
+follows.
+
+Usage (from the repository root):
+    python benchmarks/history_profile.py --app cursor_made histories/
+    python benchmarks/history_profile.py --app loanAppMVP --top 20 --json profile.json h1.json h2.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Optional
+
+from temporalio.api.enums.v1 import EventType
+from temporalio.client import WorkflowHistory
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ["loanAppMVP", "cursor_made"]
+
+sys.path.insert(0, REPO_ROOT)
+from loan_common.bulk_submit import LatencyStats
+from loan_common.data_converter import add_data_converter_arguments, loan_data_converter
+
+# Event attributes carrying payloads, mapped to how they are labelled:
+# (field holding the Payloads, label prefix)
+PAYLOAD_FIELDS = {
+    "workflow_execution_started_event_attributes": ("input", "workflow input"),
+    "workflow_execution_completed_event_attributes": ("result", "workflow result"),
+    "workflow_execution_continued_as_new_event_attributes": ("input", "continue-as-new input"),
+    "workflow_execution_signaled_event_attributes": ("input", "signal"),
+    "start_child_workflow_execution_initiated_event_attributes": ("input", "child input"),
+    "child_workflow_execution_completed_event_attributes": ("result", "child result"),
+}
+
+
+@dataclass
+class PayloadRecord:
+    workflow_id: str
+    event_id: int
+    label: str
+    size: int
+
+
+@dataclass
+class HistoryProfile:
+    workflow_id: str
+    workflow_type: str
+    events: int = 0
+    event_types: Counter = field(default_factory=Counter)
+    payload_bytes: int = 0
+    # label (e.g. "activity input: credit_check") -> total bytes
+    payload_bytes_by_label: Counter = field(default_factory=Counter)
+    payloads: list[PayloadRecord] = field(default_factory=list)
+    replay_ms: float = 0.0
+    replay_error: Optional[str] = None
+
+    def add_payloads(self, event_id: int, label: str, payloads) -> None:
+        size = sum(payload.ByteSize() for payload in payloads)
+        if not size:
+            return
+        self.payload_bytes += size
+        self.payload_bytes_by_label[label] += size
+        self.payloads.append(PayloadRecord(self.workflow_id, event_id, label, size))
+
+
+def profile_history(history: WorkflowHistory) -> HistoryProfile:
+    """
+    Event counts and payload sizes of one history
+    """
+    profile = HistoryProfile(history.workflow_id, workflow_type="")
+    activity_types: dict[int, str] = {}
+    for event in history.events:
+        profile.events += 1
+        profile.event_types[EventType.Name(event.event_type).removeprefix("EVENT_TYPE_")] += 1
+        attributes_name = event.WhichOneof("attributes")
+        if attributes_name is None:
+            continue
+        attributes = getattr(event, attributes_name)
+        if attributes_name == "workflow_execution_started_event_attributes":
+            profile.workflow_type = attributes.workflow_type.name
+        if attributes_name in PAYLOAD_FIELDS:
+            payload_field, label = PAYLOAD_FIELDS[attributes_name]
+            profile.add_payloads(event.event_id, label, getattr(attributes, payload_field).payloads)
+        elif attributes_name == "activity_task_scheduled_event_attributes":
+            activity_type = attributes.activity_type.name
+            activity_types[event.event_id] = activity_type
+            profile.add_payloads(event.event_id, f"activity input: {activity_type}", attributes.input.payloads)
+        elif attributes_name == "activity_task_completed_event_attributes":
+            activity_type = activity_types.get(attributes.scheduled_event_id, "?")
+            profile.add_payloads(event.event_id, f"activity result: {activity_type}", attributes.result.payloads)
+        elif attributes_name == "marker_recorded_event_attributes":
+            # Local activity results are recorded as markers
+            for name, payloads in attributes.details.items():
+                profile.add_payloads(event.event_id, f"marker {attributes.marker_name}: {name}", payloads.payloads)
+        elif attributes_name == "workflow_execution_update_accepted_event_attributes":
+            request = attributes.accepted_request
+            profile.add_payloads(event.event_id, f"update: {request.input.name}", request.input.args.payloads)
+    return profile
+
+
+def load_histories(paths: Iterable[str]) -> list[WorkflowHistory]:
+    """
+    Read every *.json history under the given files and directories; the
+    file name (without .json) is used as the workflow id
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")
+            )
+        else:
+            files.append(path)
+    histories = []
+    for file in files:
+        with open(file) as f:
+            histories.append(WorkflowHistory.from_json(os.path.basename(file)[:-len(".json")], f.read()))
+    return histories
+
+
+async def time_replays(
+    histories: list[WorkflowHistory], profiles: list[HistoryProfile], args: argparse.Namespace
+) -> None:
+    """
+    Replay every history with the app's workflows, recording each replay's
+    duration and failure (e.g. nondeterminism) on its profile
+    """
+    sys.path.insert(0, os.path.join(REPO_ROOT, args.app))
+    from temporalio.worker import Replayer
+
+    from loan_common.portfolio import PortfolioWorkflow
+
+    import activities
+    import workflow
+
+    replayer = Replayer(
+        workflows=[workflow.LoanApplicationWorkflow, PortfolioWorkflow],
+        data_converter=loan_data_converter(args, activities.PAYLOAD_DATACLASSES),
+    )
+    started_at: list[float] = []
+
+    async def feed() -> AsyncIterator[WorkflowHistory]:
+        for history in histories:
+            started_at.append(time.perf_counter())
+            yield history
+
+    async with replayer.workflow_replay_iterator(feed()) as results:
+        index = 0
+        async for result in results:
+            profile = profiles[index]
+            profile.replay_ms = (time.perf_counter() - started_at[index]) * 1000
+            if result.replay_failure is not None:
+                profile.replay_error = str(result.replay_failure)
+            index += 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    return LatencyStats(list(values)).percentile(pct)
+
+
+def summarize(profiles: list[HistoryProfile], top: int) -> dict:
+    event_types: Counter = Counter()
+    payload_bytes_by_label: Counter = Counter()
+    for profile in profiles:
+        event_types.update(profile.event_types)
+        payload_bytes_by_label.update(profile.payload_bytes_by_label)
+    largest = sorted(
+        (record for profile in profiles for record in profile.payloads),
+        key=lambda record: record.size,
+        reverse=True,
+    )[:top]
+    count = len(profiles) or 1
+    replayed = [profile.replay_ms for profile in profiles if profile.replay_error is None]
+    return {
+        "histories": len(profiles),
+        "events_mean": round(sum(p.events for p in profiles) / count, 1),
+        "events_p95": percentile([p.events for p in profiles], 95),
+        "payload_bytes_mean": round(sum(p.payload_bytes for p in profiles) / count),
+        "payload_bytes_p95": percentile([p.payload_bytes for p in profiles], 95),
+        "replay_ms_mean": round(sum(replayed) / len(replayed), 2) if replayed else 0.0,
+        "replay_ms_p95": round(percentile(replayed, 95), 2),
+        "replay_failures": sum(1 for p in profiles if p.replay_error is not None),
+        "event_types_mean": {
+            name: round(total / count, 2) for name, total in event_types.most_common()
+        },
+        "payload_bytes_by_label_mean": {
+            label: round(total / count) for label, total in payload_bytes_by_label.most_common()
+        },
+        "largest_payloads": [record.__dict__ for record in largest],
+    }
+
+
+def print_report(profiles: list[HistoryProfile], summary: dict) -> None:
+    print("=" * 70)
+    print("🔍 WORKFLOW HISTORY PROFILE")
+    print("=" * 70)
+    for profile in profiles:
+        replay = (
+            f"replay FAILED: {profile.replay_error}" if profile.replay_error
+            else f"replay {profile.replay_ms:.1f}ms"
+        )
+        print(
+            f"{profile.workflow_id} ({profile.workflow_type}): {profile.events} events, "
+            f"{profile.payload_bytes} payload bytes, {replay}"
+        )
+    print("-" * 70)
+    print(
+        f"{summary['histories']} histories: events mean={summary['events_mean']} "
+        f"p95={summary['events_p95']}, payload bytes mean={summary['payload_bytes_mean']} "
+        f"p95={summary['payload_bytes_p95']}"
+    )
+    print(
+        f"Replay: mean={summary['replay_ms_mean']}ms p95={summary['replay_ms_p95']}ms, "
+        f"failures={summary['replay_failures']}"
+    )
+    print("\n📊 Events per history (mean):")
+    for name, mean in summary["event_types_mean"].items():
+        print(f"   - {name}: {mean}")
+    print("\n📦 Payload bytes per history (mean):")
+    for label, mean in summary["payload_bytes_by_label_mean"].items():
+        print(f"   - {label}: {mean}")
+    print("\n🐘 Largest payloads:")
+    for record in summary["largest_payloads"]:
+        print(f"   - {record['size']} bytes  {record['label']}  ({record['workflow_id']} event {record['event_id']})")
+    print("=" * 70)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Profile exported loan workflow histories")
+    parser.add_argument("paths", nargs="+", help="History JSON files or directories of them")
+    parser.add_argument("--app", choices=APPS, required=True, help="App whose workflows wrote the histories")
+    parser.add_argument("--top", type=int, default=10, help="Largest payloads to list (default: 10)")
+    parser.add_argument("--no-replay", action="store_true", help="Only measure events and payloads")
+    parser.add_argument("--json", help="Also write the summary and per-history profiles to this file")
+    # Replaying needs the payload options the histories were written with
+    add_data_converter_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    histories = load_histories(args.paths)
+    if not histories:
+        print("No histories found")
+        return 1
+    profiles = [profile_history(history) for history in histories]
+    if not args.no_replay:
+        asyncio.run(time_replays(histories, profiles, args))
+    summary = summarize(profiles, args.top)
+    print_report(profiles, summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "summary": summary,
+                "histories": [
+                    {
+                        "workflow_id": p.workflow_id,
+                        "workflow_type": p.workflow_type,
+                        "events": p.events,
+                        "payload_bytes": p.payload_bytes,
+                        "payload_bytes_by_label": dict(p.payload_bytes_by_label),
+                        "replay_ms": round(p.replay_ms, 2),
+                        "replay_error": p.replay_error,
+                    }
+                    for p in profiles
+                ],
+            }, f, indent=2)
+        print(f"Profile written to {args.json}")
+    return 1 if summary["replay_failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
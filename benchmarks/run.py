@@ -0,0 +1,417 @@
+"""
+Loan Pipeline Benchmarks
+Drives N concurrent applications through each LoanApplicationWorkflow
+
+Each app is benchmarked in its own process against a local ephemeral
+Temporal server started by the SDK test environment, or against a running
+server given with --target, with the simulated provider latency scaled
+down (LOAN_LATENCY_SCALE). Results go to a JSON file and are compared with
+a stored baseline.
+
+The ephemeral server is the Temporal CLI's dev server, which the SDK
+downloads on first use. Without network access, pass --dev-server-path
+(a temporal CLI binary already on disk) or --target.
+
+Usage (from the repository root):
+    python benchmarks/run.py
+    python benchmarks/run.py --app cursor_made --applications 500 --concurrency 100
+    python benchmarks/run.py --update-baseline
+    python benchmarks/run.py --compare-execution
+    python benchmarks/run.py --target localhost:7233
+    python benchmarks/run.py --dev-server-path /usr/local/bin/temporal
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import uuid
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.join(REPO_ROOT, "benchmarks")
+APPS = ["loanAppMVP", "cursor_made"]
+
+# Metrics compared against the baseline, mapped to whether higher is better
+REGRESSION_METRICS = {
+    "workflows_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+    "history_events_per_workflow": False,
+}
+
+# Result key suffix for runs with every step as a regular activity
+REGULAR_SUFFIX = " (regular activities)"
+
+
+def applicant(index: int) -> dict:
+    """
+    A distinct synthetic applicant, so caches keyed by applicant or address
+    do not turn the benchmark into a cache benchmark
+    """
+    return {
+        "index": index,
+        "applicant_name": f"Bench Applicant {index}",
+        "property_address": f"{index} Benchmark Street, San Francisco, CA 94102",
+        "requested_loan_amount": 350000.00,
+    }
+
+
+async def history_stats(client, workflow_ids: list[str]) -> tuple[dict[str, dict], float]:
+    """
+    Per-activity latency (scheduled to completed, across retries) taken
+    from the server-side history of each workflow, and the average number
+    of history events per workflow. Local activities leave no scheduled
+    event and so have no stage latency.
+    """
+    from loan_common.bulk_submit import LatencyStats
+
+    stats: dict[str, LatencyStats] = defaultdict(LatencyStats)
+    events = 0
+    for workflow_id in workflow_ids:
+        history = await client.get_workflow_handle(workflow_id).fetch_history()
+        events += len(history.events)
+        scheduled = {}
+        for event in history.events:
+            if event.HasField("activity_task_scheduled_event_attributes"):
+                attributes = event.activity_task_scheduled_event_attributes
+                scheduled[event.event_id] = (attributes.activity_type.name, event.event_time.ToDatetime())
+            elif event.HasField("activity_task_completed_event_attributes"):
+                attributes = event.activity_task_completed_event_attributes
+                activity_type, scheduled_at = scheduled[attributes.scheduled_event_id]
+                elapsed = event.event_time.ToDatetime() - scheduled_at
+                stats[activity_type].add(elapsed.total_seconds())
+    stages = {
+        activity_type: {
+            "count": len(latency.samples),
+            "p50_ms": round(latency.percentile(50) * 1000, 2),
+            "p95_ms": round(latency.percentile(95) * 1000, 2),
+        }
+        for activity_type, latency in sorted(stats.items())
+    }
+    return stages, events / len(workflow_ids) if workflow_ids else 0.0
+
+
+def rss_mb(pid: int) -> float:
+    """
+    Current resident set size of pid, 0 if it has exited or /proc is missing
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class WorkerTreeRss:
+    """
+    Peak combined RSS of the worker process tree: this process (workers and
+    client) plus the process pools it started, sampled every interval
+    seconds while run() is running. The Temporal dev server is a plain
+    subprocess, not a multiprocessing child, and is not counted.
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self._interval = interval
+        self.peak_mb = 0.0
+
+    def sample(self) -> None:
+        pids = [os.getpid(), *(child.pid for child in multiprocessing.active_children())]
+        self.peak_mb = max(self.peak_mb, sum(rss_mb(pid) for pid in pids))
+
+    async def run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self._interval)
+
+
+async def start_environment(args: argparse.Namespace):
+    """
+    The server to benchmark against: the one at --target, or an ephemeral
+    dev server (from --dev-server-path if given, else downloaded)
+    """
+    from temporalio.client import Client
+    from temporalio.testing import WorkflowEnvironment
+
+    if args.target:
+        return WorkflowEnvironment.from_client(await Client.connect(args.target))
+    return await WorkflowEnvironment.start_local(dev_server_existing_path=args.dev_server_path)
+
+
+async def benchmark_app(args: argparse.Namespace) -> dict:
+    """
+    Run one app's benchmark in this process
+    """
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, os.path.join(REPO_ROOT, args.app))
+    from loan_common.bulk_submit import submit_bulk
+    from loan_common.task_routing import WORKFLOW_TASK_QUEUE, add_routing_arguments, build_workers
+
+    import activities
+    import run_workflow
+    import workflow
+
+    random.seed(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+
+    def build_start(record: dict):
+        start = run_workflow.build_start(record)
+        start.workflow_id = f"bench-{args.app}-{run_id}-{record['index']}"
+        return start
+
+    # Default routing: workflow pool plus one pool per latency class
+    routing_parser = argparse.ArgumentParser()
+    add_routing_arguments(routing_parser)
+    routing_args = routing_parser.parse_args([])
+
+    output = io.StringIO()
+    rss = WorkerTreeRss()
+    async with await start_environment(args) as env:
+        workers = build_workers(
+            env.client,
+            routing_args,
+            workflows=[workflow.LoanApplicationWorkflow],
+            router=activities.ACTIVITY_ROUTER,
+            workflow_worker_kwargs={},
+        )
+        async with contextlib.AsyncExitStack() as stack:
+            for _, worker in workers:
+                await stack.enter_async_context(worker)
+            sampling = asyncio.create_task(rss.run())
+            report = await submit_bulk(
+                env.client,
+                "LoanApplicationWorkflow",
+                WORKFLOW_TASK_QUEUE,
+                (applicant(index) for index in range(args.applications)),
+                build_start,
+                output,
+                max_in_flight=args.concurrency,
+            )
+            rss.sample()
+            sampling.cancel()
+            completed_ids = [
+                record["workflow_id"]
+                for record in map(json.loads, output.getvalue().splitlines())
+                if record["status"] == "completed"
+            ]
+            stages, events_per_workflow = await history_stats(
+                env.client, completed_ids[:args.stage_sample]
+            )
+
+    return {
+        "app": args.app,
+        "applications": args.applications,
+        "concurrency": args.concurrency,
+        "latency_scale": float(os.environ["LOAN_LATENCY_SCALE"]),
+        "activity_execution": os.environ.get("LOAN_ACTIVITY_EXECUTION", "default"),
+        "completed": report.completed,
+        "failed": report.failed,
+        "invalid": report.invalid,
+        "elapsed_s": round(report.elapsed, 3),
+        "workflows_per_sec": round(report.throughput, 2),
+        "latency_p50_ms": round(report.completion_latency.percentile(50) * 1000, 2),
+        "latency_p95_ms": round(report.completion_latency.percentile(95) * 1000, 2),
+        "latency_p99_ms": round(report.completion_latency.percentile(99) * 1000, 2),
+        "history_events_per_workflow": round(events_per_workflow, 1),
+        "stages": stages,
+        # Sampling can miss this process's own peak, which ru_maxrss (KiB
+        # on Linux) records exactly
+        "worker_peak_rss_mb": round(
+            max(rss.peak_mb, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024), 1
+        ),
+    }
+
+
+def run_in_subprocess(app: str, args: argparse.Namespace, activity_execution: str) -> dict:
+    """
+    Benchmark one app in a fresh interpreter: both apps have top-level
+    activities/workflow modules, and RSS should not include the other app
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        result_path = os.path.join(scratch, "result.json")
+        env = dict(os.environ)
+        env["LOAN_LATENCY_SCALE"] = str(args.latency_scale)
+        env["LOAN_ACTIVITY_EXECUTION"] = activity_execution
+        env["VALUATION_STORE_PATH"] = os.path.join(scratch, "valuations.db")
+        env["DOCUMENT_STORE_PATH"] = os.path.join(scratch, "document_blobs")
+        env["DOCUMENT_DOWNLOAD_DIR"] = os.path.join(scratch, "downloads")
+        # loanAppMVP waits for login fee payments; nobody else pays them here
+        env["SIMULATE_PAYMENTS"] = "1"
+        subprocess.run(
+            [
+                sys.executable, os.path.abspath(__file__),
+                "--app", app,
+                "--applications", str(args.applications),
+                "--concurrency", str(args.concurrency),
+                "--stage-sample", str(args.stage_sample),
+                "--seed", str(args.seed),
+                "--child-output", result_path,
+                *(["--target", args.target] if args.target else []),
+                *(["--dev-server-path", args.dev_server_path] if args.dev_server_path else []),
+            ],
+            env=env,
+            check=True,
+        )
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def find_regressions(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for app, result in results.items():
+        if app not in baseline:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            if metric not in baseline[app]:
+                continue
+            before, after = baseline[app][metric], result[metric]
+            if before <= 0:
+                continue
+            change = (before - after) / before if higher_is_better else (after - before) / before
+            if change > max_regression:
+                regressions.append(
+                    f"{app} {metric}: {before} -> {after} ({change:.0%} worse, "
+                    f"limit {max_regression:.0%})"
+                )
+    return regressions
+
+
+def print_summary(results: dict) -> None:
+    print("=" * 70)
+    print("📊 LOAN PIPELINE BENCHMARKS")
+    print("=" * 70)
+    for app, result in results.items():
+        print(
+            f"{app}: {result['workflows_per_sec']} workflows/s, "
+            f"p50={result['latency_p50_ms']}ms p95={result['latency_p95_ms']}ms "
+            f"p99={result['latency_p99_ms']}ms, failed={result['failed']}, "
+            f"{result['history_events_per_workflow']} history events/workflow, "
+            f"peak RSS={result['worker_peak_rss_mb']}MB"
+        )
+        for stage, latency in result["stages"].items():
+            print(f"   - {stage}: p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms")
+    for app, result in results.items():
+        regular = results.get(app + REGULAR_SUFFIX)
+        if regular is None:
+            continue
+        print(
+            f"{app} local vs regular activities: "
+            f"history events/workflow {regular['history_events_per_workflow']} -> "
+            f"{result['history_events_per_workflow']}, "
+            f"p50 {regular['latency_p50_ms']}ms -> {result['latency_p50_ms']}ms"
+        )
+    print("=" * 70)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the loan application pipelines")
+    parser.add_argument("--app", choices=APPS + ["all"], default="all")
+    parser.add_argument("--applications", type=int, default=200, help="Applications per app (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Applications in flight (default: 50)")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=0.01,
+        help="Multiplier for simulated provider latency (default: 0.01)",
+    )
+    parser.add_argument(
+        "--stage-sample",
+        type=int,
+        default=50,
+        help="Workflow histories read for per-stage latency (default: 50)",
+    )
+    parser.add_argument("--seed", type=int, default=7, help="Random seed, e.g. for payment outcomes")
+    parser.add_argument(
+        "--activity-execution",
+        choices=["default", "regular"],
+        default="default",
+        help="Run cheap steps as configured (default) or every step as a regular activity",
+    )
+    parser.add_argument(
+        "--compare-execution",
+        action="store_true",
+        help="Also run each app with every step as a regular activity and compare",
+    )
+    parser.add_argument(
+        "--target",
+        default=os.environ.get("BENCHMARK_TEMPORAL_ADDRESS"),
+        help="host:port of a running Temporal server to use instead of an ephemeral one "
+             "(env BENCHMARK_TEMPORAL_ADDRESS)",
+    )
+    parser.add_argument(
+        "--dev-server-path",
+        default=os.environ.get("BENCHMARK_DEV_SERVER_PATH"),
+        help="temporal CLI binary for the ephemeral server; without it the SDK downloads one, "
+             "which needs network access (env BENCHMARK_DEV_SERVER_PATH)",
+    )
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json"))
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.10,
+        help="Fail when a metric is this much worse than the baseline (default: 0.10)",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.child_output:
+        result = asyncio.run(benchmark_app(args))
+        with open(args.child_output, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    apps = APPS if args.app == "all" else [args.app]
+    results = {}
+    for app in apps:
+        results[app] = run_in_subprocess(app, args, args.activity_execution)
+        if args.compare_execution and args.activity_execution != "regular":
+            results[app + REGULAR_SUFFIX] = run_in_subprocess(app, args, "regular")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.max_regression)
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,71 @@ Loan Application Activities
 Each activity represents a step in the loan processing pipeline
 """
 import asyncio
-from dataclasses import dataclass
+import hashlib
+import logging
+import os
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+from typing import Union
 from temporalio import activity
+from temporalio.exceptions import ApplicationError
+
+from loan_common.blob_store import BlobStore
+from loan_common.micro_batch import MicroBatcher
+from loan_common.simulation import simulate_latency
+from loan_common.task_routing import CPU, FAST, REGULAR, SLOW_IO, ActivityRouter
+from loan_common.ttl_cache import TTLCache
+from underwriting import (
+    DEFAULT_PRODUCT,
+    RateCardSource,
+    UnderwritingRequest,
+    score_applications,
+    validate_request,
+)
+from valuation_store import ValuationStore
+
+logger = logging.getLogger(__name__)
+
+# Worker-wide cache of credit bureau responses (score, history) per applicant.
+# Concurrent credit checks for the same applicant share one bureau call.
+CREDIT_BUREAU_CACHE: TTLCache[str, tuple[int, str]] = TTLCache(
+    max_entries=int(os.environ.get("CREDIT_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.environ.get("CREDIT_CACHE_TTL_SECONDS", "900")),
+)
+
+# Persistent valuation cache shared by every worker process on this host
+VALUATION_STORE = ValuationStore(
+    path=os.environ.get(
+        "VALUATION_STORE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "property_valuations.db"),
+    ),
+    max_age_seconds=float(os.environ.get("VALUATION_MAX_AGE_DAYS", "30")) * 86400,
+)
+VALUATION_PURGE_SECONDS = float(os.environ.get("VALUATION_PURGE_HOURS", "6")) * 3600
+
+# Document bodies live here; activities and workflow state only carry their
+# digests. Blobs are released when the workflow that collected them closes.
+DOCUMENT_STORE = BlobStore(
+    root=os.environ.get(
+        "DOCUMENT_STORE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "document_blobs"),
+    ),
+    max_ref_age_seconds=float(os.environ.get("DOCUMENT_REF_MAX_AGE_DAYS", "7")) * 86400,
+)
+DOCUMENT_GC_SECONDS = float(os.environ.get("DOCUMENT_GC_MINUTES", "10")) * 60
+
+# Underwriting rules and rates; edits to the file are picked up by running
+# workers within RATE_CARD_CHECK_SECONDS
+RATE_CARD = RateCardSource(
+    os.environ.get(
+        "RATE_CARD_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_card.json"),
+    ),
+    check_seconds=float(os.environ.get("RATE_CARD_CHECK_SECONDS", "5")),
+)
+
+# Size of each simulated document body
+SIMULATED_DOCUMENT_BYTES = 64 * 1024
 
 
 @dataclass
@@ -14,6 +76,8 @@ class DocumentCollection:
     documents: list[str]
     collected_at: str
     status: str
+    # DOCUMENT_STORE digest of each document's body, in documents order
+    document_refs: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -39,6 +103,9 @@ class UnderwriterDecision:
     interest_rate: float
     reviewed_by: str
     reviewed_at: str
+    # Rate card rule that decided, and the card's version
+    rule_id: str = ""
+    rate_card_version: str = ""
 
 
 @dataclass
@@ -54,10 +121,10 @@ async def collect_docs(applicant_name: str) -> DocumentCollection:
     """
     Activity 1: Collect required documents from applicant
     """
-    activity.logger.info(f"Starting document collection for {applicant_name}")
+    activity.logger.info("Starting document collection for %s", applicant_name)
     
     # Simulate document collection process
-    await asyncio.sleep(2)
+    await simulate_latency(2)
     
     documents = [
         "Identity Proof",
@@ -67,50 +134,127 @@ async def collect_docs(applicant_name: str) -> DocumentCollection:
         "Bank Statements"
     ]
     
+    # Store the bodies and pass on only their digests
+    owner = activity.info().workflow_id
+    document_refs = [
+        await asyncio.to_thread(
+            DOCUMENT_STORE.put, simulated_document_body(applicant_name, document), owner
+        )
+        for document in documents
+    ]
+    
     result = DocumentCollection(
         applicant_name=applicant_name,
         documents=documents,
         collected_at=datetime.now().isoformat(),
-        status="Documents Collected Successfully"
+        status="Documents Collected Successfully",
+        document_refs=document_refs
     )
     
-    activity.logger.info(f"Collected {len(documents)} documents for {applicant_name}")
+    activity.logger.info("Collected %d documents for %s", len(documents), applicant_name)
     return result
 
 
+def simulated_document_body(applicant_name: str, document: str) -> bytes:
+    header = f"{document} for {applicant_name}\n".encode()
+    return header.ljust(SIMULATED_DOCUMENT_BYTES, b".")
+
+
+@activity.defn(name="verify_documents")
+def verify_documents(document_refs: list[str]) -> int:
+    """
+    Check every collected document body against its digest, reading the
+    bodies in place (memory-mapped) rather than copying them
+
+    Synchronous, so it runs in the CPU pool's processes rather than on the
+    worker's event loop. Only the digests cross the process boundary: each
+    process maps the bodies straight from the shared blob store.
+
+    Returns:
+        Total size of the verified documents in bytes
+    """
+    total = 0
+    for digest in document_refs:
+        with DOCUMENT_STORE.open(digest) as body:
+            if hashlib.sha256(body).hexdigest() != digest:
+                raise ApplicationError(f"Document {digest} is corrupt", non_retryable=True)
+            total += body.nbytes
+    activity.logger.info("Verified %d documents (%d bytes)", len(document_refs), total)
+    return total
+
+
+@activity.defn(name="release_documents")
+async def release_documents(workflow_id: str) -> None:
+    """
+    Drop the workflow's references to its document blobs; the blobs
+    themselves are deleted by collect_document_garbage
+    """
+    await asyncio.to_thread(DOCUMENT_STORE.release, workflow_id)
+
+
+async def collect_document_garbage(interval_seconds: float = DOCUMENT_GC_SECONDS) -> None:
+    """
+    Delete document blobs nothing refers to any more, now and then every
+    interval_seconds. Runs alongside the worker until cancelled.
+    """
+    while True:
+        try:
+            deleted = await asyncio.to_thread(DOCUMENT_STORE.collect_garbage)
+            if deleted:
+                logger.info("Deleted %s unreferenced document blobs", deleted)
+        except Exception as e:
+            logger.warning("Collecting unreferenced document blobs failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
 @activity.defn(name="credit_check")
 async def credit_check(applicant_name: str) -> CreditCheckResult:
     """
     Activity 2: Perform credit check on the applicant
     """
-    activity.logger.info(f"Running credit check for {applicant_name}")
+    activity.logger.info("Running credit check for %s", applicant_name)
     
-    # Simulate credit check API call
-    await asyncio.sleep(3)
-    
-    # Simulated credit score (in real scenario, would call credit bureau API)
-    credit_score = 750  # Good credit score
+    credit_score, credit_history = await CREDIT_BUREAU_CACHE.get_or_load(
+        applicant_name, lambda: bureau_lookup(applicant_name)
+    )
     
     result = CreditCheckResult(
         credit_score=credit_score,
-        credit_history="Good standing, no defaults",
+        credit_history=credit_history,
         approved=credit_score >= 650,
         checked_at=datetime.now().isoformat()
     )
     
-    activity.logger.info(f"Credit check complete: Score={credit_score}, Approved={result.approved}")
+    activity.logger.info("Credit check complete: Score=%d, Approved=%s", credit_score, result.approved)
     return result
 
 
+async def bureau_lookup(applicant_name: str) -> tuple[int, str]:
+    """
+    Fetch credit score and history from the credit bureau
+    """
+    # Simulate credit check API call
+    await simulate_latency(3)
+    
+    # Simulated credit score (in real scenario, would call credit bureau API)
+    credit_score = 750  # Good credit score
+    return credit_score, "Good standing, no defaults"
+
+
 @activity.defn(name="property_valuation")
 async def property_valuation(property_address: str) -> PropertyValuation:
     """
     Activity 3: Conduct property valuation
     """
-    activity.logger.info(f"Starting property valuation for {property_address}")
+    activity.logger.info("Starting property valuation for %s", property_address)
+    
+    cached = await asyncio.to_thread(VALUATION_STORE.get, property_address)
+    if cached is not None:
+        activity.logger.info("Using stored valuation from %s", cached["valuation_date"])
+        return PropertyValuation(**cached)
     
     # Simulate property valuation process
-    await asyncio.sleep(4)
+    await simulate_latency(4)
     
     # Simulated property value
     estimated_value = 450000.00
@@ -121,63 +265,118 @@ async def property_valuation(property_address: str) -> PropertyValuation:
         appraised_by="Certified Property Appraiser Inc.",
         valuation_date=datetime.now().isoformat()
     )
+    await asyncio.to_thread(VALUATION_STORE.put, property_address, asdict(result))
     
-    activity.logger.info(f"Property valuation complete: ${estimated_value:,.2f}")
+    activity.logger.info("Property valuation complete: $%.2f", estimated_value)
     return result
 
 
+async def purge_valuations(interval_seconds: float = VALUATION_PURGE_SECONDS) -> None:
+    """
+    Delete expired valuations now and then every interval_seconds, so the
+    store does not keep growing with entries get() no longer returns. Runs
+    alongside the worker until cancelled.
+    """
+    while True:
+        try:
+            purged = await asyncio.to_thread(VALUATION_STORE.purge_expired)
+            if purged:
+                logger.info("Purged %s expired property valuations", purged)
+        except Exception as e:
+            logger.warning("Purging expired property valuations failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
 @activity.defn(name="underwriter_review")
 async def underwriter_review(
     credit_score: int,
     property_value: float,
-    requested_amount: float
+    requested_amount: float,
+    product: str = DEFAULT_PRODUCT,
 ) -> UnderwriterDecision:
     """
     Activity 4: Underwriter reviews the loan application
     """
-    activity.logger.info(f"Underwriter reviewing loan application")
-    activity.logger.info(f"Credit Score: {credit_score}, Property Value: ${property_value:,.2f}, Requested: ${requested_amount:,.2f}")
-    
-    # Simulate underwriter review
-    await asyncio.sleep(3)
-    
-    # Decision logic
-    loan_to_value_ratio = requested_amount / property_value
-    
-    if credit_score >= 750 and loan_to_value_ratio <= 0.80:
-        decision = "APPROVED"
-        loan_amount = requested_amount
-        interest_rate = 3.5
-    elif credit_score >= 680 and loan_to_value_ratio <= 0.75:
-        decision = "APPROVED_WITH_CONDITIONS"
-        loan_amount = requested_amount * 0.95
-        interest_rate = 4.2
-    else:
-        decision = "DECLINED"
-        loan_amount = 0.0
-        interest_rate = 0.0
-    
-    result = UnderwriterDecision(
-        decision=decision,
-        loan_amount_approved=loan_amount,
-        interest_rate=interest_rate,
-        reviewed_by="Senior Underwriter",
-        reviewed_at=datetime.now().isoformat()
+    activity.logger.info(
+        "Underwriter reviewing loan application: Credit Score: %d, Property Value: $%.2f, Requested: $%.2f",
+        credit_score, property_value, requested_amount,
     )
     
-    activity.logger.info(f"Underwriter decision: {decision}")
+    request = UnderwritingRequest(credit_score, property_value, requested_amount, product)
+    try:
+        validate_request(request)
+    except ValueError as e:
+        raise ApplicationError(str(e), type="InvalidApplication", non_retryable=True)
+    # Reviews from concurrent workflows are gathered into one batch
+    result = await UNDERWRITER_BATCHER.submit(request)
+    
+    activity.logger.info(
+        "Underwriter decision: %s (rule %s, rate card %s)",
+        result.decision, result.rule_id, result.rate_card_version,
+    )
     return result
 
 
+@activity.defn(name="underwriter_review_batch")
+async def underwriter_review_batch(
+    requests: list[UnderwritingRequest]
+) -> list[UnderwriterDecision]:
+    """
+    Activity 4 (batch): Underwriter reviews many loan applications in one call
+    """
+    activity.logger.info("Underwriter reviewing %d loan applications", len(requests))
+    decisions = await review_batch(requests)
+    for index, decision in enumerate(decisions):
+        if isinstance(decision, Exception):
+            raise ApplicationError(
+                f"Application {index}: {decision}", type="InvalidApplication", non_retryable=True
+            )
+    return decisions
+
+
+async def review_batch(requests: list[UnderwritingRequest]) -> list[Union[UnderwriterDecision, Exception]]:
+    """
+    Review a batch of applications, returning one decision per request, or
+    a non-retryable ApplicationError for a request that cannot be scored
+    """
+    # Simulate underwriter review (once for the whole batch)
+    await simulate_latency(3)
+    
+    reviewed_at = datetime.now().isoformat()
+    card = RATE_CARD.current()
+    decisions: list[Union[UnderwriterDecision, Exception]] = []
+    for outcome in score_applications(requests, card):
+        if isinstance(outcome, Exception):
+            decisions.append(ApplicationError(str(outcome), type="InvalidApplication", non_retryable=True))
+            continue
+        decisions.append(UnderwriterDecision(
+            decision=outcome.decision,
+            loan_amount_approved=outcome.loan_amount,
+            interest_rate=outcome.interest_rate,
+            reviewed_by="Senior Underwriter",
+            reviewed_at=reviewed_at,
+            rule_id=outcome.rule_id,
+            rate_card_version=card.version,
+        ))
+    return decisions
+
+
+UNDERWRITER_BATCHER: MicroBatcher[UnderwritingRequest, UnderwriterDecision] = MicroBatcher(
+    review_batch,
+    max_batch_size=int(os.environ.get("UNDERWRITER_BATCH_MAX_SIZE", "256")),
+    window_seconds=float(os.environ.get("UNDERWRITER_BATCH_WINDOW_MS", "20")) / 1000,
+)
+
+
 @activity.defn(name="sign_agreement")
 async def sign_agreement(applicant_name: str, loan_amount: float) -> SignedAgreement:
     """
     Activity 5: Finalize and sign loan agreement
     """
-    activity.logger.info(f"Processing loan agreement signature for {applicant_name}")
+    activity.logger.info("Processing loan agreement signature for %s", applicant_name)
     
     # Simulate agreement signing process
-    await asyncio.sleep(2)
+    await simulate_latency(2)
     
     agreement_id = f"LOAN-{datetime.now().strftime('%Y%m%d%H%M%S')}"
     
@@ -188,6 +387,38 @@ async def sign_agreement(applicant_name: str, loan_amount: float) -> SignedAgree
         final_status=f"Loan of ${loan_amount:,.2f} approved and agreement signed"
     )
     
-    activity.logger.info(f"Agreement signed: {agreement_id}")
+    activity.logger.info("Agreement signed: %s", agreement_id)
     return result
 
+
+# Each latency class runs on its own task queue and worker pool, so fast
+# steps never wait for slots held by slow provider calls. Fast steps run as
+# local activities in the workflow worker, except those that touch the
+# document store (which may live on the activity hosts) and the batch API
+# called by other services.
+ACTIVITY_ROUTER = ActivityRouter(
+    {
+        collect_docs: SLOW_IO,
+        verify_documents: CPU,
+        release_documents: FAST,
+        credit_check: SLOW_IO,
+        property_valuation: SLOW_IO,
+        underwriter_review: FAST,
+        underwriter_review_batch: FAST,
+        sign_agreement: SLOW_IO,
+    },
+    execution={
+        release_documents: REGULAR,
+        underwriter_review_batch: REGULAR,
+    },
+)
+
+# Dataclasses passed between workflow and activities; --compact-payloads
+# encodes these in a binary form instead of JSON
+PAYLOAD_DATACLASSES = [
+    DocumentCollection,
+    CreditCheckResult,
+    PropertyValuation,
+    UnderwriterDecision,
+    SignedAgreement,
+]
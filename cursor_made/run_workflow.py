@@ -2,17 +2,57 @@
 Workflow Client
 Starts a new loan application workflow
 """
-import asyncio
+import argparse
+import os
 import sys
-from temporalio.client import Client
+from datetime import timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loan_common.bulk_submit import DECISION_UPDATE, WorkflowStart
+from loan_common.idempotency import ATTACHED, REUSED, submit_idempotent
+from loan_common.submit_cli import WORKFLOW_TYPE, SubmitCli, workflow_id_for
+from loan_common.task_routing import WORKFLOW_TASK_QUEUE
 
-async def main():
+
+def build_start(applicant: dict) -> WorkflowStart:
+    """
+    Map a bulk applicant record (applicant_name, property_address,
+    requested_loan_amount and optional workflow_id) to a workflow start
+    """
+    application = [
+        applicant["applicant_name"],
+        applicant["property_address"],
+        float(applicant["requested_loan_amount"]),
+    ]
+    return WorkflowStart(
+        workflow_id=applicant.get("workflow_id") or workflow_id_for(application),
+        args=application,
+    )
+
+
+def payload_dataclasses() -> list[type]:
+    # Imported on demand so plain submissions do not load the activities
+    from activities import PAYLOAD_DATACLASSES
+    return PAYLOAD_DATACLASSES
+
+
+def reusable_result(result: dict) -> bool:
+    """
+    Approvals and rejections are decisions a resubmission gets again
+    """
+    return result.get("status") in ("APPROVED", "REJECTED")
+
+
+CLI = SubmitCli(build_start, payload_dataclasses, reusable_result)
+connect = CLI.connect
+
+
+async def main(args: argparse.Namespace):
     """
     Start a loan application workflow
     """
     # Connect to Temporal server
-    client = await Client.connect("localhost:7233")
+    client = await connect(args)
     
     # Loan application details
     applicant_name = "John Doe"
@@ -28,16 +68,44 @@ async def main():
     print("=" * 70)
     print("\n🚀 Starting workflow execution...\n")
     
-    # Start the workflow
-    workflow_id = f"loan-application-{applicant_name.replace(' ', '-').lower()}"
-    
-    result = await client.execute_workflow(
-        "LoanApplicationWorkflow",
-        args=[applicant_name, property_address, requested_loan_amount],
-        id=workflow_id,
-        task_queue="loan-application-queue",
+    # Start the workflow together with the early-decision update, which
+    # returns as soon as the application is decided. A resubmission of the
+    # same application attaches to its running workflow or reuses a recent
+    # result instead of running it again.
+    application = [applicant_name, property_address, requested_loan_amount]
+    workflow_id = workflow_id_for(application)
+    submission = await submit_idempotent(
+        client,
+        WORKFLOW_TYPE,
+        WORKFLOW_TASK_QUEUE,
+        workflow_id,
+        application,
+        decision_update=DECISION_UPDATE,
+        reuse_window=timedelta(seconds=args.reuse_window),
+        reusable=reusable_result,
     )
     
+    if submission.outcome == REUSED:
+        print(f"♻️  Completed recently, reusing the result of {workflow_id}")
+        result = submission.result
+    else:
+        if submission.outcome == ATTACHED:
+            print(f"🔗 Already running, attached to {workflow_id}")
+        decision = await submission.decision.result()
+        if decision["status"] == "APPROVED":
+            print(f"✅ Decision: {decision['underwriter_decision']} "
+                  f"${decision['approved_amount']:,.2f} at {decision['interest_rate']}%")
+        else:
+            print(f"❌ Decision: {decision['status']} ({decision['reason']})")
+        
+        if args.decision_only:
+            print(f"\n⏩ Not waiting for completion. Progress: "
+                  f"temporal workflow query --workflow-id {workflow_id} --type progress")
+            return
+        
+        print(f"⏳ Progress: {await submission.handle.query('progress')}")
+        result = await submission.handle.result()
+    
     # Print results
     print("\n" + "=" * 70)
     print("📊 WORKFLOW RESULTS")
@@ -50,7 +118,9 @@ async def main():
         print(f"📊 Interest Rate: {result['interest_rate']}%")
         print(f"🏠 Property Value: ${result['property_value']:,.2f}")
         print(f"📈 Credit Score: {result['credit_score']}")
-        print(f"⚖️  Underwriter Decision: {result['underwriter_decision']}")
+        progress = await submission.handle.query("progress")
+        print(f"⚖️  Underwriter Decision: {result['underwriter_decision']} "
+              f"(rule {progress['rate_card_rule']})")
         print(f"\n📄 Documents Collected:")
         for doc in result['documents_collected']:
             print(f"   - {doc}")
@@ -64,5 +134,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    CLI.run(main)
@@ -0,0 +1,128 @@
+"""
+Stage Graph
+Runs workflow stages as a dependency graph instead of a fixed sequence
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from temporalio import workflow
+from temporalio.exceptions import ApplicationError
+
+
+class StageGraphHalt(Exception):
+    """
+    Raised by a stage to stop the whole graph early (e.g. a rejection).
+    Carries the workflow result that should be returned instead.
+    """
+
+    def __init__(self, stage: str, result: dict):
+        super().__init__(f"Stage graph halted at {stage}")
+        self.stage = stage
+        self.result = result
+
+
+def _invalid(message: str) -> ApplicationError:
+    return ApplicationError(message, type="InvalidStageGraph", non_retryable=True)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A single node in the stage graph
+
+    Args:
+        name: Unique stage name, used as the key for its result
+        run: Coroutine function receiving the results of completed stages
+        depends_on: Names of stages whose results this stage needs
+    """
+    name: str
+    run: Callable[[dict[str, Any]], Awaitable[Any]]
+    depends_on: tuple[str, ...] = ()
+
+
+class StageGraph:
+    """
+    Schedules every stage as soon as all of its dependencies have finished.
+
+    Must be run from inside a workflow: it only uses asyncio tasks and
+    workflow.wait, so scheduling is deterministic on replay.
+
+    An invalid graph (duplicate names, unknown dependencies or a cycle) is
+    refused on construction with a non-retryable ApplicationError: it is a
+    code defect that retrying the workflow task would only repeat forever,
+    so the workflow fails instead.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise _invalid(f"Duplicate stage names in {names}")
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in names]
+            if missing:
+                raise _invalid(f"Stage {stage.name} depends on unknown stages {missing}")
+        # Resolve stages layer by layer; whatever is left sits on a cycle
+        resolved: set[str] = set()
+        unresolved = list(stages)
+        while unresolved:
+            ready = [stage for stage in unresolved if resolved.issuperset(stage.depends_on)]
+            if not ready:
+                raise _invalid(f"Stage graph has a dependency cycle: {[stage.name for stage in unresolved]}")
+            resolved.update(stage.name for stage in ready)
+            unresolved = [stage for stage in unresolved if stage.name not in resolved]
+        self._stages = stages
+        self._order = {name: index for index, name in enumerate(names)}
+        # Stage names in flight and finished, for progress queries
+        self.running: list[str] = []
+        self.completed: list[str] = []
+
+    async def run(self) -> dict[str, Any]:
+        """
+        Execute the graph and return a mapping of stage name to result
+
+        Raises:
+            StageGraphHalt: when a stage halts the graph; every stage still
+                running at that point is cancelled before this is raised
+        """
+        results: dict[str, Any] = {}
+        pending = list(self._stages)
+        running: dict[asyncio.Task, Stage] = {}
+
+        try:
+            while pending or running:
+                # Start every stage whose inputs are now all available
+                for stage in list(pending):
+                    if all(dep in results for dep in stage.depends_on):
+                        pending.remove(stage)
+                        task = asyncio.create_task(stage.run(dict(results)))
+                        running[task] = stage
+                        self.running.append(stage.name)
+
+                done, _ = await workflow.wait(
+                    list(running), return_when=asyncio.FIRST_COMPLETED
+                )
+                # Handle completions in declaration order so replay is stable
+                for task in sorted(done, key=lambda t: self._order[running[t].name]):
+                    stage = running.pop(task)
+                    results[stage.name] = task.result()
+                    self.running.remove(stage.name)
+                    self.completed.append(stage.name)
+        except BaseException:
+            await self._cancel(running)
+            self.running.clear()
+            raise
+
+        return results
+
+    @staticmethod
+    async def _cancel(running: dict[asyncio.Task, Stage]) -> None:
+        """
+        Cancel sibling stages that are still in flight and wait for them
+        """
+        if not running:
+            return
+        for task, stage in running.items():
+            workflow.logger.info(f"Cancelling stage {stage.name}")
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,305 @@
+"""
+Underwriting
+Underwriter decision rules from a versioned rate card, compiled into band
+indexes and reloaded in the background when the rate card file changes
+"""
+import bisect
+import concurrent.futures
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRODUCT = "standard"
+DECLINED = "DECLINED"
+
+# Largest card accepted; compile time and index memory grow with the
+# square of the rule count
+MAX_RULES = int(os.environ.get("RATE_CARD_MAX_RULES", "5000"))
+
+# Rule dimensions in lookup order, with whether their bands include the
+# upper bound: credit scores are [low, high), loan-to-value and amount are
+# "up to" bands, (low, high]
+DIMENSIONS = [
+    ("credit_score", False),
+    ("loan_to_value", True),
+    ("amount", True),
+]
+RULE_KEYS = {"id", "product", "decision", "amount_factor", "interest_rate"} | {name for name, _ in DIMENSIONS}
+
+
+@dataclass
+class UnderwritingRequest:
+    credit_score: int
+    property_value: float
+    requested_amount: float
+    product: str = DEFAULT_PRODUCT
+
+
+@dataclass(frozen=True)
+class RateRule:
+    """
+    One rate card row's outcome: amount_factor * requested amount at
+    interest_rate, or a decline
+    """
+    rule_id: str
+    decision: str
+    amount_factor: float
+    interest_rate: float
+
+
+@dataclass
+class UnderwritingOutcome:
+    decision: str
+    loan_amount: float
+    interest_rate: float
+    # The rate card rule that decided, empty if none matched
+    rule_id: str
+
+
+def _rate_rule(rule: dict) -> RateRule:
+    decision = rule["decision"]
+    if decision == DECLINED:
+        return RateRule(str(rule["id"]), decision, 0.0, 0.0)
+    return RateRule(str(rule["id"]), decision, float(rule["amount_factor"]), float(rule["interest_rate"]))
+
+
+def _bounds(rule: dict, dimension: str) -> tuple[float, float]:
+    low, high = rule.get(dimension) or (None, None)
+    low = -math.inf if low is None else float(low)
+    high = math.inf if high is None else float(high)
+    if low >= high:
+        raise ValueError(f"Rule {rule.get('id')}: empty {dimension} band [{low}, {high}]")
+    return low, high
+
+
+class _Dimension:
+    """
+    The band edges of one dimension (every bound used by any rule, sorted)
+    and, per band, a bitset of the rules covering it: bit i set means rule
+    i's band in this dimension holds the band
+    """
+
+    def __init__(self, upper_inclusive: bool, bounds: Sequence[tuple[float, float]]):
+        self._upper_inclusive = upper_inclusive
+        self.edges = sorted({-math.inf, math.inf, *itertools.chain.from_iterable(bounds)})
+        # Sweep the bands once, adding each rule where its band starts and
+        # removing it where it ends
+        starts: list[list[int]] = [[] for _ in range(self.bands + 1)]
+        ends: list[list[int]] = [[] for _ in range(self.bands + 1)]
+        for index, (low, high) in enumerate(bounds):
+            span = self.span(low, high)
+            starts[span.start].append(index)
+            ends[span.stop].append(index)
+        self.rules: list[int] = []
+        covering = 0
+        for band in range(self.bands):
+            for index in ends[band]:
+                covering &= ~(1 << index)
+            for index in starts[band]:
+                covering |= 1 << index
+            self.rules.append(covering)
+
+    @property
+    def bands(self) -> int:
+        return len(self.edges) - 1
+
+    def band(self, value: float) -> int:
+        """
+        Index of the band holding value (binary search), or -1 if none does
+        """
+        if self._upper_inclusive:
+            index = bisect.bisect_left(self.edges, value) - 1
+        else:
+            index = bisect.bisect_right(self.edges, value) - 1
+        return index if 0 <= index < self.bands else -1
+
+    def span(self, low: float, high: float) -> range:
+        """
+        Indexes of the bands between two edges
+        """
+        return range(bisect.bisect_left(self.edges, low), bisect.bisect_left(self.edges, high))
+
+
+class _ProductIndex:
+    """
+    One product's rules indexed per dimension. A lookup intersects the
+    bitsets of the bands holding the application; the lowest set bit is the
+    first matching rule.
+    """
+
+    def __init__(self, rules: list[dict]):
+        self._dimensions = [
+            _Dimension(upper_inclusive, [_bounds(rule, name) for rule in rules])
+            for name, upper_inclusive in DIMENSIONS
+        ]
+
+    def lookup(self, values: Sequence[float]) -> int:
+        """
+        Index of the first rule covering values, or -1
+        """
+        candidates = -1
+        for dimension, value in zip(self._dimensions, values):
+            band = dimension.band(value)
+            if band < 0:
+                return -1
+            candidates &= dimension.rules[band]
+            if not candidates:
+                return -1
+        return (candidates & -candidates).bit_length() - 1
+
+
+class RateCard:
+    """
+    A compiled rate card.
+
+    Rules are checked in file order and the first one whose bands all hold
+    the application wins. Compiling indexes each dimension separately, so
+    it takes time and memory proportional to rules x bands per dimension
+    rather than to every band combination; a lookup is one binary search
+    per dimension plus an AND of bitsets.
+
+    Args:
+        version: The card's version, recorded with every decision
+        rules: Rows with an id, a product (default DEFAULT_PRODUCT), a
+            [low, high] band per dimension (omitted or null bounds are
+            open), a decision, and for approvals amount_factor and
+            interest_rate
+        max_rules: Cards with more rules are refused with ValueError
+    """
+
+    def __init__(self, version: str, rules: list[dict], max_rules: int = MAX_RULES):
+        if len(rules) > max_rules:
+            raise ValueError(f"Rate card {version} has {len(rules)} rules, more than the limit of {max_rules}")
+        self.version = version
+        by_product: dict[str, list[dict]] = {}
+        for rule in rules:
+            unknown = set(rule) - RULE_KEYS
+            if unknown:
+                raise ValueError(f"Rule {rule.get('id')}: unknown keys {sorted(unknown)}")
+            by_product.setdefault(rule.get("product", DEFAULT_PRODUCT), []).append(rule)
+        self._products = {
+            product: (_ProductIndex(product_rules), [_rate_rule(rule) for rule in product_rules])
+            for product, product_rules in by_product.items()
+        }
+
+    def lookup(
+        self, credit_score: int, loan_to_value: float, amount: float, product: str = DEFAULT_PRODUCT
+    ) -> Optional[RateRule]:
+        """
+        The rule deciding an application, or None if no rule covers it
+        """
+        entry = self._products.get(product)
+        if entry is None:
+            return None
+        product_index, product_rules = entry
+        index = product_index.lookup((credit_score, loan_to_value, amount))
+        return product_rules[index] if index >= 0 else None
+
+
+def load_rate_card(path: str, max_rules: int = MAX_RULES) -> RateCard:
+    with open(path) as f:
+        data = json.load(f)
+    return RateCard(str(data["version"]), data["rules"], max_rules)
+
+
+class RateCardSource:
+    """
+    The rate card in a file, reloaded without restarting the worker.
+
+    current() never blocks on the file: at most every check_seconds it
+    hands a check of the file's modification time to a background thread
+    and returns the card in use. A changed file is compiled completely on
+    that thread before it replaces the card, so lookups keep getting the
+    previous card meanwhile and never see a partly loaded one; a file that
+    fails to load (including one over max_rules) is reported and the
+    previous card stays in use until the file changes again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        check_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_rules: int = MAX_RULES,
+    ):
+        self.path = path
+        self._check_seconds = check_seconds
+        self._clock = clock
+        self._max_rules = max_rules
+        self._stamp = self._file_stamp()
+        self._card = load_rate_card(path, max_rules)
+        self._checked = clock()
+        self._reloader = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="rate-card")
+        self._reload: Optional[concurrent.futures.Future] = None
+
+    def _file_stamp(self) -> tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> RateCard:
+        now = self._clock()
+        if now - self._checked >= self._check_seconds and (self._reload is None or self._reload.done()):
+            self._checked = now
+            self._reload = self._reloader.submit(self.reload)
+        return self._card
+
+    def reload(self) -> None:
+        """
+        Load the file if it changed since the last load. Runs on the
+        background thread; can be called directly, e.g. in tests.
+        """
+        try:
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self._card = load_rate_card(self.path, self._max_rules)
+                logger.info("Rate card %s loaded from %s", self._card.version, self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Keeping rate card %s, %s failed to load: %s", self._card.version, self.path, e)
+
+
+def validate_request(request: UnderwritingRequest) -> None:
+    """
+    Raise ValueError for a request that cannot be scored
+    """
+    if not request.property_value > 0:
+        raise ValueError(f"Property value must be positive, got {request.property_value}")
+    if not request.requested_amount > 0:
+        raise ValueError(f"Requested amount must be positive, got {request.requested_amount}")
+
+
+def score_applications(
+    requests: list[UnderwritingRequest], card: RateCard
+) -> list[Union[UnderwritingOutcome, ValueError]]:
+    """
+    Decide each request in turn with one rate card, so a batch is never
+    split across a reload. A request that fails validate_request gets its
+    ValueError in place of an outcome; the others are still decided.
+    """
+    outcomes: list[Union[UnderwritingOutcome, ValueError]] = []
+    for request in requests:
+        try:
+            validate_request(request)
+        except ValueError as e:
+            outcomes.append(e)
+            continue
+        rule = card.lookup(
+            request.credit_score,
+            request.requested_amount / request.property_value,
+            request.requested_amount,
+            request.product,
+        )
+        if rule is None or rule.decision == DECLINED:
+            outcomes.append(UnderwritingOutcome(DECLINED, 0.0, 0.0, rule.rule_id if rule else ""))
+        else:
+            outcomes.append(UnderwritingOutcome(
+                rule.decision, request.requested_amount * rule.amount_factor, rule.interest_rate, rule.rule_id
+            ))
+    return outcomes
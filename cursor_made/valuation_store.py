@@ -0,0 +1,108 @@
+"""
+Property Valuation Store
+On-disk cache of property valuations keyed by normalized address
+"""
+import json
+import re
+import sqlite3
+import time
+from typing import Optional
+
+# Common street-suffix spellings folded to one form so that
+# "123 Main Street" and "123 main st." share a cache entry
+_ADDRESS_ABBREVIATIONS = {
+    "street": "st",
+    "avenue": "ave",
+    "road": "rd",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "lane": "ln",
+    "court": "ct",
+    "place": "pl",
+    "suite": "ste",
+    "apartment": "apt",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+}
+
+
+def normalize_address(address: str) -> str:
+    """
+    Reduce an address to a canonical cache key: lower case, punctuation
+    dropped, whitespace collapsed and street suffixes abbreviated
+    """
+    words = re.sub(r"[^\w\s]", " ", address.lower()).split()
+    return " ".join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+class ValuationStore:
+    """
+    SQLite-backed valuation cache that survives worker restarts.
+
+    The database runs in WAL mode so several worker processes on one host
+    can read and write it at the same time. Every call opens its own short
+    connection, which keeps the store safe to use from worker threads.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float):
+        self._path = path
+        self._max_age = max_age_seconds
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS valuations ("
+                    " address_key TEXT PRIMARY KEY,"
+                    " valuation TEXT NOT NULL,"
+                    " stored_at REAL NOT NULL)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # timeout: wait for another process's write lock instead of failing
+        return sqlite3.connect(self._path, timeout=10)
+
+    def get(self, address: str) -> Optional[dict]:
+        """
+        Return the stored valuation for address if it is still valid
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT valuation FROM valuations WHERE address_key = ? AND stored_at > ?",
+                (normalize_address(address), time.time() - self._max_age),
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def put(self, address: str, valuation: dict) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO valuations (address_key, valuation, stored_at)"
+                    " VALUES (?, ?, ?)",
+                    (normalize_address(address), json.dumps(valuation), time.time()),
+                )
+        finally:
+            conn.close()
+
+    def purge_expired(self) -> int:
+        """
+        Delete entries older than the validity window, returning how many
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM valuations WHERE stored_at <= ?",
+                    (time.time() - self._max_age,),
+                )
+            return cursor.rowcount
+        finally:
+            conn.close()
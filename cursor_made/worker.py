@@ -2,49 +2,43 @@
 Temporal Worker
 Polls for tasks and executes workflows and activities
 """
+import argparse
 import asyncio
-from temporalio.client import Client
-from temporalio.worker import Worker
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_common.supervisor import ProcessTaskCounter
+from loan_common.worker_cli import WorkerCli
 
 from workflow import LoanApplicationWorkflow
+from run_workflow import build_start
 from activities import (
-    collect_docs,
-    credit_check,
-    property_valuation,
-    underwriter_review,
-    sign_agreement
+    ACTIVITY_ROUTER,
+    CREDIT_BUREAU_CACHE,
+    PAYLOAD_DATACLASSES,
+    collect_document_garbage,
+    purge_valuations,
 )
 
+WORKER = WorkerCli(
+    LoanApplicationWorkflow,
+    ACTIVITY_ROUTER,
+    PAYLOAD_DATACLASSES,
+    build_start,
+    CREDIT_BUREAU_CACHE,
+    housekeeping=[purge_valuations, collect_document_garbage],
+)
+main = WORKER.main
 
-async def main():
+
+def run_worker_process(args: argparse.Namespace, counter: ProcessTaskCounter):
     """
-    Start the Temporal worker
+    Entry point of each supervised worker process
     """
-    # Connect to Temporal server (default: localhost:7233)
-    client = await Client.connect("localhost:7233")
-    
-    print("🚀 Starting Temporal Worker...")
-    print("📋 Task Queue: loan-application-queue")
-    print("⏳ Waiting for workflow executions...\n")
-    
-    # Create worker that listens to the task queue
-    worker = Worker(
-        client,
-        task_queue="loan-application-queue",
-        workflows=[LoanApplicationWorkflow],
-        activities=[
-            collect_docs,
-            credit_check,
-            property_valuation,
-            underwriter_review,
-            sign_agreement
-        ],
-    )
-    
-    # Run the worker
-    await worker.run()
+    asyncio.run(main(args, counter))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    WORKER.run(run_worker_process)
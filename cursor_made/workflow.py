@@ -3,12 +3,15 @@ Loan Application Workflow
 Orchestrates the five-step loan processing pipeline
 """
 from datetime import timedelta
+from typing import Optional
 from temporalio import workflow
 
 # Import activity types
 with workflow.unsafe.imports_passed_through():
     from activities import (
         collect_docs,
+        verify_documents,
+        release_documents,
         credit_check,
         property_valuation,
         underwriter_review,
@@ -17,17 +20,28 @@ with workflow.unsafe.imports_passed_through():
         CreditCheckResult,
         PropertyValuation,
         UnderwriterDecision,
-        SignedAgreement
+        SignedAgreement,
+        ACTIVITY_ROUTER
     )
 
+from stage_graph import Stage, StageGraph, StageGraphHalt
+
 
 @workflow.defn(name="LoanApplicationWorkflow")
 class LoanApplicationWorkflow:
     """
     Main workflow that orchestrates the loan application process
-    through five sequential states
+    through five states, run as a dependency graph
     """
     
+    def __init__(self) -> None:
+        self._graph: Optional[StageGraph] = None
+        # Underwriter decision (or rejection), available before the
+        # agreement is signed
+        self._decision: Optional[dict] = None
+        # Rate card rule ("<version>/<rule id>") the underwriter applied
+        self._rate_card_rule: Optional[str] = None
+    
     @workflow.run
     async def run(
         self,
@@ -46,87 +60,218 @@ class LoanApplicationWorkflow:
         Returns:
             Dictionary containing the complete workflow results
         """
-        workflow.logger.info(f"Starting loan application workflow for {applicant_name}")
+        workflow.logger.info("Starting loan application workflow for %s", applicant_name)
+        
+        # Stages run as soon as their inputs are ready: collect_docs,
+        # credit_check and property_valuation have no dependencies and
+        # therefore run in parallel.
+        graph = self._graph = StageGraph([
+            Stage("docs", lambda _: self._collect_docs(applicant_name)),
+            Stage(
+                "verification",
+                lambda results: self._verify_documents(results["docs"]),
+                depends_on=("docs",),
+            ),
+            Stage("credit", lambda _: self._credit_check(applicant_name)),
+            Stage("valuation", lambda _: self._property_valuation(property_address)),
+            Stage(
+                "decision",
+                lambda results: self._underwriter_review(
+                    results["credit"], results["valuation"], requested_loan_amount
+                ),
+                depends_on=("credit", "valuation"),
+            ),
+            Stage(
+                "agreement",
+                lambda results: self._sign_agreement(applicant_name, results["decision"]),
+                depends_on=("decision", "verification"),
+            ),
+        ])
+        
+        try:
+            results = await graph.run()
+        except StageGraphHalt as halt:
+            workflow.logger.warning("Loan application stopped at stage: %s", halt.stage)
+            return halt.result
+        finally:
+            # Document bodies are only needed while the graph runs
+            await self._release_documents()
+        
+        docs: DocumentCollection = results["docs"]
+        credit: CreditCheckResult = results["credit"]
+        valuation: PropertyValuation = results["valuation"]
+        decision: UnderwriterDecision = results["decision"]
+        agreement: SignedAgreement = results["agreement"]
+        
+        # Return complete workflow result
+        workflow.logger.info("Loan application workflow completed successfully!")
         
-        # State 1: Collect Documents
+        return {
+            "status": "APPROVED",
+            "applicant_name": applicant_name,
+            "property_address": property_address,
+            "requested_amount": requested_loan_amount,
+            "approved_amount": decision.loan_amount_approved,
+            "interest_rate": decision.interest_rate,
+            "credit_score": credit.credit_score,
+            "property_value": valuation.estimated_value,
+            "agreement_id": agreement.agreement_id,
+            "underwriter_decision": decision.decision,
+            "documents_collected": docs.documents,
+            "final_message": agreement.final_status
+        }
+
+    @workflow.update(name="wait_for_decision")
+    async def wait_for_decision(self) -> dict:
+        """
+        Return as soon as the application is decided: APPROVED with the
+        approved amount and rate, or REJECTED with the reason. Lets callers
+        show the decision without waiting for the agreement to be signed.
+        """
+        await workflow.wait_condition(lambda: self._decision is not None)
+        return self._decision
+    
+    @workflow.query(name="progress")
+    def progress(self) -> dict:
+        """
+        Stages running and completed so far, the decision once made and the
+        rate card rule it came from
+        """
+        return {
+            "running": list(self._graph.running) if self._graph else [],
+            "completed": list(self._graph.completed) if self._graph else [],
+            "decision": self._decision,
+            "rate_card_rule": self._rate_card_rule,
+        }
+    
+    def _decide(self, decision: dict) -> None:
+        if self._decision is None:
+            self._decision = decision
+    
+    async def _collect_docs(self, applicant_name: str) -> DocumentCollection:
+        """
+        State 1: Collect Documents
+        """
         workflow.logger.info("State 1: Collecting documents...")
-        docs: DocumentCollection = await workflow.execute_activity(
+        docs: DocumentCollection = await ACTIVITY_ROUTER.execute(
             collect_docs,
-            applicant_name,
+            args=[applicant_name],
             start_to_close_timeout=timedelta(seconds=30),
         )
-        workflow.logger.info(f"✓ Documents collected: {len(docs.documents)} items")
-        
-        # State 2: Credit Check
+        workflow.logger.info("✓ Documents collected: %s items", len(docs.documents))
+        return docs
+    
+    async def _verify_documents(self, docs: DocumentCollection) -> int:
+        """
+        State 1b: Verify the collected document bodies
+        """
+        total_bytes: int = await ACTIVITY_ROUTER.execute(
+            verify_documents,
+            args=[docs.document_refs],
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+        workflow.logger.info("✓ Documents verified: %s bytes", total_bytes)
+        return total_bytes
+    
+    async def _release_documents(self) -> None:
+        """
+        Release this workflow's document blobs for garbage collection
+        """
+        await ACTIVITY_ROUTER.execute(
+            release_documents,
+            args=[workflow.info().workflow_id],
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+    
+    async def _credit_check(self, applicant_name: str) -> CreditCheckResult:
+        """
+        State 2: Credit Check, halting the graph if the score is insufficient
+        """
         workflow.logger.info("State 2: Running credit check...")
-        credit: CreditCheckResult = await workflow.execute_activity(
+        credit: CreditCheckResult = await ACTIVITY_ROUTER.execute(
             credit_check,
-            applicant_name,
+            args=[applicant_name],
             start_to_close_timeout=timedelta(seconds=30),
         )
-        workflow.logger.info(f"✓ Credit check complete: Score={credit.credit_score}")
+        workflow.logger.info("✓ Credit check complete: Score=%s", credit.credit_score)
         
         # Check if credit check passed
         if not credit.approved:
-            workflow.logger.warning(f"Credit check failed. Score: {credit.credit_score}")
-            return {
+            workflow.logger.warning("Credit check failed. Score: %s", credit.credit_score)
+            rejection = {
                 "status": "REJECTED",
                 "reason": "Insufficient credit score",
                 "credit_score": credit.credit_score,
                 "stage": "credit_check"
             }
-        
-        # State 3: Property Valuation
+            self._decide(rejection)
+            raise StageGraphHalt("credit_check", rejection)
+        return credit
+    
+    async def _property_valuation(self, property_address: str) -> PropertyValuation:
+        """
+        State 3: Property Valuation
+        """
         workflow.logger.info("State 3: Conducting property valuation...")
-        valuation: PropertyValuation = await workflow.execute_activity(
+        valuation: PropertyValuation = await ACTIVITY_ROUTER.execute(
             property_valuation,
-            property_address,
+            args=[property_address],
             start_to_close_timeout=timedelta(seconds=45),
         )
-        workflow.logger.info(f"✓ Property valued at: ${valuation.estimated_value:,.2f}")
-        
-        # State 4: Underwriter Review
+        workflow.logger.info("✓ Property valued at: $%.2f", valuation.estimated_value)
+        return valuation
+    
+    async def _underwriter_review(
+        self,
+        credit: CreditCheckResult,
+        valuation: PropertyValuation,
+        requested_loan_amount: float
+    ) -> UnderwriterDecision:
+        """
+        State 4: Underwriter Review, halting the graph on a decline
+        """
         workflow.logger.info("State 4: Underwriter reviewing application...")
-        decision: UnderwriterDecision = await workflow.execute_activity(
+        decision: UnderwriterDecision = await ACTIVITY_ROUTER.execute(
             underwriter_review,
             args=[credit.credit_score, valuation.estimated_value, requested_loan_amount],
             start_to_close_timeout=timedelta(seconds=30),
         )
-        workflow.logger.info(f"✓ Underwriter decision: {decision.decision}")
+        workflow.logger.info("✓ Underwriter decision: %s", decision.decision)
+        self._rate_card_rule = f"{decision.rate_card_version}/{decision.rule_id}"
         
         # Check underwriter decision
         if decision.decision == "DECLINED":
             workflow.logger.warning("Application declined by underwriter")
-            return {
+            rejection = {
                 "status": "REJECTED",
                 "reason": "Application declined by underwriter",
-                "stage": "underwriter_review"
+                "stage": "underwriter_review",
             }
-        
-        # State 5: Sign Agreement
-        workflow.logger.info("State 5: Finalizing loan agreement...")
-        agreement: SignedAgreement = await workflow.execute_activity(
-            sign_agreement,
-            args=[applicant_name, decision.loan_amount_approved],
-            start_to_close_timeout=timedelta(seconds=30),
-        )
-        workflow.logger.info(f"✓ Agreement signed: {agreement.agreement_id}")
-        
-        # Return complete workflow result
-        workflow.logger.info("Loan application workflow completed successfully!")
-        
-        return {
+            self._decide(rejection)
+            raise StageGraphHalt("underwriter_review", rejection)
+        self._decide({
             "status": "APPROVED",
-            "applicant_name": applicant_name,
-            "property_address": property_address,
-            "requested_amount": requested_loan_amount,
+            "underwriter_decision": decision.decision,
             "approved_amount": decision.loan_amount_approved,
             "interest_rate": decision.interest_rate,
             "credit_score": credit.credit_score,
             "property_value": valuation.estimated_value,
-            "agreement_id": agreement.agreement_id,
-            "underwriter_decision": decision.decision,
-            "documents_collected": docs.documents,
-            "final_message": agreement.final_status
-        }
-
+        })
+        return decision
+    
+    async def _sign_agreement(
+        self,
+        applicant_name: str,
+        decision: UnderwriterDecision
+    ) -> SignedAgreement:
+        """
+        State 5: Sign Agreement
+        """
+        workflow.logger.info("State 5: Finalizing loan agreement...")
+        agreement: SignedAgreement = await ACTIVITY_ROUTER.execute(
+            sign_agreement,
+            args=[applicant_name, decision.loan_amount_approved],
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+        workflow.logger.info("✓ Agreement signed: %s", agreement.agreement_id)
+        return agreement
@@ -1,14 +1,93 @@
 from temporalio import activity
 import asyncio
+import logging
 from dataclasses import dataclass
 from datetime import datetime
+import os
 import random
+import time
+import uuid
+from typing import AsyncIterator
+from urllib.parse import quote
+from temporalio.exceptions import ApplicationError
 
+from loan_common.providers import provider_clients, provider_failures_as_application_errors
+from loan_common.simulation import simulate_latency
+from loan_common.task_routing import FAST, SLOW_IO, ActivityRouter
+from loan_common.ttl_cache import TTLCache
 
-# Custom exception for payment failures
-class PaymentFailedException(Exception):
-    """Raised when payment processing fails"""
-    pass
+# For code running outside an activity's context (e.g. simulated payments)
+logger = logging.getLogger(__name__)
+
+# Documents fetched for every application, in the order they are reported
+DOCUMENT_TYPES = ["aadhar", "pan", "bank_statement", "income_statement", "tax_return"]
+
+# Simulated provider documents: (value on the first line, body size in
+# bytes, seconds the provider takes to send the whole body)
+DOCUMENT_SOURCES = {
+    "aadhar": ("509239684498", 64 * 1024, 5),
+    "pan": ("ABCD123456", 64 * 1024, 1),
+    "bank_statement": ("1234567890", 8 * 1024 * 1024, 3),
+    "income_statement": ("100000", 1024 * 1024, 2),
+    "tax_return": ("1000000", 2 * 1024 * 1024, 0),
+}
+
+# Provider serving each document type
+DOCUMENT_PROVIDERS = {
+    "aadhar": "aadhar",
+    "pan": "pan",
+    "bank_statement": "bank",
+    "income_statement": "income",
+    "tax_return": "tax",
+}
+
+# fetch() types: the provider answering each, and the simulated answer
+# (value, seconds) used when that provider has no URL
+FETCH_ROUTES = {
+    "credit_score": "bureau",
+    "credit_history": "bureau",
+}
+SIMULATED_FIELDS = {
+    "credit_score": (750, 1),
+    "credit_history": ("Good standing, no defaults", 1),
+}
+
+# One pooled, rate-limited client per provider, shared by every activity in
+# the worker. Set LOAN_PROVIDER_URL (e.g. to provider_stub.py) or
+# PROVIDER_<NAME>_URL to call providers over HTTP; providers without a URL
+# are simulated in-process. Limits: see ProviderLimits.from_env.
+PROVIDERS = provider_clients(
+    [*DOCUMENT_PROVIDERS.values(), *dict.fromkeys(FETCH_ROUTES.values())],
+    os.environ.get("LOAN_PROVIDER_URL"),
+)
+
+# Downloads are streamed here chunk by chunk, so memory use per fetch is
+# bounded by DOCUMENT_CHUNK_BYTES whatever the document size
+DOCUMENT_DOWNLOAD_DIR = os.environ.get(
+    "DOCUMENT_DOWNLOAD_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloads"),
+)
+DOCUMENT_CHUNK_BYTES = int(os.environ.get("DOCUMENT_CHUNK_BYTES", str(256 * 1024)))
+# Downloads left behind by runs that never finished them (cancelled,
+# terminated or timed out) are deleted once this old
+DOCUMENT_DOWNLOAD_MAX_AGE_SECONDS = float(os.environ.get("DOCUMENT_DOWNLOAD_MAX_AGE_HOURS", "24")) * 3600
+
+# Worker-wide cache of credit bureau responses (score, history) per applicant.
+# Concurrent credit checks for the same applicant share one bureau call.
+CREDIT_BUREAU_CACHE: TTLCache[str, tuple[int, str]] = TTLCache(
+    max_entries=int(os.environ.get("CREDIT_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.environ.get("CREDIT_CACHE_TTL_SECONDS", "900")),
+)
+
+# When set (demos and benchmarks only), a simulated customer pays (or fails
+# to pay) every issued link and reports the outcome like the payment
+# provider's webhook would. Off by default: real outcomes arrive through
+# payment_webhook.py.
+SIMULATE_PAYMENTS = os.environ.get("SIMULATE_PAYMENTS", "0") == "1"
+
+# Payment statuses reported for a payment link
+PAYMENT_PAID = "PAID"
+PAYMENT_FAILED = "FAILED"
 
 @dataclass
 class DocumentCollection:
@@ -25,34 +104,110 @@ class CreditCheck:
     checked_at: str
     status: str
 
-@activity.defn(name="collect_docs")
-async def collect_docs(applicant_name: str) -> DocumentCollection:
-    aadhar_task=asyncio.create_task(fetch(applicant_name,type="aadhar" ))
-    pan_task=asyncio.create_task(fetch(applicant_name,type="pan"))
-    bank_statement_task=asyncio.create_task(fetch(applicant_name,type="bank_statement"))
-    income_statement_task=asyncio.create_task(fetch(applicant_name,type="income_statement"))
-    tax_return_task=asyncio.create_task(fetch(applicant_name,type="tax_return"))
-    aadhar=await aadhar_task
-    pan=await pan_task
-    bank_statement=await bank_statement_task
-    income_statement=await income_statement_task
-    tax_return=await tax_return_task
-    documents=[aadhar, pan, bank_statement, income_statement, tax_return]
-    print(documents)
-    result = DocumentCollection(
-        applicant_name=applicant_name,
-        documents=documents,
-        collected_at=datetime.now().isoformat(),
-        status="Documents collected successfully"
-    )
-    return result
+@dataclass
+class PaymentLink:
+    link_id: str
+    url: str
+    customer_id: str
+    issued_at: str
+
+@dataclass
+class PaymentConfirmation:
+    link_id: str
+    status: str
+    confirmed_at: str
+
+@activity.defn(name="fetch_document")
+async def fetch_document(applicant_name: str, doc_type: str) -> str:
+    """
+    Activity to fetch a single document from its provider.
+    Each document is scheduled (and retried) on its own, so one slow or
+    failing provider does not hold up or re-fetch the others.
+
+    The body is streamed to a file in DOCUMENT_DOWNLOAD_DIR named after the
+    workflow run, and the byte offset written so far is sent as heartbeat
+    details; a retried attempt resumes the download from the last
+    heartbeated offset. The file is deleted once its contents are read, and
+    a new run under the same workflow id starts from scratch.
+    """
+    if doc_type not in DOCUMENT_TYPES:
+        raise ApplicationError(f"Unknown document type: {doc_type}", non_retryable=True)
+    info = activity.info()
+    path = os.path.join(DOCUMENT_DOWNLOAD_DIR, quote(f"{info.workflow_run_id}-{doc_type}", safe=""))
+    if not os.path.exists(path):
+        with provider_failures_as_application_errors():
+            await download(applicant_name, doc_type, path)
+    with open(path, "rb") as f:
+        document = f.readline().decode().rstrip("\n")
+    os.remove(path)
+    activity.logger.info("Fetched %s for %s", doc_type, applicant_name)
+    return document
+
+async def download(applicant_name: str, doc_type: str, path: str) -> None:
+    """
+    Stream a document to path, resuming a previous attempt's partial file
+    """
+    partial_path = path + ".part"
+    details = activity.info().heartbeat_details
+    offset = int(details[0]) if details else 0
+    if offset and os.path.exists(partial_path):
+        # Bytes written after the last heartbeat may be incomplete
+        offset = min(offset, os.path.getsize(partial_path))
+    else:
+        offset = 0
+    activity.logger.info("Fetching %s for %s from byte %d", doc_type, applicant_name, offset)
+
+    os.makedirs(DOCUMENT_DOWNLOAD_DIR, exist_ok=True)
+    with open(partial_path, "r+b" if offset else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        async for chunk in stream_document(applicant_name, doc_type, offset):
+            await asyncio.to_thread(f.write, chunk)
+            offset += len(chunk)
+            activity.heartbeat(offset)
+    os.replace(partial_path, path)
+
+def remove_stale_downloads(max_age_seconds: float = DOCUMENT_DOWNLOAD_MAX_AGE_SECONDS) -> int:
+    """
+    Delete downloads (finished or partial) not written to for
+    max_age_seconds, returning how many
+    """
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        entries = list(os.scandir(DOCUMENT_DOWNLOAD_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Finished and removed by its activity meanwhile
+            pass
+    return removed
+
+async def purge_stale_downloads(interval_seconds: float = 3600) -> None:
+    """
+    Run remove_stale_downloads now and then every interval_seconds,
+    alongside the worker until cancelled
+    """
+    while True:
+        try:
+            removed = await asyncio.to_thread(remove_stale_downloads)
+            if removed:
+                logger.info("Removed %s stale document downloads", removed)
+        except OSError as e:
+            logger.warning("Removing stale document downloads failed: %s", e)
+        await asyncio.sleep(interval_seconds)
 
 @activity.defn(name="credit_check")
 async def credit_check(applicant_name: str) -> CreditCheck:
-    credit_score=asyncio.create_task(fetch(applicant_name,type="credit_score"))
-    credit_history=asyncio.create_task(fetch(applicant_name,type="credit_history"))
-    credit_score=await credit_score
-    credit_history=await credit_history
+    with provider_failures_as_application_errors():
+        credit_score, credit_history = await CREDIT_BUREAU_CACHE.get_or_load(
+            applicant_name, lambda: bureau_lookup(applicant_name)
+        )
     checked_at=datetime.now().isoformat()
     status="Credit check completed successfully"
     result = CreditCheck(
@@ -65,69 +220,125 @@ async def credit_check(applicant_name: str) -> CreditCheck:
     return result
 
 @activity.defn(name="login_fee")
-async def login_fee(applicant_name: str) -> str:
-    """
-    Activity to process login fee payment
-    Raises PaymentFailedException if payment fails (will trigger retry)
-    """
-    activity.logger.info(f"Processing login fee payment for {applicant_name}")
-    
-    task = asyncio.create_task(generate_payment_link(applicant_name))
-    payment_completion = await task
-    
-    if payment_completion:
-        activity.logger.info("Payment completed successfully, converting lead into a customer")
-        customer_id = "SFC012"
-        activity.logger.info(f"Customer ID generated: {customer_id}")
-        return customer_id
-    else:
-        # Raise exception instead of returning empty string
-        # This will trigger Temporal's retry mechanism
-        activity.logger.warning(f"Payment failed for {applicant_name}")
-        raise PaymentFailedException(f"Payment processing failed for applicant: {applicant_name}")
+async def login_fee(applicant_name: str) -> PaymentLink:
+    """
+    Activity to issue the login fee payment link.
+    It does not wait for the payment: the workflow waits for the payment
+    provider's confirmation (signal or update) without holding a slot.
+    """
+    activity.logger.info("Issuing login fee payment link for %s", applicant_name)
+    link = await generate_payment_link(applicant_name)
+    activity.logger.info("Payment link %s issued for %s", link.link_id, applicant_name)
+    if SIMULATE_PAYMENTS:
+        task = asyncio.create_task(
+            simulate_customer_payment(activity.client(), activity.info().workflow_id, link)
+        )
+        _SIMULATED_PAYMENTS.add(task)
+        task.add_done_callback(_SIMULATED_PAYMENTS.discard)
+    return link
 
 
 @activity.defn(name="finalizer")
 async def finalizer(customer_id: str) -> str:
     if(customer_id == "SFC012"):
-        print("Customer is new, creating a new customer")
-        print("returning customer id")
+        activity.logger.info("Customer %s is new, creating a new customer", customer_id)
         return "SFC012"
     else:
-        print("failed to convert lead into a customer")
+        activity.logger.warning("Failed to convert lead %s into a customer", customer_id)
         return ""
 
+# Each latency class runs on its own task queue and worker pool, so fast
+# steps never wait for slots held by slow provider calls. finalizer (FAST)
+# runs as a local activity in the workflow worker.
+ACTIVITY_ROUTER = ActivityRouter({
+    fetch_document: SLOW_IO,
+    credit_check: SLOW_IO,
+    login_fee: SLOW_IO,
+    finalizer: FAST,
+})
+
+# Dataclasses passed between workflow and activities; --compact-payloads
+# encodes these in a binary form instead of JSON
+PAYLOAD_DATACLASSES = [DocumentCollection, CreditCheck, PaymentLink, PaymentConfirmation]
+
 """
 -----------------------------------------------------------------------------------------------------------------
 """
 
 async def fetch(applicant_name: str, type: str):
-    if type == "aadhar":
-        await asyncio.sleep(5)
-        return "509239684498"
-    elif type == "pan":
-        await asyncio.sleep(1)
-        return "ABCD123456"
-    elif type == "bank_statement":
-        await asyncio.sleep(3)
-        return "1234567890"
-    elif type == "income_statement":
-        await asyncio.sleep(2)
-        return "100000"
-    elif type == "tax_return":
-        return "1000000"
-    elif type == "credit_score":
-        await asyncio.sleep(1)
-        return 750
-    elif type == "credit_history":
-        await asyncio.sleep(1)
-        return "Good standing, no defaults"
-
-async def generate_payment_link(applicant_name: str) -> str:
-    await asyncio.sleep(1)
-    if random.randint(0, 100) < 30:
-        return True
-    else:
-        return False
+    client = PROVIDERS.get(FETCH_ROUTES[type])
+    if client is None:
+        value, seconds = SIMULATED_FIELDS[type]
+        await simulate_latency(seconds)
+        return value
+    response = await client.get_json(f"/{type}", applicant=applicant_name)
+    return response["value"]
 
-asyncio.run(collect_docs("John Doe"))
\ No newline at end of file
+async def stream_document(applicant_name: str, doc_type: str, offset: int) -> AsyncIterator[bytes]:
+    """
+    Download a document body from offset onwards from its provider, in
+    chunks of at most DOCUMENT_CHUNK_BYTES
+    """
+    client = PROVIDERS.get(DOCUMENT_PROVIDERS[doc_type])
+    if client is None:
+        async for chunk in simulate_document(doc_type, offset):
+            yield chunk
+        return
+    async for chunk in client.stream(
+        "/document", DOCUMENT_CHUNK_BYTES, applicant=applicant_name, type=doc_type, offset=offset
+    ):
+        yield chunk
+
+async def simulate_document(doc_type: str, offset: int) -> AsyncIterator[bytes]:
+    """
+    Simulated provider download of a document body from offset onwards
+    """
+    value, size, seconds = DOCUMENT_SOURCES[doc_type]
+    header = f"{value}\n".encode()
+    while offset < size:
+        length = min(DOCUMENT_CHUNK_BYTES, size - offset)
+        await simulate_latency(seconds * length / size)
+        head = header[offset:offset + length]
+        yield head + b"." * (length - len(head))
+        offset += length
+
+async def bureau_lookup(applicant_name: str) -> tuple[int, str]:
+    credit_score, credit_history = await asyncio.gather(
+        fetch(applicant_name, type="credit_score"),
+        fetch(applicant_name, type="credit_history"),
+    )
+    return credit_score, credit_history
+
+async def generate_payment_link(applicant_name: str) -> PaymentLink:
+    await simulate_latency(1)
+    link_id = uuid.uuid4().hex
+    return PaymentLink(
+        link_id=link_id,
+        url=f"https://payments.example.com/pay/{link_id}",
+        customer_id="SFC012",
+        issued_at=datetime.now().isoformat(),
+    )
+
+# Simulated customers still paying; kept so their tasks are not garbage collected
+_SIMULATED_PAYMENTS: set[asyncio.Task] = set()
+
+async def simulate_customer_payment(client, workflow_id: str, link: PaymentLink):
+    """
+    A customer who tries to pay up to 3 times, each attempt succeeding 30%
+    of the time, then reports the outcome the way the provider webhook does
+    """
+    status = PAYMENT_FAILED
+    for _ in range(3):
+        await simulate_latency(1)
+        if random.randint(0, 100) < 30:
+            status = PAYMENT_PAID
+            break
+    confirmation = PaymentConfirmation(
+        link_id=link.link_id,
+        status=status,
+        confirmed_at=datetime.now().isoformat(),
+    )
+    try:
+        await client.get_workflow_handle(workflow_id).signal("payment_confirmed", confirmation)
+    except Exception as e:
+        logger.warning("Simulated payment could not be reported: %s", e, extra={"workflow_id": workflow_id})
@@ -0,0 +1,125 @@
+"""
+Payment Webhook Receiver
+Forwards payment provider callbacks to the waiting loan application workflows
+
+The provider POSTs each payment outcome to /payments/<workflow_id> with a
+JSON body {"link_id": ..., "status": "PAID" | "FAILED"}. The outcome is
+sent to the workflow as a confirm_payment update, so the provider gets a
+4xx response when the workflow rejects it (unknown link, already reported).
+
+Usage:
+    python payment_webhook.py --bind 127.0.0.1:8088
+    curl -X POST localhost:8088/payments/<workflow_id> \
+        -d '{"link_id": "...", "status": "PAID"}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from urllib.parse import unquote
+
+from temporalio.client import Client, WorkflowUpdateFailedError
+from temporalio.service import RPCError, RPCStatusCode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loan_common.data_converter import add_data_converter_arguments
+
+from activities import PAYMENT_FAILED, PAYMENT_PAID, PaymentConfirmation
+from run_workflow import connect
+
+# Largest request body accepted from the provider
+MAX_BODY_BYTES = 64 * 1024
+
+
+async def confirm_payment(client: Client, workflow_id: str, body: dict) -> tuple[int, dict]:
+    """
+    Deliver one provider callback, returning the HTTP status and response body
+    """
+    if body.get("status") not in (PAYMENT_PAID, PAYMENT_FAILED) or not body.get("link_id"):
+        return 400, {"error": f"Expected link_id and a status of {PAYMENT_PAID} or {PAYMENT_FAILED}"}
+    confirmation = PaymentConfirmation(
+        link_id=body["link_id"],
+        status=body["status"],
+        confirmed_at=datetime.now().isoformat(),
+    )
+    try:
+        status = await client.get_workflow_handle(workflow_id).execute_update(
+            "confirm_payment", confirmation, result_type=str
+        )
+    except WorkflowUpdateFailedError as e:
+        return 409, {"error": str(e.cause)}
+    except RPCError as e:
+        if e.status == RPCStatusCode.NOT_FOUND:
+            return 404, {"error": f"No running workflow {workflow_id}"}
+        raise
+    print(f"💳 {workflow_id}: payment {status}")
+    return 200, {"status": status}
+
+
+async def handle_connection(
+    client: Client, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        status, response = await handle_request(client, reader)
+    except Exception as e:
+        print(f"❌ Webhook request failed: {e}")
+        status, response = 500, {"error": "internal error"}
+    payload = json.dumps(response).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    writer.close()
+
+
+async def handle_request(client: Client, reader: asyncio.StreamReader) -> tuple[int, dict]:
+    request_line = (await reader.readline()).decode("latin-1").split()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if len(request_line) < 2 or request_line[0] != "POST" or not request_line[1].startswith("/payments/"):
+        return 404, {"error": "Expected POST /payments/<workflow_id>"}
+    length = int(headers.get("content-length", "0"))
+    if length > MAX_BODY_BYTES:
+        return 413, {"error": "Request body too large"}
+    try:
+        body = json.loads(await reader.readexactly(length))
+    except ValueError:
+        return 400, {"error": "Request body must be JSON"}
+    workflow_id = unquote(request_line[1][len("/payments/"):])
+    return await confirm_payment(client, workflow_id, body)
+
+
+async def main(args: argparse.Namespace):
+    client = await connect(args)
+    host, _, port = args.bind.rpartition(":")
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(client, reader, writer), host, int(port)
+    )
+    print(f"💳 Payment webhook listening on http://{args.bind}/payments/<workflow_id>")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Receive payment provider webhooks")
+    parser.add_argument(
+        "--bind",
+        default=os.environ.get("PAYMENT_WEBHOOK_BIND", "127.0.0.1:8088"),
+        help="host:port to listen on (env PAYMENT_WEBHOOK_BIND, default 127.0.0.1:8088)",
+    )
+    add_data_converter_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
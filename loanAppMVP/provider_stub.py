@@ -0,0 +1,140 @@
+"""
+Stand-in Provider
+Local HTTP server answering like the aadhar, PAN, bank, income, tax and bureau providers
+
+Serves the same values and document bodies the activities simulate
+in-process, with the same (scaled) latency, so the provider clients can be
+exercised end to end:
+
+    GET /<provider>/<field>?applicant=...                  -> {"value": ...}
+    GET /<provider>/document?type=...&offset=...&applicant=... -> document body
+
+--failure-rate answers that fraction of requests with 503 to exercise
+retries and the circuit breakers.
+
+Usage:
+    python provider_stub.py --bind 127.0.0.1:8089 --latency-scale 0.1
+    LOAN_PROVIDER_URL=http://127.0.0.1:8089 python worker.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loan_common import simulation
+
+from activities import DOCUMENT_PROVIDERS, DOCUMENT_SOURCES, FETCH_ROUTES, SIMULATED_FIELDS, simulate_document
+
+
+def write_head(writer: asyncio.StreamWriter, status: int, length: int, content_type: str) -> None:
+    writer.write(
+        f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {length}\r\n\r\n".encode()
+    )
+
+
+def write_json(writer: asyncio.StreamWriter, status: int, response: dict) -> None:
+    payload = json.dumps(response).encode()
+    write_head(writer, status, len(payload), "application/json")
+    writer.write(payload)
+
+
+async def serve_document(writer: asyncio.StreamWriter, provider: str, query: dict) -> None:
+    doc_type = query.get("type", "")
+    if DOCUMENT_PROVIDERS.get(doc_type) != provider:
+        write_json(writer, 404, {"error": f"{provider} does not serve {doc_type!r} documents"})
+        return
+    size = DOCUMENT_SOURCES[doc_type][1]
+    offset = int(query.get("offset", "0"))
+    if not 0 <= offset <= size:
+        write_json(writer, 416, {"error": f"offset must be between 0 and {size}"})
+        return
+    write_head(writer, 200, size - offset, "application/octet-stream")
+    async for chunk in simulate_document(doc_type, offset):
+        writer.write(chunk)
+        await writer.drain()
+
+
+async def serve_field(writer: asyncio.StreamWriter, provider: str, field: str) -> None:
+    if FETCH_ROUTES.get(field) != provider:
+        write_json(writer, 404, {"error": f"{provider} does not serve {field!r}"})
+        return
+    value, seconds = SIMULATED_FIELDS[field]
+    await simulation.simulate_latency(seconds)
+    write_json(writer, 200, {"value": value})
+
+
+async def handle_connection(
+    args: argparse.Namespace, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """
+    Answer requests on one keep-alive connection until the client closes it
+    """
+    try:
+        while True:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if not request_line:
+                break
+            while (await reader.readline()).strip():
+                pass
+            url = urlsplit(request_line[1] if len(request_line) > 1 else "/")
+            query = {name: values[0] for name, values in parse_qs(url.query).items()}
+            provider, _, field = url.path.strip("/").partition("/")
+            if request_line[0] != "GET" or not field:
+                write_json(writer, 404, {"error": "Expected GET /<provider>/<field>"})
+            elif random.random() < args.failure_rate:
+                write_json(writer, 503, {"error": f"{provider} is temporarily unavailable"})
+            elif field == "document":
+                await serve_document(writer, provider, query)
+            else:
+                await serve_field(writer, provider, field)
+            await writer.drain()
+    except (ConnectionError, ValueError) as e:
+        print(f"❌ Provider request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def main(args: argparse.Namespace):
+    simulation.LATENCY_SCALE = args.latency_scale
+    host, _, port = args.bind.rpartition(":")
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(args, reader, writer), host, int(port)
+    )
+    print(
+        f"🏦 Stand-in providers listening on http://{args.bind} "
+        f"(latency x{args.latency_scale}, failure rate {args.failure_rate:.0%})"
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve stand-in provider responses over HTTP")
+    parser.add_argument(
+        "--bind",
+        default=os.environ.get("PROVIDER_STUB_BIND", "127.0.0.1:8089"),
+        help="host:port to listen on (env PROVIDER_STUB_BIND, default 127.0.0.1:8089)",
+    )
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=simulation.LATENCY_SCALE,
+        help="Multiplier on each provider's latency (env LOAN_LATENCY_SCALE, default 1.0)",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with 503 (default 0)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -2,17 +2,54 @@
 Workflow Client
 Starts a new loan application workflow
 """
-import asyncio
+import argparse
+import os
 import sys
-from temporalio.client import Client
+from datetime import timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loan_common.bulk_submit import DECISION_UPDATE, WorkflowStart
+from loan_common.idempotency import ATTACHED, REUSED, submit_idempotent
+from loan_common.submit_cli import WORKFLOW_TYPE, SubmitCli, workflow_id_for
+from loan_common.task_routing import WORKFLOW_TASK_QUEUE
 
-async def main():
+
+def build_start(applicant: dict) -> WorkflowStart:
+    """
+    Map a bulk applicant record (applicant_name and optional workflow_id)
+    to a workflow start
+    """
+    application = [applicant["applicant_name"]]
+    return WorkflowStart(
+        workflow_id=applicant.get("workflow_id") or workflow_id_for(application),
+        args=application,
+    )
+
+
+def payload_dataclasses() -> list[type]:
+    # Imported on demand so plain submissions do not load the activities
+    from activities import PAYLOAD_DATACLASSES
+    return PAYLOAD_DATACLASSES
+
+
+def reusable_result(result: dict) -> bool:
+    """
+    Only a successful application is reused; a resubmission after a failed
+    or timed-out payment runs it again
+    """
+    return result.get("status") == "SUCCESS"
+
+
+CLI = SubmitCli(build_start, payload_dataclasses, reusable_result)
+connect = CLI.connect
+
+
+async def main(args: argparse.Namespace):
     """
     Start a loan application workflow
     """
     # Connect to Temporal server
-    client = await Client.connect("localhost:7233")
+    client = await connect(args)
     
     # Loan application details
     applicant_name = "Chandrahaas Jasti"
@@ -28,16 +65,41 @@ async def main():
     print("=" * 70)
     print("\n🚀 Starting workflow execution...\n")
     
-    # Start the workflow
-    workflow_id = f"loan-application-{applicant_name.replace(' ', '-').lower()}"
-    
-    result = await client.execute_workflow(
-        "LoanApplicationWorkflow",
-        args=[applicant_name],
-        id=workflow_id,
-        task_queue="loan-application-queue",
+    # Start the workflow together with the early-decision update, which
+    # returns as soon as the application is decided. A resubmission of the
+    # same application attaches to its running workflow or reuses a recent
+    # result instead of running it again.
+    application = [applicant_name]
+    workflow_id = workflow_id_for(application)
+    submission = await submit_idempotent(
+        client,
+        WORKFLOW_TYPE,
+        WORKFLOW_TASK_QUEUE,
+        workflow_id,
+        application,
+        decision_update=DECISION_UPDATE,
+        reuse_window=timedelta(seconds=args.reuse_window),
+        reusable=reusable_result,
     )
     
+    if submission.outcome == REUSED:
+        print(f"♻️  Completed recently, reusing the result of {workflow_id}")
+        result = submission.result
+    else:
+        if submission.outcome == ATTACHED:
+            print(f"🔗 Already running, attached to {workflow_id}")
+        decision = await submission.decision.result()
+        print(f"💳 Payment link: {decision['payment_link']}")
+        print(f"📈 Credit Score: {decision['credit_score']}")
+        
+        if args.decision_only:
+            print(f"\n⏩ Not waiting for completion. Progress: "
+                  f"temporal workflow query --workflow-id {workflow_id} --type progress")
+            return
+        
+        print(f"⏳ Progress: {await submission.handle.query('progress')}")
+        result = await submission.handle.result()
+    
     # Print results
     print("\n" + "=" * 70)
     print("📊 WORKFLOW RESULTS")
@@ -59,5 +121,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    CLI.run(main)
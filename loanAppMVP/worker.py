@@ -1,26 +1,58 @@
-from temporalio.client import Client
-from temporalio.worker import Worker
+"""
+Temporal Worker
+Polls for tasks and executes workflows and activities
+"""
+import argparse
 import asyncio
+import os
+import sys
 
-from activities import collect_docs, credit_check, login_fee, finalizer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loan_common.supervisor import ProcessTaskCounter
+from loan_common.worker_cli import WorkerCli
+
+import activities
+from activities import ACTIVITY_ROUTER, CREDIT_BUREAU_CACHE, PAYLOAD_DATACLASSES, purge_stale_downloads
+from run_workflow import build_start
 from workflow import LoanApplicationWorkflow
 
-async def main():
-    client = await Client.connect("localhost:7233")
 
-    worker = Worker(
-        client,
-        #namespace="loan-application-namespace",
-        task_queue="loan-application-queue",
-        workflows=[LoanApplicationWorkflow],
-        activities=[collect_docs, credit_check, login_fee, finalizer],
+def add_payment_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--simulate-payments",
+        action="store_true",
+        default=activities.SIMULATE_PAYMENTS,
+        help="Have a simulated customer pay every issued payment link, for demos "
+             "without a payment provider (env SIMULATE_PAYMENTS=1)",
     )
-    print("🚀 Starting Temporal Worker...")
-    print("📋 Task Queue: loan-application-queue")
-    print("⏳ Waiting for workflow executions...\n")
 
-    await worker.run()
+
+def configure_payments(args: argparse.Namespace) -> None:
+    activities.SIMULATE_PAYMENTS = args.simulate_payments
+    if args.simulate_payments:
+        print("💳 Simulating customer payments")
+
+
+WORKER = WorkerCli(
+    LoanApplicationWorkflow,
+    ACTIVITY_ROUTER,
+    PAYLOAD_DATACLASSES,
+    build_start,
+    CREDIT_BUREAU_CACHE,
+    housekeeping=[purge_stale_downloads],
+    add_arguments=add_payment_arguments,
+    configure=configure_payments,
+)
+main = WORKER.main
+
+
+def run_worker_process(args: argparse.Namespace, counter: ProcessTaskCounter):
+    """
+    Entry point of each supervised worker process
+    """
+    asyncio.run(main(args, counter))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    WORKER.run(run_worker_process)
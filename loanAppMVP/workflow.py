@@ -1,83 +1,272 @@
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from dataclasses import dataclass
 from datetime import timedelta
+from typing import Optional
+import asyncio
 
 with workflow.unsafe.imports_passed_through():
     from activities import (
-        collect_docs,
+        fetch_document,
         credit_check,
         login_fee,
         finalizer,
-        PaymentFailedException
+        DocumentCollection,
+        PaymentConfirmation,
+        PaymentLink,
+        DOCUMENT_TYPES,
+        ACTIVITY_ROUTER,
+        PAYMENT_PAID
     )
 
+
+# Fetches stream and heartbeat their progress: a hung download is noticed
+# after DOCUMENT_HEARTBEAT_TIMEOUT, while a large one that keeps making
+# progress may run up to DOCUMENT_FETCH_TIMEOUT
+DOCUMENT_HEARTBEAT_TIMEOUT = timedelta(seconds=10)
+DOCUMENT_FETCH_TIMEOUT = timedelta(minutes=10)
+
+
+# How long the customer has to pay the login fee once the link is issued
+PAYMENT_DEADLINE = timedelta(hours=1)
+
+# How long finalization waits for optional documents still being fetched;
+# the application is finalized without those that have not arrived by then
+OPTIONAL_DOCUMENT_WAIT = timedelta(seconds=30)
+
+
+@dataclass(frozen=True)
+class DocumentFetchPolicy:
+    """How a single document fetch is scheduled"""
+    required: bool
+    retry_policy: RetryPolicy
+    heartbeat_timeout: timedelta = DOCUMENT_HEARTBEAT_TIMEOUT
+
+
+# Required documents gate the credit check; optional ones keep fetching in
+# the background (never holding up the payment link) and are reported only
+# if they arrive before finalization.
+DOCUMENT_FETCH_POLICIES = {
+    "aadhar": DocumentFetchPolicy(
+        required=True,
+        retry_policy=RetryPolicy(initial_interval=timedelta(seconds=1), maximum_attempts=5),
+    ),
+    "pan": DocumentFetchPolicy(
+        required=True,
+        retry_policy=RetryPolicy(initial_interval=timedelta(seconds=1), maximum_attempts=5),
+    ),
+    "bank_statement": DocumentFetchPolicy(
+        required=True,
+        retry_policy=RetryPolicy(initial_interval=timedelta(seconds=1), maximum_attempts=5),
+    ),
+    "income_statement": DocumentFetchPolicy(
+        required=False,
+        retry_policy=RetryPolicy(initial_interval=timedelta(seconds=1), maximum_attempts=3),
+    ),
+    "tax_return": DocumentFetchPolicy(
+        required=False,
+        retry_policy=RetryPolicy(initial_interval=timedelta(seconds=1), maximum_attempts=3),
+    ),
+}
+
 @workflow.defn(name="LoanApplicationWorkflow")
 class LoanApplicationWorkflow:
 
+    def __init__(self) -> None:
+        # Documents fetched so far, kept across retries of the other fetches
+        self._documents: dict[str, str] = {}
+        # Login fee payment link, and reported payment outcomes by link id.
+        # A report can arrive in the same workflow task as the link itself,
+        # before it is recorded, so reports are kept until the link is known.
+        self._payment_link: Optional[PaymentLink] = None
+        self._payments: dict[str, PaymentConfirmation] = {}
+        # Current step, and the early response (payment link) once issued
+        self._stage = "documents"
+        self._decision: Optional[dict] = None
+
     @workflow.run
     async def run(self, applicant_name: str) -> dict:
-        workflow.logger.info(f"Starting loan application workflow for {applicant_name}")
+        workflow.logger.info("Starting loan application workflow for %s", applicant_name)
         
-        # Step 1: Collect documents
-        docs = await workflow.execute_activity(
-            collect_docs,
-            applicant_name,
-            start_to_close_timeout=timedelta(seconds=30),
-        )
+        # Step 1: Fetch every document as its own activity
+        fetches = {
+            doc_type: asyncio.create_task(self._fetch_document(applicant_name, doc_type))
+            for doc_type in DOCUMENT_TYPES
+        }
+        required = [
+            fetches[doc_type]
+            for doc_type in DOCUMENT_TYPES
+            if DOCUMENT_FETCH_POLICIES[doc_type].required
+        ]
+        await asyncio.gather(*required)
+        workflow.logger.info("Required documents collected for %s", applicant_name)
         
-        # Step 2: Run credit check
-        credit = await workflow.execute_activity(
+        # Step 2: Run credit check while optional documents are still arriving
+        self._stage = "credit_check"
+        credit = await ACTIVITY_ROUTER.execute(
             credit_check,
-            applicant_name,
+            args=[applicant_name],
             start_to_close_timeout=timedelta(seconds=30),
         )
-
-        # Step 3: Process login fee with retry policy (max 3 attempts)
-        # Configure retry policy for payment processing
-        payment_retry_policy = RetryPolicy(
-            initial_interval=timedelta(seconds=1),  # Wait 1 second before first retry
-            backoff_coefficient=2.0,                 # Double the wait time with each retry
-            maximum_interval=timedelta(seconds=5),   # Max 5 seconds between retries
-            maximum_attempts=3                       # Try maximum 3 times (1 initial + 2 retries)
+        
+        # Step 3: Issue the login fee payment link, then wait (without
+        # holding a worker slot) for the provider to confirm the payment
+        self._stage = "login_fee"
+        self._payment_link = await ACTIVITY_ROUTER.execute(
+            login_fee,
+            args=[applicant_name],
+            start_to_close_timeout=timedelta(seconds=30),
         )
+        self._stage = "awaiting_payment"
+        self._decision = {
+            "status": "PAYMENT_PENDING",
+            "applicant_name": applicant_name,
+            "credit_score": credit.credit_score,
+            "payment_link": self._payment_link.url,
+            "link_id": self._payment_link.link_id,
+        }
+        
+        try:
+            await workflow.wait_condition(
+                lambda: self._payment() is not None, timeout=PAYMENT_DEADLINE
+            )
+        except asyncio.TimeoutError:
+            workflow.logger.error("Payment not confirmed within %s", PAYMENT_DEADLINE)
+            return self._payment_failed(
+                applicant_name, self._collected(applicant_name), credit.credit_score, "Payment not confirmed before the deadline"
+            )
+        
+        payment = self._payment()
+        if payment.status != PAYMENT_PAID:
+            workflow.logger.error("Payment reported as %s", payment.status)
+            return self._payment_failed(
+                applicant_name, self._collected(applicant_name), credit.credit_score, f"Payment {payment.status}"
+            )
+        workflow.logger.info("Payment successful for %s", applicant_name)
         
+        # Step 4: Finalize customer creation, with the optional documents
+        # that arrive within OPTIONAL_DOCUMENT_WAIT
+        self._stage = "finalizing"
         try:
-            customer_id = await workflow.execute_activity(
-                login_fee,
-                applicant_name,
-                start_to_close_timeout=timedelta(seconds=30),
-                retry_policy=payment_retry_policy
+            await workflow.wait_condition(
+                lambda: all(fetch.done() for fetch in fetches.values()),
+                timeout=OPTIONAL_DOCUMENT_WAIT,
             )
-            workflow.logger.info(f"Payment successful for {applicant_name}")
-            
-            # Step 4: Finalize customer creation
-            final_customer_id = await workflow.execute_activity(
-                finalizer,
-                customer_id,
-                start_to_close_timeout=timedelta(seconds=30),
+        except asyncio.TimeoutError:
+            workflow.logger.warning("Finalizing without optional documents still being fetched")
+        docs = self._collected(applicant_name)
+        final_customer_id = await ACTIVITY_ROUTER.execute(
+            finalizer,
+            args=[self._payment_link.customer_id],
+            start_to_close_timeout=timedelta(seconds=30),
+        )
+        
+        self._stage = "completed"
+        return {
+            "status": "SUCCESS",
+            "applicant_name": applicant_name,
+            "customer_id": final_customer_id,
+            "docs": docs.documents,
+            "credit_score": credit.credit_score,
+            "payment_status": "COMPLETED",
+            "message": f"Successfully processed application for {applicant_name}"
+        }
+
+    @workflow.signal(name="payment_confirmed")
+    def payment_confirmed(self, confirmation: PaymentConfirmation) -> None:
+        """
+        Payment outcome reported by the payment provider's webhook
+        """
+        if self._payment_link is not None and confirmation.link_id != self._payment_link.link_id:
+            workflow.logger.warning("Ignoring confirmation for unknown payment link %s", confirmation.link_id)
+            return
+        self._payments.setdefault(confirmation.link_id, confirmation)
+
+    @workflow.update(name="confirm_payment")
+    def confirm_payment(self, confirmation: PaymentConfirmation) -> str:
+        """
+        Like the payment_confirmed signal, but tells the caller whether the
+        confirmation was accepted
+        """
+        self._payments[confirmation.link_id] = confirmation
+        return confirmation.status
+
+    @confirm_payment.validator
+    def validate_confirm_payment(self, confirmation: PaymentConfirmation) -> None:
+        if self._payment_link is not None and confirmation.link_id != self._payment_link.link_id:
+            raise ValueError(f"Unknown payment link {confirmation.link_id}")
+        reported = self._payments.get(confirmation.link_id)
+        if reported is not None:
+            raise ValueError(f"Payment already reported as {reported.status}")
+
+    @workflow.update(name="wait_for_decision")
+    async def wait_for_decision(self) -> dict:
+        """
+        Return as soon as the login fee payment link is issued, so the
+        customer can be sent to it without waiting for the payment
+        """
+        await workflow.wait_condition(lambda: self._decision is not None)
+        return self._decision
+
+    @workflow.query(name="progress")
+    def progress(self) -> dict:
+        """
+        The current step and, once issued, the payment link response
+        """
+        return {"stage": self._stage, "decision": self._decision}
+
+    @workflow.query(name="payment_link")
+    def payment_link(self) -> Optional[PaymentLink]:
+        """
+        The issued payment link, for showing to the customer
+        """
+        return self._payment_link
+
+    def _payment(self) -> Optional[PaymentConfirmation]:
+        if self._payment_link is None:
+            return None
+        return self._payments.get(self._payment_link.link_id)
+
+    def _collected(self, applicant_name: str) -> DocumentCollection:
+        """
+        The documents fetched so far, in DOCUMENT_TYPES order
+        """
+        return DocumentCollection(
+            applicant_name=applicant_name,
+            documents=[self._documents[t] for t in DOCUMENT_TYPES if t in self._documents],
+            collected_at=workflow.now().isoformat(),
+            status="Documents collected successfully"
+        )
+
+    def _payment_failed(
+        self, applicant_name: str, docs: DocumentCollection, credit_score: int, error: str
+    ) -> dict:
+        self._stage = "payment_failed"
+        return {
+            "status": "FAILED",
+            "applicant_name": applicant_name,
+            "customer_id": None,
+            "docs": docs.documents,
+            "credit_score": credit_score,
+            "payment_status": "FAILED",
+            "error": error,
+            "message": f"Payment processing failed for {applicant_name}"
+        }
+
+    async def _fetch_document(self, applicant_name: str, doc_type: str) -> str:
+        policy = DOCUMENT_FETCH_POLICIES[doc_type]
+        try:
+            document = await ACTIVITY_ROUTER.execute(
+                fetch_document,
+                args=[applicant_name, doc_type],
+                start_to_close_timeout=DOCUMENT_FETCH_TIMEOUT,
+                heartbeat_timeout=policy.heartbeat_timeout,
+                retry_policy=policy.retry_policy,
             )
-            
-            return {
-                "status": "SUCCESS",
-                "applicant_name": applicant_name,
-                "customer_id": final_customer_id,
-                "docs": docs.documents,
-                "credit_score": credit.credit_score,
-                "payment_status": "COMPLETED",
-                "message": f"Successfully processed application for {applicant_name}"
-            }
-            
         except Exception as e:
-            # Payment failed after all retry attempts (3 attempts)
-            workflow.logger.error(f"Payment processing failed after all retry attempts: {e}")
-            
-            return {
-                "status": "FAILED",
-                "applicant_name": applicant_name,
-                "customer_id": None,
-                "docs": docs.documents,
-                "credit_score": credit.credit_score,
-                "payment_status": "FAILED",
-                "error": str(e),
-                "message": f"Payment processing failed for {applicant_name} after 3 attempts"
-            }
\ No newline at end of file
+            if policy.required:
+                raise
+            workflow.logger.warning("Optional document %s unavailable: %s", doc_type, e)
+            return ""
+        self._documents[doc_type] = document
+        return document
@@ -0,0 +1,3 @@
+"""
+Shared helpers used by both loan application apps (loanAppMVP and cursor_made)
+"""
@@ -0,0 +1,133 @@
+"""
+Blob Store
+Content-addressed local storage for large document bodies (claim checks)
+"""
+import contextlib
+import hashlib
+import mmap
+import os
+import tempfile
+import time
+from typing import Iterator
+from urllib.parse import quote
+
+
+class BlobStore:
+    """
+    Stores blobs on disk under their SHA-256 digest, so only the digest needs
+    to travel through activity payloads and workflow history.
+
+    Identical bodies are stored once. Each workflow records the digests it
+    uses in its own reference file; collect_garbage() deletes blobs that no
+    reference file mentions. Several worker processes on one host can share
+    a store: blobs are written to a temporary file and renamed into place,
+    and reference files are only ever appended to or removed.
+
+    Args:
+        root: Directory holding blobs/ and refs/
+        grace_seconds: Unreferenced blobs younger than this are kept, so a
+            blob written just before its reference is recorded is not lost
+        max_ref_age_seconds: Reference files not touched for this long are
+            treated as abandoned (e.g. their workflow was terminated)
+    """
+
+    def __init__(self, root: str, grace_seconds: float = 300, max_ref_age_seconds: float = 7 * 86400):
+        self._blobs = os.path.join(root, "blobs")
+        self._refs = os.path.join(root, "refs")
+        self._grace = grace_seconds
+        self._max_ref_age = max_ref_age_seconds
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._refs, exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blobs, digest[:2], digest)
+
+    def _ref_path(self, owner: str) -> str:
+        return os.path.join(self._refs, quote(owner, safe=""))
+
+    def put(self, data: bytes, owner: str) -> str:
+        """
+        Store data (if not already stored) and record that owner uses it
+
+        Returns:
+            The blob's digest
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        try:
+            # Refresh the mtime so a concurrent collect_garbage() keeps it
+            os.utime(path)
+        except FileNotFoundError:
+            # Not stored yet, or collected since it was last used
+            self._write(path, data)
+        with open(self._ref_path(owner), "a") as f:
+            f.write(digest + "\n")
+        return digest
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def open(self, digest: str) -> Iterator[memoryview]:
+        """
+        Memory-map a blob read-only. The view is only valid inside the
+        with block and must not be kept after it.
+        """
+        with open(self._blob_path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def release(self, owner: str) -> None:
+        """
+        Drop every reference held by owner
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._ref_path(owner))
+
+    def collect_garbage(self) -> int:
+        """
+        Delete blobs no live reference file mentions, returning how many.
+        This reads every reference file and lists every blob, so run it
+        periodically in the background rather than per release.
+        """
+        now = time.time()
+        live: set[str] = set()
+        for entry in os.scandir(self._refs):
+            try:
+                if now - entry.stat().st_mtime > self._max_ref_age:
+                    os.unlink(entry.path)
+                    continue
+                with open(entry.path) as f:
+                    live.update(line.strip() for line in f)
+            except FileNotFoundError:
+                # Released by another process while scanning
+                continue
+        deleted = 0
+        for shard in os.scandir(self._blobs):
+            for entry in os.scandir(shard.path):
+                # Temporary files belong to a put() still in progress
+                if entry.name in live or entry.name.startswith("tmp"):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime < self._grace:
+                        continue
+                    os.unlink(entry.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    continue
+        return deleted
@@ -0,0 +1,297 @@
+"""
+Bulk Submitter
+Starts many loan application workflows over one client connection
+"""
+import asyncio
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Iterator, Optional, TextIO, Union
+
+from temporalio.client import Client
+
+from loan_common.idempotency import ATTACHED, DEFAULT_REUSE_WINDOW, REUSED, submit_idempotent
+
+# Update both LoanApplicationWorkflows answer as soon as the application is
+# decided, long before the workflow itself completes
+DECISION_UPDATE = "wait_for_decision"
+
+
+@dataclass
+class WorkflowStart:
+    """
+    Everything needed to start one workflow for one applicant
+    """
+    workflow_id: str
+    args: list[Any]
+
+
+class MalformedRecord(Exception):
+    """
+    An input record that could not be parsed; read_applicants yields these
+    in the record's place so one bad line does not end the run
+    """
+
+    def __init__(self, where: str, message: str):
+        super().__init__(f"{where}: {message}")
+        self.where = where
+
+
+@dataclass
+class LatencyStats:
+    """
+    Collects latency samples (in seconds) and reports percentiles
+    """
+    samples: list[float] = field(default_factory=list)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Nearest-rank percentile, 0.0 when there are no samples
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(1, round(pct / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class BulkReport:
+    """
+    Summary of a bulk submission run
+    """
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    # Records that could not be parsed or turned into a workflow start
+    invalid: int = 0
+    # Duplicates served by a running workflow or a recent result
+    attached: int = 0
+    reused: int = 0
+    elapsed: float = 0.0
+    start_latency: LatencyStats = field(default_factory=LatencyStats)
+    decision_latency: LatencyStats = field(default_factory=LatencyStats)
+    completion_latency: LatencyStats = field(default_factory=LatencyStats)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Finished workflows (completed or failed) per second
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return (self.completed + self.failed) / self.elapsed
+
+    def summary(self) -> str:
+        lines = [
+            f"Submitted: {self.submitted}  Completed: {self.completed}  Failed: {self.failed}"
+            f"  Attached: {self.attached}  Reused: {self.reused}  Invalid: {self.invalid}",
+            f"Elapsed: {self.elapsed:.2f}s  Throughput: {self.throughput:.2f} workflows/s",
+        ]
+        for label, stats in [
+            ("Start latency", self.start_latency),
+            ("Decision latency", self.decision_latency),
+            ("Completion latency", self.completion_latency),
+        ]:
+            if stats.samples:
+                lines.append(
+                    f"{label + ':':<20}p50={stats.percentile(50) * 1000:.1f}ms"
+                    f"  p99={stats.percentile(99) * 1000:.1f}ms"
+                )
+        return "\n".join(lines)
+
+
+def read_applicants_at(
+    path: str, position: int = 0
+) -> Iterator[tuple[Union[dict[str, Any], MalformedRecord], int]]:
+    """
+    Stream applicant records from a CSV (with header row) or JSONL file,
+    each with the byte position just after it
+
+    Reading starts at position, which must be 0 or a position yielded
+    earlier, so a reader can stop and later resume where it left off
+    without re-reading what came before. A line that is not a JSON object
+    is yielded as a MalformedRecord instead.
+    """
+    with open(path, "rb") as f:
+        if path.endswith(".csv"):
+            fieldnames = next(csv.reader([f.readline().decode()]), [])
+            if position:
+                f.seek(position)
+            end = f.tell()
+
+            def lines() -> Iterator[str]:
+                nonlocal end
+                for line in iter(f.readline, b""):
+                    end = f.tell()
+                    yield line.decode()
+
+            # The reader only pulls the lines of the row it returns, so end
+            # is the position just after that row
+            for row in csv.DictReader(lines(), fieldnames=fieldnames):
+                yield row, end
+            return
+        f.seek(position)
+        number = 0
+        while True:
+            start = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            number += 1
+            line = line.strip()
+            if not line:
+                continue
+            where = f"line {number}" if position == 0 else f"byte {start}"
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield MalformedRecord(where, str(e)), f.tell()
+                continue
+            if isinstance(record, dict):
+                yield record, f.tell()
+            else:
+                yield MalformedRecord(where, "not a JSON object"), f.tell()
+
+
+def read_applicants(path: str) -> Iterator[Union[dict[str, Any], MalformedRecord]]:
+    """
+    Stream applicant records from a CSV (with header row) or JSONL file
+
+    Records are yielded one at a time so arbitrarily large files can be
+    submitted without loading them into memory. A line that is not a JSON
+    object is yielded as a MalformedRecord instead.
+    """
+    for record, _ in read_applicants_at(path):
+        yield record
+
+
+async def submit_bulk(
+    client: Client,
+    workflow: str,
+    task_queue: str,
+    applicants: Iterator[Union[dict[str, Any], MalformedRecord]],
+    build_start: Callable[[dict[str, Any]], WorkflowStart],
+    output: TextIO,
+    max_in_flight: int = 100,
+    decision_update: Optional[str] = None,
+    wait_for_result: bool = True,
+    reuse_window: timedelta = DEFAULT_REUSE_WINDOW,
+    reusable: Optional[Callable[[Any], bool]] = None,
+) -> BulkReport:
+    """
+    Start a workflow per applicant with at most max_in_flight running at once
+
+    Submission is idempotent (see submit_idempotent): an applicant whose
+    workflow id is already running attaches to it, and one that completed
+    within reuse_window with a reusable result gets that result without a
+    new workflow.
+
+    Each result is written to output as a JSON line as soon as its workflow
+    finishes, so the output order follows completion, not submission.
+    Records that are malformed or rejected by build_start are written with
+    status "invalid" and counted, and the run carries on.
+
+    Args:
+        client: Shared client connection used for every start
+        workflow: Workflow type name
+        task_queue: Task queue the workflows are started on
+        applicants: Applicant records, e.g. from read_applicants
+        build_start: Maps an applicant record to its workflow id and args
+        output: Text stream receiving one JSON line per finished workflow
+        max_in_flight: Maximum number of started-but-unfinished workflows
+        decision_update: Update started together with each workflow
+            (update-with-start) whose result is recorded as "decision"
+        wait_for_result: Whether to wait for each workflow's result; when
+            False an applicant is done once its decision update returns
+        reuse_window: How old a completed duplicate's result may be
+        reusable: Whether a completed duplicate's result may be reused
+            (any result when None)
+
+    Returns:
+        Counts, throughput and start/completion latency percentiles
+    """
+    def write(record: dict[str, Any]) -> None:
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+
+    report = BulkReport()
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks: set[asyncio.Task] = set()
+
+    async def run_one(start: WorkflowStart) -> None:
+        record: dict[str, Any] = {"workflow_id": start.workflow_id}
+        submitted_at = time.perf_counter()
+        try:
+            submission = await submit_idempotent(
+                client,
+                workflow,
+                task_queue,
+                start.workflow_id,
+                start.args,
+                decision_update=decision_update,
+                reuse_window=reuse_window,
+                reusable=reusable,
+            )
+            record["submission"] = submission.outcome
+            report.start_latency.add(time.perf_counter() - submitted_at)
+            if submission.outcome == ATTACHED:
+                report.attached += 1
+            if submission.outcome == REUSED:
+                report.reused += 1
+                record["result"] = submission.result
+                report.completion_latency.add(time.perf_counter() - submitted_at)
+                record["status"] = "completed"
+            else:
+                if submission.decision is not None:
+                    record["decision"] = await submission.decision.result()
+                    report.decision_latency.add(time.perf_counter() - submitted_at)
+                if wait_for_result:
+                    record["result"] = await submission.handle.result()
+                    report.completion_latency.add(time.perf_counter() - submitted_at)
+                    record["status"] = "completed"
+                else:
+                    record["status"] = "decided"
+            report.completed += 1
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+            report.failed += 1
+        finally:
+            slots.release()
+        write(record)
+
+    began = time.perf_counter()
+    applicants = iter(applicants)
+    number = 0
+    while True:
+        # Wait for a free slot before pulling the next record, so only
+        # max_in_flight applicants are held in memory at a time
+        await slots.acquire()
+        applicant = next(applicants, None)
+        if applicant is None:
+            slots.release()
+            break
+        number += 1
+        try:
+            if isinstance(applicant, MalformedRecord):
+                raise applicant
+            start = build_start(applicant)
+        except Exception as e:
+            slots.release()
+            report.invalid += 1
+            write({"record": number, "status": "invalid", "error": f"{type(e).__name__}: {e}"})
+            continue
+        task = asyncio.create_task(run_one(start))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        report.submitted += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+    report.elapsed = time.perf_counter() - began
+    return report
@@ -0,0 +1,253 @@
+"""
+Data Converter
+Opt-in payload compression and a compact binary encoding for the loan
+dataclasses. Both decode payloads written by the default JSON converter.
+"""
+import argparse
+import dataclasses
+import os
+import struct
+import typing
+import zlib
+from typing import Any, Callable, Optional, Sequence
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import (
+    CompositePayloadConverter,
+    DataConverter,
+    DefaultPayloadConverter,
+    EncodingPayloadConverter,
+    PayloadCodec,
+)
+
+COMPRESSED_ENCODING = b"binary/zlib"
+COMPACT_ENCODING = b"binary/loan-compact"
+
+
+class CompressionCodec(PayloadCodec):
+    """
+    Compresses payloads larger than threshold_bytes with zlib.
+
+    Smaller payloads, and payloads that do not shrink, are left untouched.
+    Decoding passes through anything not marked binary/zlib, so histories
+    written before compression was turned on still decode.
+    """
+
+    def __init__(self, threshold_bytes: int = 1024, level: int = 6):
+        self._threshold = threshold_bytes
+        self._level = level
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._encode_one(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._decode_one(payload) for payload in payloads]
+
+    def _encode_one(self, payload: Payload) -> Payload:
+        serialized = payload.SerializeToString()
+        if len(serialized) < self._threshold:
+            return payload
+        compressed = zlib.compress(serialized, self._level)
+        if len(compressed) >= len(serialized):
+            return payload
+        return Payload(metadata={"encoding": COMPRESSED_ENCODING}, data=compressed)
+
+    def _decode_one(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != COMPRESSED_ENCODING:
+            return payload
+        decoded = Payload()
+        decoded.ParseFromString(zlib.decompress(payload.data))
+        return decoded
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def varint(self, value: int) -> None:
+        while True:
+            byte = value & 0x7F
+            value >>= 7
+            if value:
+                self.buffer.append(byte | 0x80)
+            else:
+                self.buffer.append(byte)
+                return
+
+    def int(self, value: int) -> None:
+        # Zigzag so small negative numbers stay small
+        self.varint(value * 2 if value >= 0 else -value * 2 - 1)
+
+    def float(self, value: float) -> None:
+        self.buffer += struct.pack("<d", value)
+
+    def bool(self, value: bool) -> None:
+        self.buffer.append(1 if value else 0)
+
+    def str(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self.varint(len(encoded))
+        self.buffer += encoded
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.offset]
+            self.offset += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def int(self) -> int:
+        value = self.varint()
+        return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+    def float(self) -> float:
+        (value,) = struct.unpack_from("<d", self.data, self.offset)
+        self.offset += 8
+        return value
+
+    def bool(self) -> bool:
+        value = self.data[self.offset]
+        self.offset += 1
+        return bool(value)
+
+    def str(self) -> str:
+        length = self.varint()
+        value = bytes(self.data[self.offset:self.offset + length]).decode("utf-8")
+        self.offset += length
+        return value
+
+
+_SCALARS = {str: "str", int: "int", float: "float", bool: "bool"}
+
+
+def _field_codec(field_type: Any) -> tuple[Callable, Callable]:
+    """
+    (write, read) functions for one supported field type
+    """
+    if field_type in _SCALARS:
+        name = _SCALARS[field_type]
+        return (
+            lambda writer, value: getattr(writer, name)(value),
+            lambda reader: getattr(reader, name)(),
+        )
+    if typing.get_origin(field_type) is list:
+        (item_type,) = typing.get_args(field_type)
+        write_item, read_item = _field_codec(item_type)
+
+        def write_list(writer: _Writer, value: list) -> None:
+            writer.varint(len(value))
+            for item in value:
+                write_item(writer, item)
+
+        return write_list, lambda reader: [read_item(reader) for _ in range(reader.varint())]
+    raise TypeError(f"Compact encoding does not support field type {field_type!r}")
+
+
+class CompactDataclassPayloadConverter(EncodingPayloadConverter):
+    """
+    Schema-based binary encoding for registered dataclasses.
+
+    Field names are not written: values follow the dataclass field order,
+    prefixed by the number of fields. Readers fill fields missing from an
+    older payload with their defaults, so appending fields (with defaults)
+    stays compatible. Unregistered values are left to the next converter.
+    """
+
+    def __init__(self, types: Sequence[type]):
+        self._by_type: dict[type, list[tuple[str, Callable, Callable]]] = {}
+        self._by_name: dict[str, type] = {}
+        for cls in types:
+            hints = typing.get_type_hints(cls)
+            self._by_type[cls] = [
+                (field.name, *_field_codec(hints[field.name]))
+                for field in dataclasses.fields(cls)
+            ]
+            self._by_name[cls.__name__] = cls
+
+    @property
+    def encoding(self) -> str:
+        return COMPACT_ENCODING.decode()
+
+    def to_payload(self, value: Any) -> Optional[Payload]:
+        fields = self._by_type.get(type(value))
+        if fields is None:
+            return None
+        writer = _Writer()
+        writer.varint(len(fields))
+        for name, write, _ in fields:
+            write(writer, getattr(value, name))
+        return Payload(
+            metadata={"encoding": COMPACT_ENCODING, "type": type(value).__name__.encode()},
+            data=bytes(writer.buffer),
+        )
+
+    def from_payload(self, payload: Payload, type_hint: Optional[type] = None) -> Any:
+        cls = self._by_name[payload.metadata["type"].decode()]
+        reader = _Reader(payload.data)
+        count = reader.varint()
+        fields = self._by_type[cls]
+        values = {name: read(reader) for name, _, read in fields[:count]}
+        return cls(**values)
+
+
+def compact_payload_converter_class(types: Sequence[type]) -> type:
+    """
+    Payload converter class (as DataConverter expects) that tries the compact
+    encoding first and falls back to the default converters
+    """
+
+    class CompactPayloadConverter(CompositePayloadConverter):
+        def __init__(self) -> None:
+            super().__init__(
+                CompactDataclassPayloadConverter(types),
+                *DefaultPayloadConverter.default_encoding_payload_converters,
+            )
+
+    return CompactPayloadConverter
+
+
+def add_data_converter_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("payloads")
+    group.add_argument(
+        "--compress-payloads",
+        action="store_true",
+        default=os.environ.get("LOAN_PAYLOAD_COMPRESSION") == "1",
+        help="zlib-compress payloads above --compression-threshold (env LOAN_PAYLOAD_COMPRESSION=1)",
+    )
+    group.add_argument(
+        "--compression-threshold",
+        type=int,
+        default=int(os.environ.get("LOAN_PAYLOAD_COMPRESSION_THRESHOLD", "1024")),
+        help="Smallest payload, in bytes, worth compressing "
+             "(env LOAN_PAYLOAD_COMPRESSION_THRESHOLD, default 1024)",
+    )
+    group.add_argument(
+        "--compact-payloads",
+        action="store_true",
+        default=os.environ.get("LOAN_PAYLOAD_COMPACT") == "1",
+        help="Encode loan dataclasses in a compact binary form (env LOAN_PAYLOAD_COMPACT=1)",
+    )
+
+
+def loan_data_converter(args: argparse.Namespace, dataclass_types: Sequence[type]) -> DataConverter:
+    """
+    Data converter for Client.connect; the default converter when neither
+    option is enabled. Clients and workers must enable the same options.
+    """
+    return DataConverter(
+        payload_converter_class=(
+            compact_payload_converter_class(dataclass_types)
+            if args.compact_payloads
+            else DefaultPayloadConverter
+        ),
+        payload_codec=CompressionCodec(args.compression_threshold) if args.compress_payloads else None,
+    )
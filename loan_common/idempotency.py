@@ -0,0 +1,169 @@
+"""
+Idempotent Submission
+Starts one workflow per distinct application; duplicates attach to the
+running workflow or reuse its recent result instead of starting another
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional, Sequence
+
+from temporalio.client import (
+    Client,
+    WithStartWorkflowOperation,
+    WorkflowExecutionStatus,
+    WorkflowHandle,
+    WorkflowUpdateHandle,
+    WorkflowUpdateStage,
+)
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+from loan_common.task_routing import execution_memo
+
+# How a submission was served
+STARTED = "started"
+ATTACHED = "attached"
+REUSED = "reused"
+
+# Completed results younger than this are returned for a duplicate instead
+# of running the application again
+DEFAULT_REUSE_WINDOW = timedelta(seconds=float(os.environ.get("LOAN_RESULT_REUSE_SECONDS", "900")))
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 2)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def idempotency_key(workflow: str, args: Sequence[Any]) -> str:
+    """
+    Digest of the workflow type and its arguments. Case, surrounding
+    whitespace and int/float spelling are ignored, so a resubmitted
+    application gets the same key.
+    """
+    canonical = json.dumps(
+        [workflow, _normalize(list(args))], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class Submission:
+    """
+    Args:
+        handle: The workflow serving the application
+        outcome: STARTED, ATTACHED (to a running duplicate) or REUSED
+            (a duplicate's completed result)
+        decision: Handle of the decision update, when one was requested
+            and the workflow is running
+        result: The reused result (REUSED only)
+    """
+    handle: WorkflowHandle
+    outcome: str
+    decision: Optional[WorkflowUpdateHandle] = None
+    result: Any = None
+
+
+async def submit_idempotent(
+    client: Client,
+    workflow: str,
+    task_queue: str,
+    workflow_id: str,
+    args: Sequence[Any],
+    decision_update: Optional[str] = None,
+    reuse_window: timedelta = DEFAULT_REUSE_WINDOW,
+    reusable: Optional[Callable[[Any], bool]] = None,
+) -> Submission:
+    """
+    Start workflow_id unless a workflow with that id already serves the
+    application. workflow_id should be derived from idempotency_key() so
+    duplicates share it.
+
+    A new application costs one start call. A duplicate is looked up
+    once: it attaches to the workflow if it is running, gets the result
+    if it completed within reuse_window and reusable(result) holds (any
+    result when reusable is None), and otherwise (failed, too old, or an
+    outcome worth retrying such as a failed payment) starts a new run.
+
+    decision_update, if given, is sent along with the start (or to the
+    running workflow) and returned as an update handle once accepted.
+    """
+    try:
+        return await _start(
+            client, workflow, task_queue, workflow_id, args, decision_update,
+            WorkflowIDReusePolicy.REJECT_DUPLICATE, WorkflowIDConflictPolicy.FAIL,
+        )
+    except WorkflowAlreadyStartedError:
+        pass
+
+    handle = client.get_workflow_handle(workflow_id)
+    description = await handle.describe()
+    if description.status == WorkflowExecutionStatus.RUNNING:
+        decision = None
+        if decision_update:
+            decision = await handle.start_update(
+                decision_update, wait_for_stage=WorkflowUpdateStage.ACCEPTED
+            )
+        return Submission(handle, ATTACHED, decision)
+    if (
+        description.status == WorkflowExecutionStatus.COMPLETED
+        and description.close_time is not None
+        and datetime.now(timezone.utc) - description.close_time <= reuse_window
+    ):
+        result = await handle.result()
+        if reusable is None or reusable(result):
+            return Submission(handle, REUSED, result=result)
+    # A concurrent duplicate may have started it again meanwhile; USE_EXISTING
+    # attaches to that run instead of failing
+    return await _start(
+        client, workflow, task_queue, workflow_id, args, decision_update,
+        WorkflowIDReusePolicy.ALLOW_DUPLICATE, WorkflowIDConflictPolicy.USE_EXISTING,
+    )
+
+
+async def _start(
+    client: Client,
+    workflow: str,
+    task_queue: str,
+    workflow_id: str,
+    args: Sequence[Any],
+    decision_update: Optional[str],
+    id_reuse_policy: WorkflowIDReusePolicy,
+    id_conflict_policy: WorkflowIDConflictPolicy,
+) -> Submission:
+    if decision_update is None:
+        handle = await client.start_workflow(
+            workflow,
+            args=args,
+            id=workflow_id,
+            task_queue=task_queue,
+            id_reuse_policy=id_reuse_policy,
+            id_conflict_policy=id_conflict_policy,
+            memo=execution_memo(),
+        )
+        return Submission(handle, STARTED)
+    start_operation = WithStartWorkflowOperation(
+        workflow,
+        args=args,
+        id=workflow_id,
+        task_queue=task_queue,
+        id_reuse_policy=id_reuse_policy,
+        id_conflict_policy=id_conflict_policy,
+        memo=execution_memo(),
+    )
+    decision = await client.start_update_with_start_workflow(
+        decision_update,
+        start_workflow_operation=start_operation,
+        wait_for_stage=WorkflowUpdateStage.ACCEPTED,
+    )
+    return Submission(await start_operation.workflow_handle(), STARTED, decision)
@@ -0,0 +1,8 @@
+"""
+Per-activity and per-workflow latency, retry and failure metrics, exported
+on a Prometheus endpoint together with the SDK's own telemetry
+"""
+from loan_common.metrics.interceptor import MetricsInterceptor
+from loan_common.metrics.runtime import add_metrics_arguments, metrics_runtime
+
+__all__ = ["MetricsInterceptor", "add_metrics_arguments", "metrics_runtime"]
@@ -0,0 +1,160 @@
+"""
+Metrics Interceptor
+Records latency, attempt and failure metrics for every activity and workflow
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from temporalio import activity, workflow
+from temporalio.common import MetricMeter
+from temporalio.exceptions import ActivityError, ApplicationError, ChildWorkflowError
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    ExecuteWorkflowInput,
+    Interceptor,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+)
+
+
+def failure_type(error: BaseException) -> str:
+    """
+    Short label for a failure: the ApplicationError type if set, otherwise
+    the exception class (unwrapping activity/child workflow errors)
+    """
+    if isinstance(error, (ActivityError, ChildWorkflowError)) and error.cause is not None:
+        error = error.cause
+    if isinstance(error, ApplicationError) and error.type:
+        return error.type
+    return type(error).__name__
+
+
+class MetricsInterceptor(Interceptor):
+    """
+    Worker interceptor recording, per activity and workflow type:
+
+    - loan_<kind>_schedule_to_start_latency
+    - loan_<kind>_execution_latency
+    - loan_<kind>_end_to_end_latency (from first schedule, across retries)
+    - loan_<kind>_attempts / loan_<kind>_retries
+    - loan_<kind>_failures, labelled with failure_type
+
+    Both go to the given meter (normally the Runtime's); workflow metrics
+    are not recorded while a workflow replays.
+    """
+
+    def __init__(self, meter: MetricMeter):
+        self._activity_metrics = _Instruments(meter, "activity")
+        # Instruments are created once here, not per run: the class is
+        # instantiated for every workflow run the worker executes
+        self._workflow_interceptor_class = type(
+            "_WorkflowMetricsInterceptor",
+            (_WorkflowMetricsInterceptor,),
+            {"instruments": _Instruments(meter, "workflow")},
+        )
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _ActivityMetricsInterceptor(next, self._activity_metrics)
+
+    def workflow_interceptor_class(
+        self, input: WorkflowInterceptorClassInput
+    ) -> Optional[type[WorkflowInboundInterceptor]]:
+        return self._workflow_interceptor_class
+
+
+class _Instruments:
+    def __init__(self, meter: MetricMeter, kind: str):
+        prefix = f"loan_{kind}"
+        self.schedule_to_start = meter.create_histogram_timedelta(
+            f"{prefix}_schedule_to_start_latency",
+            f"Time from {kind} (attempt) scheduled to started",
+            "ms",
+        )
+        self.execution = meter.create_histogram_timedelta(
+            f"{prefix}_execution_latency",
+            f"Time spent executing one {kind} attempt",
+            "ms",
+        )
+        self.end_to_end = meter.create_histogram_timedelta(
+            f"{prefix}_end_to_end_latency",
+            f"Time from first schedule to {kind} completion, across retries",
+            "ms",
+        )
+        self.attempts = meter.create_counter(f"{prefix}_attempts", f"{kind} attempts started")
+        self.retries = meter.create_counter(f"{prefix}_retries", f"{kind} attempts after the first")
+        self.failures = meter.create_counter(f"{prefix}_failures", f"Failed {kind} attempts")
+
+    def started(self, attributes: dict[str, Any], attempt: int, schedule_to_start: timedelta) -> None:
+        self.attempts.add(1, attributes)
+        if attempt > 1:
+            self.retries.add(1, attributes)
+        self.schedule_to_start.record(max(schedule_to_start, timedelta(0)), attributes)
+
+    def finished(
+        self,
+        attributes: dict[str, Any],
+        execution: timedelta,
+        end_to_end: timedelta,
+        error: Optional[BaseException],
+    ) -> None:
+        self.execution.record(max(execution, timedelta(0)), attributes)
+        if error is None:
+            self.end_to_end.record(max(end_to_end, timedelta(0)), attributes)
+        else:
+            self.failures.add(1, {**attributes, "failure_type": failure_type(error)})
+
+
+class _ActivityMetricsInterceptor(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, instruments: _Instruments):
+        super().__init__(next)
+        self._instruments = instruments
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        attributes = {"activity_type": info.activity_type, "task_queue": info.task_queue}
+        started = datetime.now(timezone.utc)
+        scheduled = info.current_attempt_scheduled_time
+        self._instruments.started(attributes, info.attempt, info.started_time - scheduled)
+        error: Optional[BaseException] = None
+        try:
+            return await super().execute_activity(input)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            finished = datetime.now(timezone.utc)
+            self._instruments.finished(
+                attributes, finished - started, finished - info.scheduled_time, error
+            )
+
+
+class _WorkflowMetricsInterceptor(WorkflowInboundInterceptor):
+    instruments: _Instruments
+
+    async def execute_workflow(self, input: ExecuteWorkflowInput) -> Any:
+        info = workflow.info()
+        instruments = self.instruments
+        attributes = {"workflow_type": info.workflow_type, "task_queue": info.task_queue}
+        # workflow_start_time is when the run was started, start_time when
+        # its first workflow task was; workflow.now() is the (deterministic)
+        # time of the current task
+        started = info.start_time
+        if not workflow.unsafe.is_replaying():
+            instruments.started(attributes, info.attempt, started - info.workflow_start_time)
+
+        def finished(error: Optional[BaseException]) -> None:
+            if workflow.unsafe.is_replaying():
+                return
+            now = workflow.now()
+            instruments.finished(attributes, now - started, now - info.workflow_start_time, error)
+
+        try:
+            result = await super().execute_workflow(input)
+        # Exception, not BaseException: cache evictions unwind the workflow
+        # with a BaseException and are neither failures nor completions
+        except Exception as e:
+            finished(e)
+            raise
+        finished(None)
+        return result
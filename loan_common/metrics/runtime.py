@@ -0,0 +1,42 @@
+"""
+Metrics Runtime
+SDK Runtime that serves its telemetry, plus the interceptor's metrics, on a
+local Prometheus endpoint
+"""
+import argparse
+import os
+from typing import Optional
+
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("metrics")
+    group.add_argument(
+        "--metrics-bind",
+        default=os.environ.get("WORKER_METRICS_BIND"),
+        help="host:port for the Prometheus /metrics endpoint, e.g. 127.0.0.1:9464; "
+             "enables the metrics interceptor (env WORKER_METRICS_BIND, default off)",
+    )
+
+
+def metrics_runtime(bind_address: str, port_offset: int = 0) -> tuple[Runtime, str]:
+    """
+    Create a Runtime exporting SDK and interceptor metrics in Prometheus format
+
+    Args:
+        bind_address: host:port to serve metrics on
+        port_offset: Added to the port, so supervised worker processes on one
+            host each get their own endpoint
+
+    Returns:
+        The runtime (pass it to Client.connect) and the address it serves on
+    """
+    host, _, port = bind_address.rpartition(":")
+    address = f"{host}:{int(port) + port_offset}"
+    runtime = Runtime(
+        telemetry=TelemetryConfig(
+            metrics=PrometheusConfig(bind_address=address),
+        )
+    )
+    return runtime, address
@@ -0,0 +1,87 @@
+"""
+Micro Batcher
+Gathers concurrent requests in one worker into batched calls
+"""
+import asyncio
+from typing import Awaitable, Callable, Generic, Optional, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted by concurrent callers (e.g. activities from
+    different workflows) and hands them to process_batch together.
+
+    A batch is flushed when it reaches max_batch_size or when window_seconds
+    have passed since its first item, whichever comes first. process_batch
+    must return one result per item, in order; each caller gets back only
+    its own result. An item that failed on its own is returned as an
+    exception instance, which is raised to that item's caller alone, so
+    one bad item does not fail the others. If process_batch itself raises,
+    every caller in that batch receives the error.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[list[T]], Awaitable[list[Union[R, BaseException]]]],
+        max_batch_size: int = 256,
+        window_seconds: float = 0.02,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._process_batch = process_batch
+        self._max_batch_size = max_batch_size
+        self._window = window_seconds
+        self._items: list[T] = []
+        self._futures: list[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        future = asyncio.get_running_loop().create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._window, self._flush)
+        # Shield so a cancelled caller does not cancel the batch for the rest
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        task = asyncio.create_task(self._run(items, futures))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, items: list[T], futures: list[asyncio.Future]) -> None:
+        try:
+            results = await self._process_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch returned {len(results)} results for {len(items)} items"
+                )
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
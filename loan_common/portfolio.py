@@ -0,0 +1,212 @@
+"""
+Portfolio Workflow
+Runs a LoanApplicationWorkflow child for every applicant in a backlog file
+"""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from temporalio import activity, workflow
+from temporalio.exceptions import ChildWorkflowError, WorkflowAlreadyStartedError
+
+with workflow.unsafe.imports_passed_through():
+    from loan_common.bulk_submit import MalformedRecord, WorkflowStart, read_applicants_at
+    from loan_common.task_routing import WORKFLOW_TASK_QUEUE, execution_memo, pinned_execution
+
+# Applicant records loaded per activity call
+PAGE_SIZE = 200
+
+# Child errors kept in the summary; the rest are only counted
+MAX_ERROR_SAMPLES = 20
+
+# Count key for children that failed instead of returning a status
+CHILD_ERROR = "ERROR"
+
+# Count key for records that could not be turned into a child workflow
+INVALID_RECORD = "INVALID"
+
+
+@dataclass
+class PortfolioSummary:
+    """
+    Compact running totals: children finished per result status (APPROVED,
+    REJECTED, SUCCESS, FAILED, ...) plus a few sample errors
+    """
+    counts: dict[str, int] = field(default_factory=dict)
+    error_samples: list[str] = field(default_factory=list)
+
+    @property
+    def finished(self) -> int:
+        return sum(self.counts.values())
+
+
+@dataclass
+class PortfolioInput:
+    """
+    Args:
+        source: CSV or JSONL applicant file, readable by the workflow workers
+        child_workflow: Workflow type started per applicant
+        max_concurrent: Children running at once
+        children_per_run: Children per run before continuing as new
+        next_index: First applicant (record number) this run starts
+        next_position: Byte position of that applicant's record in source
+        summary: Totals carried over from previous runs
+    """
+    source: str
+    child_workflow: str = "LoanApplicationWorkflow"
+    max_concurrent: int = 100
+    children_per_run: int = 1000
+    next_index: int = 0
+    next_position: int = 0
+    summary: PortfolioSummary = field(default_factory=PortfolioSummary)
+
+
+@dataclass
+class PortfolioRecord:
+    """
+    One applicant of a page: its child workflow arguments, or why it has
+    none, and the byte position of the record after it
+    """
+    end: int
+    args: Optional[list[Any]] = None
+    error: str = ""
+
+
+class PortfolioPageLoader:
+    """
+    Activity reading a page of applicant records and mapping each to its
+    child workflow arguments with the app's build_start
+
+    Pages are read from a byte position rather than a record number, so
+    each page costs the same however far into the file it is.
+    """
+
+    def __init__(self, build_start: Callable[[dict[str, Any]], WorkflowStart]):
+        self._build_start = build_start
+
+    @activity.defn(name="load_portfolio_page")
+    async def load_page(self, source: str, position: int, limit: int) -> list[PortfolioRecord]:
+        def load() -> list[PortfolioRecord]:
+            page = []
+            for record, end in itertools.islice(read_applicants_at(source, position), limit):
+                try:
+                    if isinstance(record, MalformedRecord):
+                        raise record
+                    page.append(PortfolioRecord(end, args=self._build_start(record).args))
+                except Exception as e:
+                    page.append(PortfolioRecord(end, error=f"{type(e).__name__}: {e}"))
+            return page
+
+        return await asyncio.to_thread(load)
+
+
+@workflow.defn(name="PortfolioWorkflow")
+class PortfolioWorkflow:
+    """
+    Starts one child per applicant with at most max_concurrent running,
+    counting their result statuses. After children_per_run children (or
+    when the server suggests it) the run waits for its children and
+    continues as new, so history stays bounded for any backlog size.
+    """
+
+    def __init__(self) -> None:
+        self._input: Optional[PortfolioInput] = None
+        self._next_index = 0
+        self._next_position = 0
+        self._running = 0
+
+    @workflow.run
+    async def run(self, input: PortfolioInput) -> PortfolioSummary:
+        self._input = input
+        self._next_index = input.next_index
+        self._next_position = input.next_position
+        started = 0
+        page: list[PortfolioRecord] = []
+        exhausted = False
+        running: set[asyncio.Task] = set()
+
+        while True:
+            while (
+                not exhausted
+                and len(running) < input.max_concurrent
+                and started < input.children_per_run
+                and not workflow.info().is_continue_as_new_suggested()
+            ):
+                if not page:
+                    page = await workflow.execute_activity(
+                        "load_portfolio_page",
+                        args=[input.source, self._next_position, PAGE_SIZE],
+                        task_queue=WORKFLOW_TASK_QUEUE,
+                        start_to_close_timeout=timedelta(seconds=60),
+                        result_type=list[PortfolioRecord],
+                    )
+                    if not page:
+                        exhausted = True
+                        break
+                record = page.pop(0)
+                if record.args is None:
+                    self._count_invalid(self._next_index, record.error)
+                else:
+                    running.add(asyncio.create_task(self._run_child(self._next_index, record.args)))
+                    started += 1
+                self._next_index += 1
+                self._next_position = record.end
+            self._running = len(running)
+            if not running:
+                break
+            _, pending = await workflow.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            running = set(pending)
+
+        if exhausted:
+            workflow.logger.info("Portfolio complete: %s", input.summary.counts)
+            return input.summary
+        workflow.logger.info("Continuing as new at applicant %s", self._next_index)
+        workflow.continue_as_new(PortfolioInput(
+            source=input.source,
+            child_workflow=input.child_workflow,
+            max_concurrent=input.max_concurrent,
+            children_per_run=input.children_per_run,
+            next_index=self._next_index,
+            next_position=self._next_position,
+            summary=input.summary,
+        ))
+
+    def _count_invalid(self, index: int, error: str) -> None:
+        summary = self._input.summary
+        summary.counts[INVALID_RECORD] = summary.counts.get(INVALID_RECORD, 0) + 1
+        if len(summary.error_samples) < MAX_ERROR_SAMPLES:
+            summary.error_samples.append(f"record {index}: {error}")
+
+    async def _run_child(self, index: int, args: list[Any]) -> None:
+        summary = self._input.summary
+        child_id = f"{workflow.info().workflow_id}-{index}"
+        try:
+            result = await workflow.execute_child_workflow(
+                self._input.child_workflow,
+                args=args,
+                id=child_id,
+                task_queue=WORKFLOW_TASK_QUEUE,
+                result_type=dict,
+                # Children run in the portfolio's own execution mode
+                memo=execution_memo(pinned_execution()),
+            )
+            status = result.get("status", "UNKNOWN")
+        except (ChildWorkflowError, WorkflowAlreadyStartedError) as e:
+            status = CHILD_ERROR
+            if len(summary.error_samples) < MAX_ERROR_SAMPLES:
+                cause = e.cause if isinstance(e, ChildWorkflowError) and e.cause else e
+                summary.error_samples.append(f"{child_id}: {cause}")
+        summary.counts[status] = summary.counts.get(status, 0) + 1
+
+    @workflow.query(name="progress")
+    def progress(self) -> dict:
+        """
+        Totals so far, the next applicant to start and children running
+        """
+        return {
+            "counts": self._input.summary.counts if self._input else {},
+            "next_index": self._next_index,
+            "running": self._running,
+        }
@@ -0,0 +1,155 @@
+"""
+Process Pool
+Runs synchronous, CPU-bound activities in worker processes, handing large
+byte arguments over through shared memory instead of pickling them
+"""
+import concurrent.futures
+import contextlib
+import dataclasses
+import functools
+import inspect
+import multiprocessing
+import os
+import pickle
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterator
+
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    Interceptor,
+    SharedStateManager,
+)
+
+from loan_common.worker_logging import start_pool_process_logging
+
+# Byte arguments at least this large reach pool processes through shared memory
+SHARED_BUFFER_BYTES = int(os.environ.get("WORKER_SHARED_BUFFER_BYTES", str(256 * 1024)))
+
+
+def check_process_safe(fn: Callable) -> None:
+    """
+    Raise TypeError unless fn can run in a process pool. It must be a plain
+    function, since async activities always run on the worker's event loop
+    whatever the executor, and picklable, which means defined at module
+    level (not a lambda, closure or bound method).
+    """
+    name = getattr(fn, "__name__", repr(fn))
+    if inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(getattr(fn, "__call__", None)):
+        raise TypeError(f"Activity {name} is async; process pool activities must be plain functions")
+    try:
+        pickle.dumps(fn)
+    except Exception as e:
+        raise TypeError(f"Activity {name} cannot be pickled; define it at module level") from e
+
+
+def process_pool_kwargs(max_workers: int) -> dict[str, Any]:
+    """
+    Worker arguments running its sync activities in max_workers processes.
+
+    The processes are spawned rather than forked (forking a process that
+    already runs the SDK's core threads is unsafe), so each one imports the
+    activity modules afresh when it starts and sets up logging like the
+    worker.
+    """
+    context = multiprocessing.get_context("spawn")
+    return {
+        "activity_executor": concurrent.futures.ProcessPoolExecutor(
+            max_workers, mp_context=context, initializer=start_pool_process_logging
+        ),
+        # Carries heartbeats and cancellation between the worker and its pool
+        "shared_state_manager": SharedStateManager.create_from_multiprocessing(context.Manager()),
+    }
+
+
+@dataclass(frozen=True)
+class SharedBuffer:
+    """
+    Bytes placed in a shared memory block; pickles to just its name and size
+    """
+    name: str
+    size: int
+
+
+@contextlib.contextmanager
+def shared_buffer(data: bytes) -> Iterator[SharedBuffer]:
+    """
+    Copy data into a new shared memory block, removed again when the with
+    block exits
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        block.buf[:len(data)] = data
+        yield SharedBuffer(block.name, len(data))
+    finally:
+        block.close()
+        block.unlink()
+
+
+@contextlib.contextmanager
+def attached(buffer: SharedBuffer) -> Iterator[memoryview]:
+    """
+    Map a SharedBuffer into this process without copying it. The view is
+    only valid inside the with block and must not be kept after it.
+    """
+    block = shared_memory.SharedMemory(buffer.name)
+    view = block.buf[:buffer.size]
+    try:
+        yield view
+    finally:
+        view.release()
+        block.close()
+
+
+def call_with_shared_buffers(fn: Callable, *args: Any) -> Any:
+    """
+    Runs in the pool process: call fn with every SharedBuffer argument
+    replaced by a view of its shared memory
+    """
+    with contextlib.ExitStack() as stack:
+        return fn(*(
+            stack.enter_context(attached(arg)) if isinstance(arg, SharedBuffer) else arg
+            for arg in args
+        ))
+
+
+class SharedBufferInterceptor(Interceptor):
+    """
+    Hands bytes arguments of at least min_bytes to process pool activities
+    through shared memory: the worker copies each one into a shared block
+    once and the pool process maps it, instead of it being pickled through
+    a pipe. The activity receives a memoryview in its place, valid until it
+    returns.
+    """
+
+    def __init__(self, min_bytes: int = SHARED_BUFFER_BYTES):
+        self._min_bytes = min_bytes
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _SharedBufferInbound(next, self._min_bytes)
+
+
+class _SharedBufferInbound(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, min_bytes: int):
+        super().__init__(next)
+        self._min_bytes = min_bytes
+
+    def _is_large(self, arg: Any) -> bool:
+        return isinstance(arg, (bytes, bytearray)) and len(arg) >= self._min_bytes
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        if (
+            not isinstance(input.executor, concurrent.futures.ProcessPoolExecutor)
+            or inspect.iscoroutinefunction(input.fn)
+            or not any(self._is_large(arg) for arg in input.args)
+        ):
+            return await super().execute_activity(input)
+        with contextlib.ExitStack() as stack:
+            args = [
+                stack.enter_context(shared_buffer(arg)) if self._is_large(arg) else arg
+                for arg in input.args
+            ]
+            return await super().execute_activity(dataclasses.replace(
+                input, fn=functools.partial(call_with_shared_buffers, input.fn), args=args
+            ))
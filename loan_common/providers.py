@@ -0,0 +1,430 @@
+"""
+Provider Clients
+Pooled, rate-limited HTTP clients for downstream providers, with circuit breakers
+"""
+import asyncio
+import contextlib
+import json
+import os
+import time
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional
+from urllib.parse import urlencode, urlsplit
+
+from temporalio.exceptions import ApplicationError
+
+
+class ProviderError(Exception):
+    """
+    A provider answered with an error status or a malformed response
+    """
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status = status
+
+    @property
+    def is_provider_fault(self) -> bool:
+        """
+        Whether the provider (rather than the request) is at fault: no
+        status, 429 or 5xx. Only these count towards opening the circuit.
+        """
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class ProviderUnavailableError(Exception):
+    """
+    The provider's circuit is open, so the call failed without being made
+    """
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable, retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@dataclass
+class ProviderLimits:
+    """
+    Args:
+        max_connections: Pooled connections, which is also the most
+            requests in flight to the provider at once
+        rate_per_second: Requests started per second
+        burst: Requests that may start back to back after an idle period
+        failure_threshold: Consecutive failures that open the circuit
+        reset_seconds: How long an open circuit fails fast before one
+            trial request is let through
+        timeout_seconds: Timeout for connecting and for each read
+    """
+    max_connections: int = 10
+    rate_per_second: float = 20.0
+    burst: int = 10
+    failure_threshold: int = 5
+    reset_seconds: float = 30.0
+    timeout_seconds: float = 10.0
+
+    @classmethod
+    def from_env(cls, provider: str) -> "ProviderLimits":
+        """
+        Limits from PROVIDER_<NAME>_<LIMIT> env vars (e.g.
+        PROVIDER_BUREAU_RATE_PER_SECOND), falling back to PROVIDER_<LIMIT>
+        and then to the defaults
+        """
+        values = {}
+        for limit in fields(cls):
+            for key in (f"PROVIDER_{provider.upper()}_{limit.name.upper()}", f"PROVIDER_{limit.name.upper()}"):
+                if key in os.environ:
+                    values[limit.name] = limit.type(os.environ[key])
+                    break
+        return cls(**values)
+
+
+class RateLimiter:
+    """
+    Token bucket: acquire() waits until a request may start. Waiters are
+    served in arrival order.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("rate_per_second and burst must be positive")
+        self._rate = rate_per_second
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. While open every
+    call fails fast with ProviderUnavailableError. Once reset_seconds have
+    passed a single trial call is let through (half-open): its success
+    closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._provider = provider
+        self._threshold = failure_threshold
+        self._reset = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._trial or self._clock() - self._opened_at >= self._reset:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Raise ProviderUnavailableError unless the call may go ahead.
+        Returns whether the call is the half-open trial, which must then
+        always be passed to record() with the call's outcome.
+        """
+        if self._opened_at is None:
+            return False
+        remaining = self._opened_at + self._reset - self._clock()
+        if remaining > 0:
+            raise ProviderUnavailableError(self._provider, remaining)
+        if self._trial:
+            # Another call is already testing the provider
+            raise ProviderUnavailableError(self._provider, self._reset)
+        self._trial = True
+        return True
+
+    def record(self, succeeded: Optional[bool], trial: bool = False) -> None:
+        """
+        Record a call's outcome; None means it was abandoned (e.g. the
+        activity was cancelled) and says nothing about the provider, but
+        frees the trial slot if the call held it
+        """
+        if succeeded is None:
+            if trial:
+                self._trial = False
+        elif succeeded:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+        else:
+            self._failures += 1
+            if self._trial or self._failures >= self._threshold:
+                self._opened_at = self._clock()
+                self._trial = False
+
+
+class _Connection:
+    """
+    One HTTP/1.1 keep-alive connection
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._keep_alive = False
+        self._length: Optional[int] = None
+        self._chunked = False
+        # Set once a response has been read completely and the server did
+        # not ask to close, so the connection can serve the next request
+        self.reusable = False
+
+    @property
+    def is_open(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    async def request(self, host: str, target: str, timeout: float) -> int:
+        """
+        Send a GET and read the response head, returning the status. The
+        body is then read with body().
+        """
+        self.reusable = False
+        self.writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nAccept: */*\r\n\r\n".encode())
+        await self.writer.drain()
+        status_line = (await asyncio.wait_for(self.reader.readline(), timeout)).decode("latin-1").split(None, 2)
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise ConnectionError(f"Malformed status line from {host}: {status_line}")
+        headers = {}
+        while True:
+            line = (await asyncio.wait_for(self.reader.readline(), timeout)).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        self._keep_alive = headers.get("connection", "").lower() != "close"
+        transfer_encoding = headers.get("transfer-encoding", "").lower()
+        self._chunked = transfer_encoding == "chunked"
+        self._length = None
+        if transfer_encoding and not self._chunked:
+            raise ConnectionError(f"Unsupported Transfer-Encoding from {host}: {transfer_encoding}")
+        if not self._chunked:
+            if "content-length" in headers:
+                self._length = int(headers["content-length"])
+            else:
+                # The body runs until the server closes the connection
+                self._keep_alive = False
+        return int(status_line[1])
+
+    async def body(self, chunk_bytes: int, timeout: float) -> AsyncIterator[bytes]:
+        """
+        Yield the response body in pieces of at most chunk_bytes, decoding
+        chunked transfer encoding. The connection becomes reusable once the
+        whole body has been read.
+        """
+        if self._chunked:
+            while True:
+                size_line = await asyncio.wait_for(self.reader.readline(), timeout)
+                try:
+                    size = int(size_line.split(b";")[0].strip(), 16)
+                except ValueError:
+                    raise ConnectionError(f"Malformed chunk size: {size_line[:40]!r}")
+                if size == 0:
+                    # Skip any trailer headers up to the closing blank line
+                    while (await asyncio.wait_for(self.reader.readline(), timeout)).strip():
+                        pass
+                    break
+                async for piece in self._read(size, chunk_bytes, timeout):
+                    yield piece
+                if await asyncio.wait_for(self.reader.readexactly(2), timeout) != b"\r\n":
+                    raise ConnectionError("Chunk not followed by CRLF")
+        else:
+            async for piece in self._read(self._length, chunk_bytes, timeout):
+                yield piece
+        self.reusable = self._keep_alive
+
+    async def _read(self, length: Optional[int], chunk_bytes: int, timeout: float) -> AsyncIterator[bytes]:
+        """
+        Yield length bytes, or everything up to EOF when length is None
+        """
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = chunk_bytes if remaining is None else min(chunk_bytes, remaining)
+            piece = await asyncio.wait_for(self.reader.read(size), timeout)
+            if not piece:
+                if remaining is None:
+                    return
+                raise ConnectionError("Connection closed mid-body")
+            if remaining is not None:
+                remaining -= len(piece)
+            yield piece
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections to one host, opened on demand. At most
+    max_connections exist at once; further callers wait for one to free up.
+    """
+
+    def __init__(self, host: str, port: int, tls: bool, max_connections: int, timeout: float):
+        self.host = host
+        self._port = port
+        self._tls = tls
+        self._timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: list[_Connection] = []
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[_Connection]:
+        async with self._slots:
+            conn = None
+            while self._idle and conn is None:
+                candidate = self._idle.pop()
+                if candidate.is_open:
+                    conn = candidate
+                else:
+                    candidate.close()
+            if conn is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self._port, ssl=self._tls or None),
+                    self._timeout,
+                )
+                conn = _Connection(reader, writer)
+            try:
+                yield conn
+            finally:
+                if conn.reusable and conn.is_open:
+                    self._idle.append(conn)
+                else:
+                    conn.close()
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+class ProviderClient:
+    """
+    Client for one provider, meant to be created once per worker process
+    and shared by every activity calling that provider. Each request waits
+    for the rate limiter and a pooled connection, and is refused outright
+    while the provider's circuit is open.
+
+    Response bodies may be sized by Content-Length, sent with chunked
+    transfer encoding or run until the connection closes, and are expected
+    to be JSON for get_json().
+    """
+
+    def __init__(self, name: str, base_url: str, limits: Optional[ProviderLimits] = None):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"Unsupported provider URL for {name}: {base_url}")
+        self.name = name
+        self.limits = limits or ProviderLimits.from_env(name)
+        self.breaker = CircuitBreaker(name, self.limits.failure_threshold, self.limits.reset_seconds)
+        self._path = url.path.rstrip("/")
+        self._rate = RateLimiter(self.limits.rate_per_second, self.limits.burst)
+        self._pool = ConnectionPool(
+            url.hostname,
+            url.port or (443 if url.scheme == "https" else 80),
+            url.scheme == "https",
+            self.limits.max_connections,
+            self.limits.timeout_seconds,
+        )
+
+    async def get_json(self, path: str, **params: Any) -> Any:
+        async with self._response(path, params) as conn:
+            body = b"".join([
+                piece async for piece in conn.body(64 * 1024, self.limits.timeout_seconds)
+            ])
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise ProviderError(self.name, "Response is not JSON")
+
+    async def stream(self, path: str, chunk_bytes: int, **params: Any) -> AsyncIterator[bytes]:
+        """
+        Yield the response body in chunks of at most chunk_bytes. Stopping
+        early closes the connection instead of returning it to the pool.
+        """
+        async with self._response(path, params) as conn:
+            async for chunk in conn.body(chunk_bytes, self.limits.timeout_seconds):
+                yield chunk
+
+    @contextlib.asynccontextmanager
+    async def _response(self, path: str, params: dict) -> AsyncIterator[_Connection]:
+        """
+        Issue a request, yielding the connection positioned at the start of
+        a successful (2xx) response body
+        """
+        trial = self.breaker.before_call()
+        target = self._path + path + (f"?{urlencode(params)}" if params else "")
+        succeeded: Optional[bool] = None
+        # Everything after before_call() is inside the try, so a call
+        # cancelled while waiting (for the rate limiter or a connection)
+        # still gives back the trial slot
+        try:
+            await self._rate.acquire()
+            async with self._pool.connection() as conn:
+                status = await conn.request(self._pool.host, target, self.limits.timeout_seconds)
+                if status >= 300:
+                    raise ProviderError(self.name, f"HTTP {status} for {path}", status)
+                yield conn
+            succeeded = True
+        except ProviderError as e:
+            succeeded = not e.is_provider_fault
+            raise
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            # Includes refused connections and timeouts
+            succeeded = False
+            raise
+        finally:
+            self.breaker.record(succeeded, trial)
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def provider_clients(names: Iterable[str], base_url: Optional[str] = None) -> dict[str, ProviderClient]:
+    """
+    A client for every provider with a URL: PROVIDER_<NAME>_URL, or else
+    <base_url>/<name>. Providers without either are left out.
+    """
+    clients = {}
+    for name in names:
+        url = os.environ.get(f"PROVIDER_{name.upper()}_URL") or (base_url and f"{base_url.rstrip('/')}/{name}")
+        if url:
+            clients[name] = ProviderClient(name, url)
+    return clients
+
+
+@contextlib.contextmanager
+def provider_failures_as_application_errors() -> Iterator[None]:
+    """
+    Inside an activity, turn provider failures into the ApplicationErrors
+    Temporal should see: an open circuit is retried once it may close, and
+    a request the provider rejected (4xx other than 429) is not retried
+    """
+    try:
+        yield
+    except ProviderUnavailableError as e:
+        raise ApplicationError(
+            str(e), type="ProviderUnavailable", next_retry_delay=timedelta(seconds=e.retry_after)
+        ) from e
+    except ProviderError as e:
+        raise ApplicationError(str(e), type="ProviderError", non_retryable=not e.is_provider_fault) from e
@@ -0,0 +1,167 @@
+"""
+Workflow Sandbox
+Picks the workflow runner (sandboxed with extra passthrough modules, or
+unsandboxed) and reports what the sandbox re-imports for every workflow run
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from temporalio import workflow
+from temporalio.worker import UnsandboxedWorkflowRunner, WorkflowRunner
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner, SandboxRestrictions
+
+SANDBOXED = "on"
+UNSANDBOXED = "off"
+
+
+@dataclass
+class ModuleCost:
+    """
+    One module executed again inside the sandbox. seconds and bytes
+    exclude the modules it imported in turn.
+    """
+    name: str
+    seconds: float
+    bytes: int
+
+
+@dataclass
+class SandboxReport:
+    """
+    Cost of creating one workflow's sandbox, which happens for every run
+    (and again whenever the run is evicted from the sticky cache)
+    """
+    workflow: str
+    seconds: float
+    bytes: int
+    modules: list[ModuleCost] = field(default_factory=list)
+
+    def summary(self, top: int = 10) -> list[str]:
+        lines = [
+            f"{self.workflow}: {self.seconds * 1000:.1f}ms and {self.bytes / 1024:.0f}KiB per run, "
+            f"{len(self.modules)} modules re-imported"
+        ]
+        for module in sorted(self.modules, key=lambda m: m.seconds, reverse=True)[:top]:
+            lines.append(f"   {module.name}: {module.seconds * 1000:.2f}ms, {module.bytes / 1024:.0f}KiB")
+        return lines
+
+
+def passthrough_modules(args: argparse.Namespace) -> list[str]:
+    return [name.strip() for name in args.passthrough_modules.split(",") if name.strip()]
+
+
+def workflow_runner(args: argparse.Namespace) -> WorkflowRunner:
+    """
+    The runner selected by --workflow-sandbox and --passthrough-modules
+    """
+    if args.workflow_sandbox == UNSANDBOXED:
+        return UnsandboxedWorkflowRunner()
+    modules = passthrough_modules(args)
+    if not modules:
+        return SandboxedWorkflowRunner()
+    return SandboxedWorkflowRunner(
+        restrictions=SandboxRestrictions.default.with_passthrough_modules(*modules)
+    )
+
+
+def profile_sandbox(workflows: Sequence[type], runner: WorkflowRunner) -> list[SandboxReport]:
+    """
+    Create each workflow's sandbox the way a new run does and measure which
+    modules are executed again, with their time and retained memory.
+
+    Must be called from the event loop thread. Memory tracing slows imports,
+    so times are best compared with each other rather than taken as
+    absolute. Relies on the SDK sandbox importer's internals, so it is meant
+    for a startup report only.
+    """
+    if not isinstance(runner, SandboxedWorkflowRunner):
+        return []
+    from temporalio.worker.workflow_sandbox import _importer
+
+    host_modules = dict(sys.modules)
+    modules: list[ModuleCost] = []
+    # Running totals of the imports in progress, to subtract nested imports
+    stack: list[list[float]] = []
+    original_import = _importer.Importer._import
+
+    def measured_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        full_name = _importer._resolve_module_name(name, globals, level)
+        if full_name in sys.modules:
+            return original_import(self, name, globals, locals, fromlist, level)
+        stack.append([0.0, 0])
+        started = time.perf_counter()
+        allocated = tracemalloc.get_traced_memory()[0]
+        try:
+            return original_import(self, name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.perf_counter() - started
+            size = tracemalloc.get_traced_memory()[0] - allocated
+            nested_seconds, nested_bytes = stack.pop()
+            if stack:
+                stack[-1][0] += seconds
+                stack[-1][1] += size
+            module = sys.modules.get(full_name)
+            if module is not None and module is not host_modules.get(full_name):
+                modules.append(ModuleCost(full_name, seconds - nested_seconds, size - nested_bytes))
+
+    reports = []
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        for cls in workflows:
+            definition = workflow._Definition.from_class(cls)
+            # The first sandbox also pays for one-off work (e.g. bytecode
+            # loading); the second shows the cost every run pays
+            runner.prepare_workflow(definition)
+            modules.clear()
+            _importer.Importer._import = measured_import
+            try:
+                started = time.perf_counter()
+                allocated = tracemalloc.get_traced_memory()[0]
+                runner.prepare_workflow(definition)
+                reports.append(SandboxReport(
+                    definition.name,
+                    time.perf_counter() - started,
+                    tracemalloc.get_traced_memory()[0] - allocated,
+                    list(modules),
+                ))
+            finally:
+                _importer.Importer._import = original_import
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return reports
+
+
+def add_sandbox_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register workflow sandbox flags; each one defaults to its environment variable
+    """
+    group = parser.add_argument_group("workflow sandbox")
+    group.add_argument(
+        "--workflow-sandbox",
+        choices=[SANDBOXED, UNSANDBOXED],
+        default=os.environ.get("WORKER_WORKFLOW_SANDBOX", SANDBOXED),
+        help="Run workflows in the sandbox, or unsandboxed for trusted workflow code "
+             "(env WORKER_WORKFLOW_SANDBOX, default on)",
+    )
+    group.add_argument(
+        "--passthrough-modules",
+        default=os.environ.get("WORKER_PASSTHROUGH_MODULES", ""),
+        help="Comma-separated modules the sandbox shares with the worker instead of "
+             "re-importing per run; they must be deterministic and stateless "
+             "(env WORKER_PASSTHROUGH_MODULES)",
+    )
+    group.add_argument(
+        "--sandbox-report",
+        action="store_true",
+        default=os.environ.get("WORKER_SANDBOX_REPORT") == "1",
+        help="Print the modules re-imported per workflow run, with their cost, "
+             "at startup (env WORKER_SANDBOX_REPORT=1)",
+    )
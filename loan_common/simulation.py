@@ -0,0 +1,17 @@
+"""
+Simulation
+Stand-in latency for downstream providers that are not integrated yet
+"""
+import asyncio
+import os
+
+# Multiplier applied to every simulated delay; benchmarks set it well below 1
+# so runs finish quickly while keeping the relative cost of each stage
+LATENCY_SCALE = float(os.environ.get("LOAN_LATENCY_SCALE", "1.0"))
+
+
+async def simulate_latency(seconds: float) -> None:
+    """
+    Wait as long as the real provider call would take (scaled)
+    """
+    await asyncio.sleep(seconds * LATENCY_SCALE)
@@ -0,0 +1,181 @@
+"""
+Submit CLI
+The parts of run_workflow.py both apps share: connecting, bulk and
+portfolio submission, and the command-line flags
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from temporalio.client import Client
+
+from loan_common.bulk_submit import DECISION_UPDATE, WorkflowStart, read_applicants, submit_bulk
+from loan_common.data_converter import add_data_converter_arguments, loan_data_converter
+from loan_common.idempotency import DEFAULT_REUSE_WINDOW, idempotency_key
+from loan_common.portfolio import PortfolioInput
+from loan_common.task_routing import WORKFLOW_TASK_QUEUE, execution_memo
+
+WORKFLOW_TYPE = "LoanApplicationWorkflow"
+
+
+def workflow_id_for(application: list[Any]) -> str:
+    """
+    Workflow id derived from the application's content (its workflow
+    arguments, applicant name first), shared by every resubmission of it
+    """
+    applicant_name = "-".join(str(application[0]).lower().split())
+    key = idempotency_key(WORKFLOW_TYPE, application)
+    return f"loan-application-{applicant_name}-{key[:16]}"
+
+
+class SubmitCli:
+    """
+    One app's submission client
+
+    Args:
+        build_start: Maps a bulk applicant record to its workflow start
+        payload_dataclasses: Returns the app's PAYLOAD_DATACLASSES; only
+            called with --compact-payloads, so the app's activities are not
+            imported otherwise
+        reusable_result: Whether a completed application's result may be
+            reused for a resubmission instead of running it again
+    """
+
+    def __init__(
+        self,
+        build_start: Callable[[dict[str, Any]], WorkflowStart],
+        payload_dataclasses: Callable[[], Sequence[type]],
+        reusable_result: Callable[[Any], bool],
+    ):
+        self._build_start = build_start
+        self._payload_dataclasses = payload_dataclasses
+        self.reusable_result = reusable_result
+
+    async def connect(self, args: argparse.Namespace) -> Client:
+        """
+        Connect with the same payload options as the workers
+        """
+        # Only needed to decode compact results
+        dataclass_types = self._payload_dataclasses() if args.compact_payloads else []
+        return await Client.connect(
+            "localhost:7233",
+            data_converter=loan_data_converter(args, dataclass_types),
+        )
+
+    async def bulk_main(self, args: argparse.Namespace) -> None:
+        """
+        Submit every applicant in a CSV/JSONL file over one client connection
+        """
+        client = await self.connect(args)
+
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            report = await submit_bulk(
+                client,
+                WORKFLOW_TYPE,
+                WORKFLOW_TASK_QUEUE,
+                read_applicants(args.applicants),
+                self._build_start,
+                output,
+                max_in_flight=args.max_in_flight,
+                decision_update=DECISION_UPDATE,
+                wait_for_result=not args.decision_only,
+                reuse_window=timedelta(seconds=args.reuse_window),
+                reusable=self.reusable_result,
+            )
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        print("=" * 70, file=sys.stderr)
+        print("📊 BULK SUBMISSION REPORT", file=sys.stderr)
+        print("=" * 70, file=sys.stderr)
+        print(report.summary(), file=sys.stderr)
+        print("=" * 70, file=sys.stderr)
+
+    async def portfolio_main(self, args: argparse.Namespace) -> None:
+        """
+        Start one durable PortfolioWorkflow for the whole applicant file and
+        return without waiting for it
+        """
+        client = await self.connect(args)
+        workflow_id = f"loan-portfolio-{uuid.uuid4().hex[:12]}"
+        await client.start_workflow(
+            "PortfolioWorkflow",
+            PortfolioInput(
+                source=os.path.abspath(args.applicants),
+                max_concurrent=args.max_in_flight,
+                children_per_run=args.children_per_run,
+            ),
+            id=workflow_id,
+            task_queue=WORKFLOW_TASK_QUEUE,
+            memo=execution_memo(),
+        )
+        print(f"📦 Portfolio workflow started: {workflow_id}")
+        print(f"   Progress: temporal workflow query --workflow-id {workflow_id} --type progress")
+
+    def run(self, single: Callable[[argparse.Namespace], Awaitable[None]]) -> None:
+        """
+        Parse the command line and submit: the --applicants file in bulk or
+        as a portfolio, or else the app's single example application
+        """
+        args = parse_args()
+        if args.applicants and args.portfolio:
+            asyncio.run(self.portfolio_main(args))
+        elif args.applicants:
+            asyncio.run(self.bulk_main(args))
+        else:
+            asyncio.run(single(args))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Start loan application workflows")
+    parser.add_argument(
+        "--applicants",
+        help="CSV or JSONL file of applicants to submit in bulk",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=100,
+        help="Maximum number of bulk or portfolio workflows running at once (default: 100)",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="JSONL file receiving bulk results as they complete (default: stdout)",
+    )
+    parser.add_argument(
+        "--portfolio",
+        action="store_true",
+        help="Submit --applicants as one durable PortfolioWorkflow (the applicant file "
+             "must be readable by the workflow workers) and exit without waiting",
+    )
+    parser.add_argument(
+        "--children-per-run",
+        type=int,
+        default=1000,
+        help="Portfolio children per run before it continues as new (default: 1000)",
+    )
+    parser.add_argument(
+        "--decision-only",
+        action="store_true",
+        help="Return once each application is decided (the wait_for_decision update) "
+             "instead of waiting for its workflow to complete",
+    )
+    parser.add_argument(
+        "--reuse-window",
+        type=float,
+        default=DEFAULT_REUSE_WINDOW.total_seconds(),
+        help="Seconds a completed application's result is reused for a resubmission "
+             "instead of running it again (env LOAN_RESULT_REUSE_SECONDS, default 900)",
+    )
+    add_data_converter_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.portfolio and not args.applicants:
+        parser.error("--portfolio requires --applicants")
+    return args
@@ -0,0 +1,243 @@
+"""
+Worker Supervisor
+Runs N worker processes from one configuration, restarting crashed ones
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from temporalio import workflow
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    ExecuteWorkflowInput,
+    Interceptor,
+    Worker,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+)
+
+# Counted per worker process and reported when the supervisor exits
+TASK_COUNT_FIELDS = ("workflows", "activities")
+
+# Restart backoff for crashed children; a child that stays up for
+# BACKOFF_RESET_SECONDS is considered healthy again
+INITIAL_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+BACKOFF_RESET_SECONDS = 60.0
+
+
+class TaskCounters:
+    """
+    Per-process task counters in shared memory, so the supervisor can still
+    read the counts of a child that crashed
+    """
+
+    def __init__(self, processes: int, ctx: Any):
+        self._processes = processes
+        self._array = ctx.Array("q", processes * len(TASK_COUNT_FIELDS))
+
+    def for_process(self, index: int) -> "ProcessTaskCounter":
+        return ProcessTaskCounter(self, index)
+
+    def record(self, index: int, field: str) -> None:
+        slot = index * len(TASK_COUNT_FIELDS) + TASK_COUNT_FIELDS.index(field)
+        with self._array.get_lock():
+            self._array[slot] += 1
+
+    def snapshot(self, index: int) -> dict[str, int]:
+        base = index * len(TASK_COUNT_FIELDS)
+        with self._array.get_lock():
+            return {
+                field: self._array[base + offset]
+                for offset, field in enumerate(TASK_COUNT_FIELDS)
+            }
+
+
+@dataclass
+class ProcessTaskCounter:
+    counters: TaskCounters
+    index: int
+
+    def record(self, field: str) -> None:
+        self.counters.record(self.index, field)
+
+
+class TaskCountingInterceptor(Interceptor):
+    """
+    Worker interceptor that counts workflow runs and activity executions
+    for one worker process
+    """
+
+    def __init__(self, counter: ProcessTaskCounter):
+        self._counter = counter
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _ActivityCountingInterceptor(next, self._counter)
+
+    def workflow_interceptor_class(
+        self, input: WorkflowInterceptorClassInput
+    ) -> Optional[type[WorkflowInboundInterceptor]]:
+        counter = self._counter
+
+        class _WorkflowCountingInterceptor(WorkflowInboundInterceptor):
+            async def execute_workflow(self, input: ExecuteWorkflowInput) -> Any:
+                # Replays re-run the workflow function; only count new runs
+                if not workflow.unsafe.is_replaying():
+                    with workflow.unsafe.sandbox_unrestricted():
+                        counter.record("workflows")
+                return await super().execute_workflow(input)
+
+        return _WorkflowCountingInterceptor
+
+
+class _ActivityCountingInterceptor(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, counter: ProcessTaskCounter):
+        super().__init__(next)
+        self._counter = counter
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        self._counter.record("activities")
+        return await super().execute_activity(input)
+
+
+def add_supervisor_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("process supervisor")
+    group.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.environ.get("WORKER_PROCESSES", str(os.cpu_count() or 1))),
+        help="Worker processes to run (env WORKER_PROCESSES, default: CPU count). "
+             "1 runs the worker in this process without a supervisor",
+    )
+    group.add_argument(
+        "--drain-seconds",
+        type=float,
+        default=float(os.environ.get("WORKER_DRAIN_SECONDS", "30")),
+        help="On SIGTERM, how long running activities get to finish "
+             "(env WORKER_DRAIN_SECONDS, default 30)",
+    )
+
+
+def drain_on_sigterm(workers: list[Worker]) -> None:
+    """
+    Shut the workers down gracefully when this process receives SIGTERM.
+    Must be called from the event loop running the workers.
+    """
+    loop = asyncio.get_running_loop()
+    shutdowns: set[asyncio.Task] = set()
+
+    def drain() -> None:
+        for worker in workers:
+            task = loop.create_task(worker.shutdown())
+            shutdowns.add(task)
+            task.add_done_callback(shutdowns.discard)
+
+    loop.add_signal_handler(signal.SIGTERM, drain)
+
+
+def supervise(
+    processes: int,
+    target: Callable[[argparse.Namespace, ProcessTaskCounter], None],
+    args: argparse.Namespace,
+) -> None:
+    """
+    Start processes children running target(args, counter) and keep them up
+
+    Crashed children are restarted with exponential backoff. SIGTERM/SIGINT
+    are forwarded to the children as SIGTERM so they drain gracefully; once
+    every child has exited, per-process task counts are printed.
+
+    target must be a module-level function so it can be started with the
+    spawn method.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    counters = TaskCounters(processes, ctx)
+    children: list[Optional[multiprocessing.Process]] = [None] * processes
+    started_at = [0.0] * processes
+    backoff = [INITIAL_BACKOFF_SECONDS] * processes
+    restart_at = [0.0] * processes
+    restarts = [0] * processes
+    stopping = False
+
+    def start(index: int) -> None:
+        child = ctx.Process(
+            target=_run_child,
+            args=(target, args, counters.for_process(index)),
+            name=f"loan-worker-{index}",
+        )
+        child.start()
+        children[index] = child
+        started_at[index] = time.monotonic()
+        print(f"🧩 Worker process {index} started (pid {child.pid})")
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        print(f"\n🛑 Received {signal.Signals(signum).name}, draining worker processes...")
+        for child in children:
+            if child is not None and child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(processes):
+        start(index)
+
+    while True:
+        now = time.monotonic()
+        for index, child in enumerate(children):
+            if child is None:
+                if not stopping and now >= restart_at[index]:
+                    start(index)
+                continue
+            if child.is_alive():
+                continue
+            child.join()
+            if stopping:
+                continue
+            if now - started_at[index] >= BACKOFF_RESET_SECONDS:
+                backoff[index] = INITIAL_BACKOFF_SECONDS
+            print(
+                f"💥 Worker process {index} exited with code {child.exitcode}; "
+                f"restarting in {backoff[index]:.0f}s"
+            )
+            children[index] = None
+            restarts[index] += 1
+            restart_at[index] = now + backoff[index]
+            backoff[index] = min(backoff[index] * 2, MAX_BACKOFF_SECONDS)
+        if stopping and all(child is None or not child.is_alive() for child in children):
+            break
+        time.sleep(0.2)
+
+    print("\n" + "=" * 70)
+    print("📊 WORKER PROCESS TASK COUNTS")
+    print("=" * 70)
+    totals = dict.fromkeys(TASK_COUNT_FIELDS, 0)
+    for index in range(processes):
+        counts = counters.snapshot(index)
+        for field, count in counts.items():
+            totals[field] += count
+        columns = "  ".join(f"{field}={count}" for field, count in counts.items())
+        print(f"Process {index}: {columns}  restarts={restarts[index]}")
+    print("Total:     " + "  ".join(f"{field}={count}" for field, count in totals.items()))
+    print("=" * 70)
+
+
+def _run_child(
+    target: Callable[[argparse.Namespace, ProcessTaskCounter], None],
+    args: argparse.Namespace,
+    counter: ProcessTaskCounter,
+) -> None:
+    # Ctrl-C reaches the whole process group; let the supervisor decide
+    # when children stop by forwarding SIGTERM instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(args, counter)
@@ -0,0 +1,254 @@
+"""
+Task Routing
+Routes activities to task queues by latency class
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from temporalio import workflow
+from temporalio.client import Client
+from temporalio.worker import Worker
+
+from loan_common.process_pool import SharedBufferInterceptor, check_process_safe, process_pool_kwargs
+from loan_common.worker_tuning import TuningConfig
+
+# Workflows (and any activity without a route) stay on this queue
+WORKFLOW_TASK_QUEUE = "loan-application-queue"
+
+# How a step is executed: as a regular activity on its latency class's
+# queue, or as a local activity inside the workflow worker, which saves the
+# server round trip and schedule-to-start wait but is only worth it for
+# short, cheap steps
+REGULAR = "regular"
+LOCAL = "local"
+
+# LOAN_ACTIVITY_EXECUTION=regular runs every step as a regular activity,
+# e.g. for comparison. It is read by clients only, which pin it in the memo
+# of each workflow they start (EXECUTION_MEMO): workflow code never branches
+# on the worker's environment, so a run replays the same commands whatever
+# the worker's setting. Runs without the memo use the per-step defaults.
+ACTIVITY_EXECUTION = os.environ.get("LOAN_ACTIVITY_EXECUTION", "default")
+EXECUTION_MEMO = "activity_execution"
+
+
+def execution_memo(mode: Optional[str] = None) -> dict[str, str]:
+    """
+    Memo pinning a new workflow run to mode (default: this process's
+    LOAN_ACTIVITY_EXECUTION)
+    """
+    return {EXECUTION_MEMO: mode or ACTIVITY_EXECUTION}
+
+
+def pinned_execution() -> str:
+    """
+    Execution mode pinned in the current workflow run's memo
+    """
+    return workflow.memo_value(EXECUTION_MEMO, "default", type_hint=str)
+
+
+@dataclass(frozen=True)
+class LatencyClass:
+    """
+    A group of activities with similar latency, served by its own worker pool
+
+    Args:
+        name: Short name, also the task queue suffix
+        default_slots: Concurrent activities per worker for this class
+        description: Shown in worker startup output
+        execution: Default execution mode (REGULAR or LOCAL) of its steps
+        process_pool: Run its activities, which must be plain (sync)
+            functions, in a pool of one process per slot instead of on the
+            worker's event loop
+    """
+    name: str
+    default_slots: int
+    description: str
+    execution: str = REGULAR
+    process_pool: bool = False
+
+    @property
+    def task_queue(self) -> str:
+        return f"{WORKFLOW_TASK_QUEUE}-{self.name}"
+
+    @property
+    def env_var(self) -> str:
+        return f"WORKER_{self.name.upper().replace('-', '_')}_SLOTS"
+
+
+# Long-blocking provider calls: many slots, each mostly waiting on I/O
+SLOW_IO = LatencyClass("slow-io", 500, "long-blocking provider calls")
+# Cheap computations: few slots are enough, but they must never queue
+# behind slow calls. Run as local activities unless declared otherwise.
+FAST = LatencyClass("fast", 50, "fast in-process computations", execution=LOCAL)
+# CPU-heavy computations (document parsing, risk scoring) that would hold
+# the GIL and stall polling and heartbeats if run on the event loop. Each
+# slot is a process, so keep it near the cores left per worker process.
+CPU = LatencyClass("cpu", 2, "CPU-bound computations (one process each)", process_pool=True)
+
+LATENCY_CLASSES = [SLOW_IO, FAST, CPU]
+
+
+class ActivityRouter:
+    """
+    Routing table from activity function to latency class and execution mode.
+
+    Workflows schedule steps through execute(), which runs each one as a
+    local or regular activity on the right queue, as pinned for the run.
+    Workers call activities_for() to register each class's activities on
+    its own queue, and local_activities() for the workflow worker. Local
+    steps are registered both ways, since a run pinned to regular
+    execution schedules them on their class's queue.
+
+    Args:
+        routes: Latency class of each activity
+        execution: Per-step execution mode overriding the class default
+    """
+
+    def __init__(
+        self,
+        routes: dict[Callable, LatencyClass],
+        execution: Optional[dict[Callable, str]] = None,
+    ):
+        self._routes = routes
+        self._execution = execution or {}
+        # Fail at import time rather than when the pool's worker starts
+        for fn, latency_class in routes.items():
+            if latency_class.process_pool:
+                check_process_safe(fn)
+                if self._execution.get(fn) == LOCAL:
+                    raise ValueError(f"{fn.__name__} runs in a process pool and cannot be a local activity")
+
+    def queue_for(self, activity_fn: Callable) -> str:
+        latency_class = self._routes.get(activity_fn)
+        return latency_class.task_queue if latency_class else WORKFLOW_TASK_QUEUE
+
+    def prefers_local(self, activity_fn: Callable) -> bool:
+        latency_class = self._routes.get(activity_fn)
+        default = latency_class.execution if latency_class else REGULAR
+        return self._execution.get(activity_fn, default) == LOCAL
+
+    def is_local(self, activity_fn: Callable) -> bool:
+        """
+        Whether the current workflow run executes activity_fn locally
+        """
+        return pinned_execution() != REGULAR and self.prefers_local(activity_fn)
+
+    def activities_for(self, latency_class: LatencyClass) -> list[Callable]:
+        return [fn for fn, routed in self._routes.items() if routed == latency_class]
+
+    def local_activities(self) -> list[Callable]:
+        return [fn for fn in self._routes if self.prefers_local(fn)]
+
+    def execute(
+        self, activity_fn: Callable, *, args: Sequence[Any] = (), **options: Any
+    ) -> Awaitable[Any]:
+        """
+        Schedule activity_fn from a workflow as a local or regular activity.
+        options are passed to workflow.execute_(local_)activity.
+
+        Returns:
+            The awaitable activity result
+        """
+        if self.is_local(activity_fn):
+            return workflow.execute_local_activity(activity_fn, args=args, **options)
+        return workflow.execute_activity(
+            activity_fn, args=args, task_queue=self.queue_for(activity_fn), **options
+        )
+
+
+def add_routing_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register flags selecting which pools to run and their slot counts
+    """
+    group = parser.add_argument_group("task queue routing")
+    group.add_argument(
+        "--pools",
+        default=os.environ.get("WORKER_POOLS", ",".join(["workflow"] + [c.name for c in LATENCY_CLASSES])),
+        help="Comma-separated worker pools to run in this process: workflow, "
+             + ", ".join(c.name for c in LATENCY_CLASSES) + " (env WORKER_POOLS, default all)",
+    )
+    for latency_class in LATENCY_CLASSES:
+        group.add_argument(
+            f"--{latency_class.name}-slots",
+            dest=f"{latency_class.name.replace('-', '_')}_slots",
+            type=int,
+            default=int(os.environ.get(latency_class.env_var, str(latency_class.default_slots))),
+            help=f"Concurrent {latency_class.description} "
+                 f"(env {latency_class.env_var}, default {latency_class.default_slots})",
+        )
+
+
+def selected_pools(args: argparse.Namespace) -> tuple[bool, list[tuple[LatencyClass, int]]]:
+    """
+    Returns whether to run the workflow pool, and each activity pool to run
+    with its slot count
+    """
+    names = {name.strip() for name in args.pools.split(",") if name.strip()}
+    known = {"workflow"} | {c.name for c in LATENCY_CLASSES}
+    unknown = names - known
+    if unknown:
+        raise ValueError(f"Unknown worker pools {sorted(unknown)}; expected some of {sorted(known)}")
+    pools = [
+        (c, getattr(args, f"{c.name.replace('-', '_')}_slots"))
+        for c in LATENCY_CLASSES
+        if c.name in names
+    ]
+    return "workflow" in names, pools
+
+
+def build_workers(
+    client: Client,
+    args: argparse.Namespace,
+    workflows: list[type],
+    router: ActivityRouter,
+    workflow_worker_kwargs: dict[str, Any],
+    workflow_activities: Sequence[Callable] = (),
+    tuning: Optional[TuningConfig] = None,
+    **common_kwargs: Any,
+) -> list[tuple[str, Worker]]:
+    """
+    Create the worker pools selected by --pools
+
+    The workflow pool polls WORKFLOW_TASK_QUEUE with workflow_worker_kwargs
+    (e.g. tuning) and runs the router's local activities plus
+    workflow_activities (regular activities on WORKFLOW_TASK_QUEUE); each activity
+    pool polls its latency class's queue, limited to its own slot count and
+    with tuning's activity slot supplier and pollers when given. Pools of process_pool classes also get a
+    process pool executor and SharedBufferInterceptor. common_kwargs (e.g.
+    interceptors) are passed to every worker.
+
+    Returns:
+        (task queue, worker) pairs
+    """
+    run_workflows, pools = selected_pools(args)
+    workers = []
+    if run_workflows:
+        workers.append((WORKFLOW_TASK_QUEUE, Worker(
+            client,
+            task_queue=WORKFLOW_TASK_QUEUE,
+            workflows=workflows,
+            activities=[*router.local_activities(), *workflow_activities],
+            **workflow_worker_kwargs,
+            **common_kwargs,
+        )))
+    for latency_class, slots in pools:
+        activities = router.activities_for(latency_class)
+        if not activities:
+            continue
+        kwargs = dict(common_kwargs)
+        if tuning is not None:
+            kwargs.update(tuning.activity_pool_kwargs(slots))
+        else:
+            kwargs["max_concurrent_activities"] = slots
+        if latency_class.process_pool:
+            kwargs.update(process_pool_kwargs(slots))
+            kwargs["interceptors"] = [*kwargs.get("interceptors", []), SharedBufferInterceptor()]
+        workers.append((latency_class.task_queue, Worker(
+            client,
+            task_queue=latency_class.task_queue,
+            activities=activities,
+            **kwargs,
+        )))
+    return workers
@@ -0,0 +1,158 @@
+"""
+Worker CLI
+The parts of worker.py both apps share: connecting, building the worker
+pools, startup output, background housekeeping and the command-line flags
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+from temporalio.client import Client
+
+from loan_common.bulk_submit import WorkflowStart
+from loan_common.data_converter import add_data_converter_arguments, loan_data_converter
+from loan_common.metrics import MetricsInterceptor, add_metrics_arguments, metrics_runtime
+from loan_common.portfolio import PortfolioPageLoader, PortfolioWorkflow
+from loan_common.sandbox import UNSANDBOXED, add_sandbox_arguments, profile_sandbox, workflow_runner
+from loan_common.supervisor import (
+    ProcessTaskCounter,
+    TaskCountingInterceptor,
+    add_supervisor_arguments,
+    drain_on_sigterm,
+    supervise,
+)
+from loan_common.task_routing import ActivityRouter, add_routing_arguments, build_workers
+from loan_common.ttl_cache import TTLCache
+from loan_common.worker_logging import add_logging_arguments, start_logging
+from loan_common.worker_tuning import add_tuning_arguments, tuning_from_args
+
+
+class WorkerCli:
+    """
+    One app's worker
+
+    Args:
+        workflow: The app's LoanApplicationWorkflow; PortfolioWorkflow is
+            registered alongside it
+        router: The app's activity routing table
+        payload_dataclasses: The app's PAYLOAD_DATACLASSES
+        build_start: Maps a portfolio applicant record to its workflow start
+        credit_cache: Cache whose stats are printed when the worker stops
+        housekeeping: Coroutine functions run in the background while the
+            workers run, and cancelled when they stop
+        add_arguments: Registers the app's own flags
+        configure: Applies them, in every worker process, before connecting
+    """
+
+    def __init__(
+        self,
+        workflow: type,
+        router: ActivityRouter,
+        payload_dataclasses: Sequence[type],
+        build_start: Callable[[dict[str, Any]], WorkflowStart],
+        credit_cache: TTLCache,
+        housekeeping: Sequence[Callable[[], Awaitable[None]]] = (),
+        add_arguments: Optional[Callable[[argparse.ArgumentParser], None]] = None,
+        configure: Optional[Callable[[argparse.Namespace], None]] = None,
+    ):
+        self._workflows = [workflow, PortfolioWorkflow]
+        self._router = router
+        self._payload_dataclasses = payload_dataclasses
+        self._build_start = build_start
+        self._credit_cache = credit_cache
+        self._housekeeping = housekeeping
+        self._add_arguments = add_arguments
+        self._configure = configure
+
+    async def main(self, args: argparse.Namespace, counter: Optional[ProcessTaskCounter] = None) -> None:
+        """
+        Start the Temporal worker
+        """
+        if self._configure is not None:
+            self._configure(args)
+        runtime = None
+        interceptors = []
+        if args.metrics_bind:
+            runtime, metrics_address = metrics_runtime(
+                args.metrics_bind, counter.index if counter is not None else 0
+            )
+            interceptors.append(MetricsInterceptor(runtime.metric_meter))
+            print(f"📈 Metrics: http://{metrics_address}/metrics")
+        if counter is not None:
+            interceptors.append(TaskCountingInterceptor(counter))
+        # Connect to Temporal server (default: localhost:7233)
+        client = await Client.connect(
+            "localhost:7233",
+            runtime=runtime,
+            data_converter=loan_data_converter(args, self._payload_dataclasses),
+        )
+        tuning = tuning_from_args(args)
+        runner = workflow_runner(args)
+
+        # Create one worker pool for workflows plus one per activity latency
+        # class, each listening to its own task queue
+        workers = build_workers(
+            client,
+            args,
+            workflows=self._workflows,
+            router=self._router,
+            workflow_worker_kwargs={**tuning.worker_kwargs(), "workflow_runner": runner},
+            tuning=tuning,
+            workflow_activities=[PortfolioPageLoader(self._build_start).load_page],
+            graceful_shutdown_timeout=timedelta(seconds=args.drain_seconds),
+            interceptors=interceptors,
+        )
+        drain_on_sigterm([worker for _, worker in workers])
+
+        print("🚀 Starting Temporal Worker...")
+        for task_queue, _ in workers:
+            print(f"📋 Task Queue: {task_queue}")
+        for line in tuning.summary():
+            print(f"⚙️  {line}")
+        if args.workflow_sandbox == UNSANDBOXED:
+            print("⚠️  Workflow sandbox disabled")
+        elif args.sandbox_report:
+            for report in profile_sandbox(self._workflows, runner):
+                for line in report.summary():
+                    print(f"🧪 {line}")
+        print("⏳ Waiting for workflow executions...\n")
+        # From here on workflow and activity logs go through the queue to a
+        # background writer
+        logs = start_logging(args)
+        housekeeping = [asyncio.create_task(job()) for job in self._housekeeping]
+
+        # Run the workers
+        try:
+            await asyncio.gather(*(worker.run() for _, worker in workers))
+        finally:
+            for task in housekeeping:
+                task.cancel()
+            logs.stop()
+            print(f"📈 Credit bureau cache: {self._credit_cache.stats.as_dict()}")
+
+    def parse_args(self, argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+        parser = argparse.ArgumentParser(description="Run the loan application worker")
+        add_tuning_arguments(parser)
+        add_routing_arguments(parser)
+        add_supervisor_arguments(parser)
+        add_metrics_arguments(parser)
+        add_data_converter_arguments(parser)
+        add_sandbox_arguments(parser)
+        add_logging_arguments(parser)
+        if self._add_arguments is not None:
+            self._add_arguments(parser)
+        return parser.parse_args(argv)
+
+    def run(self, run_worker_process: Callable[[argparse.Namespace, ProcessTaskCounter], None]) -> None:
+        """
+        Parse the command line and run the worker, in this process or in
+        --processes supervised ones. run_worker_process must be a
+        module-level function of the app's worker.py calling main(), so the
+        supervisor can start it with the spawn method.
+        """
+        args = self.parse_args()
+        if args.processes > 1:
+            supervise(args.processes, run_worker_process, args)
+        else:
+            asyncio.run(self.main(args))
@@ -0,0 +1,263 @@
+"""
+Worker Logging
+Non-blocking, sampled, structured logging for worker processes
+
+Logging calls only put the record on a bounded queue; a background thread
+formats it (including the %-style message arguments) and writes it to
+stdout, so the event loop never waits for formatting or a slow terminal.
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Callable
+
+from temporalio import activity, workflow
+
+JSON = "json"
+TEXT = "text"
+
+# Context the Temporal loggers attach to records (as extra), and the field
+# names each value is written under
+_CONTEXT_FIELDS = {
+    "temporal_workflow": {
+        "workflow_id": "workflow_id",
+        "workflow_type": "workflow_type",
+        "run_id": "run_id",
+        "attempt": "attempt",
+    },
+    "temporal_activity": {
+        "workflow_id": "workflow_id",
+        "workflow_type": "workflow_type",
+        "workflow_run_id": "run_id",
+        "activity_type": "activity",
+        "attempt": "attempt",
+    },
+}
+# Fields code outside workflows and activities may pass itself as extra
+CONTEXT_FIELDS = ("workflow_id", "workflow_type", "run_id", "activity", "attempt")
+
+
+def record_context(record: logging.LogRecord) -> dict:
+    """
+    The workflow_id, activity name, attempt etc. of the workflow or
+    activity that logged the record
+    """
+    context = {}
+    for attribute, fields in _CONTEXT_FIELDS.items():
+        details = getattr(record, attribute, None)
+        if details:
+            context.update((field, details[key]) for key, field in fields.items() if key in details)
+    for field in CONTEXT_FIELDS:
+        if field in record.__dict__:
+            context[field] = record.__dict__[field]
+    return context
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message and the record's
+    workflow/activity context
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_context(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable lines with the workflow/activity context appended
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = record_context(record)
+        if not context:
+            return line
+        return f"{line} [{' '.join(f'{key}={value}' for key, value in context.items())}]"
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records of chosen loggers. rates maps a
+    logger name to the fraction of its (and its children's) records kept;
+    the longest matching name wins. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: dict[str, float], rng: Callable[[], float] = random.random):
+        super().__init__()
+        self._rates = rates
+        self._rng = rng
+        self._by_logger: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            rate = 1.0
+            matched = -1
+            for prefix, prefix_rate in self._rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > matched:
+                    rate, matched = prefix_rate, len(prefix)
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1 or self._rng() < rate
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """
+    "temporalio.activity=0.1,loan=0.5" -> {"temporalio.activity": 0.1, "loan": 0.5}
+    """
+    rates = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, rate = item.partition("=")
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records unformatted, leaving the work to the writer thread, and
+    drops them (counting each) rather than block when the queue is full
+    """
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+class WorkerLogging:
+    """
+    The running pipeline; stop() writes out what is still queued
+    """
+
+    def __init__(self, handler: _QueueHandler, listener: _QueueListener):
+        self._handler = handler
+        self._listener = listener
+
+    @property
+    def dropped(self) -> int:
+        """
+        Records dropped because the queue was full
+        """
+        return self._handler.dropped
+
+    def stop(self) -> None:
+        self._listener.stop()
+        if self.dropped:
+            print(f"📉 {self.dropped} log records dropped (queue full)")
+
+
+def start_logging(args: argparse.Namespace) -> WorkerLogging:
+    """
+    Route every logger in this process through the queue to a background
+    writer, with the format, level and sampling chosen by the logging flags.
+
+    The settings are also exported to the environment so that processes
+    this one spawns (the cpu activity pool) log the same way.
+    """
+    os.environ.update({
+        "WORKER_LOG_FORMAT": args.log_format,
+        "WORKER_LOG_LEVEL": args.log_level,
+        "WORKER_LOG_SAMPLE": args.log_sample,
+        "WORKER_LOG_QUEUE_SIZE": str(args.log_queue_size),
+    })
+    records: queue.Queue = queue.Queue(args.log_queue_size)
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter() if args.log_format == JSON else TextFormatter())
+    handler = _QueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sample_rates(args.log_sample)))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(args.log_level)
+    # The context goes into its own fields instead of being formatted into
+    # every message at the call site
+    activity.logger.activity_info_on_message = False
+    workflow.logger.workflow_info_on_message = False
+    listener = _QueueListener(records, writer)
+    listener.start()
+    return WorkerLogging(handler, listener)
+
+
+def start_pool_process_logging() -> None:
+    """
+    Process pool initializer: log like the worker that spawned the process
+    """
+    if "WORKER_LOG_FORMAT" not in os.environ:
+        return
+    parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
+    logs = start_logging(parser.parse_args([]))
+    # Pool processes leave through multiprocessing's exit path, not atexit
+    multiprocessing.util.Finalize(None, logs.stop, exitpriority=10)
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register worker logging flags; each one defaults to its environment variable
+    """
+    group = parser.add_argument_group("logging")
+    group.add_argument(
+        "--log-format",
+        choices=[JSON, TEXT],
+        default=os.environ.get("WORKER_LOG_FORMAT", JSON),
+        help="One JSON object per line, or plain text (env WORKER_LOG_FORMAT, default json)",
+    )
+    group.add_argument(
+        "--log-level",
+        default=os.environ.get("WORKER_LOG_LEVEL", "INFO"),
+        help="Lowest level written (env WORKER_LOG_LEVEL, default INFO)",
+    )
+    group.add_argument(
+        "--log-sample",
+        default=os.environ.get("WORKER_LOG_SAMPLE", ""),
+        help="Comma-separated logger=fraction pairs keeping only that fraction of a logger's "
+             "records below WARNING, e.g. temporalio.activity=0.1 (env WORKER_LOG_SAMPLE)",
+    )
+    group.add_argument(
+        "--log-queue-size",
+        type=int,
+        default=int(os.environ.get("WORKER_LOG_QUEUE_SIZE", "10000")),
+        help="Records buffered for the writer thread; more are dropped rather than "
+             "blocking the worker (env WORKER_LOG_QUEUE_SIZE, default 10000)",
+    )
@@ -0,0 +1,203 @@
+"""
+Worker Tuning
+Builds slot suppliers, poller counts and cache size for a Worker from CLI
+flags or environment variables
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from temporalio.worker import (
+    FixedSizeSlotSupplier,
+    ResourceBasedSlotConfig,
+    ResourceBasedSlotSupplier,
+    ResourceBasedTunerConfig,
+    WorkerTuner,
+)
+
+# Slot types that can be tuned, with the env var that configures each
+SLOT_TYPES = {
+    "workflow": "WORKER_WORKFLOW_SLOTS",
+    "activity": "WORKER_ACTIVITY_SLOTS",
+    "local_activity": "WORKER_LOCAL_ACTIVITY_SLOTS",
+}
+
+RESOURCE_BASED = "resource"
+
+# Same as the SDK's default fixed slot count, so an untuned worker behaves
+# exactly as before
+DEFAULT_FIXED_SLOTS = 100
+
+
+@dataclass
+class TuningConfig:
+    """
+    Effective tuning for one worker
+
+    slots maps each slot type to either RESOURCE_BASED or a fixed slot count.
+    """
+    slots: dict[str, Any]
+    target_cpu: float
+    target_memory: float
+    workflow_task_polls: Optional[int]
+    activity_task_polls: Optional[int]
+    max_cached_workflows: int
+
+    def _tuner_config(self) -> ResourceBasedTunerConfig:
+        return ResourceBasedTunerConfig(
+            target_memory_usage=self.target_memory,
+            target_cpu_usage=self.target_cpu,
+        )
+
+    def _supplier(self, slot_type: str, maximum: Optional[int] = None) -> Any:
+        if self.slots[slot_type] == RESOURCE_BASED:
+            config = ResourceBasedSlotConfig() if maximum is None else ResourceBasedSlotConfig(maximum_slots=maximum)
+            return ResourceBasedSlotSupplier(config, self._tuner_config())
+        return FixedSizeSlotSupplier(self.slots[slot_type] if maximum is None else maximum)
+
+    def worker_kwargs(self) -> dict[str, Any]:
+        """
+        Keyword arguments to pass to the workflow pool's Worker(...)
+        """
+        kwargs: dict[str, Any] = {
+            "tuner": WorkerTuner.create_composite(
+                workflow_supplier=self._supplier("workflow"),
+                activity_supplier=self._supplier("activity"),
+                local_activity_supplier=self._supplier("local_activity"),
+                nexus_supplier=FixedSizeSlotSupplier(DEFAULT_FIXED_SLOTS),
+            ),
+            "max_cached_workflows": self.max_cached_workflows,
+        }
+        if self.workflow_task_polls is not None:
+            kwargs["max_concurrent_workflow_task_polls"] = self.workflow_task_polls
+        if self.activity_task_polls is not None:
+            kwargs["max_concurrent_activity_task_polls"] = self.activity_task_polls
+        return kwargs
+
+    def activity_pool_kwargs(self, pool_slots: int) -> dict[str, Any]:
+        """
+        Keyword arguments to pass to an activity pool's Worker(...)
+
+        The pool's own slot count (--<class>-slots) always bounds it: with
+        resource-based activity slots it is the ceiling the supplier may
+        grow to, otherwise it is the fixed count, and a fixed
+        --activity-slots then only applies to the workflow pool's regular
+        activities.
+        """
+        kwargs: dict[str, Any] = {
+            "tuner": WorkerTuner.create_composite(
+                # Activity pools register no workflows, so these are never used
+                workflow_supplier=FixedSizeSlotSupplier(DEFAULT_FIXED_SLOTS),
+                activity_supplier=self._supplier("activity", maximum=pool_slots),
+                local_activity_supplier=FixedSizeSlotSupplier(DEFAULT_FIXED_SLOTS),
+                nexus_supplier=FixedSizeSlotSupplier(DEFAULT_FIXED_SLOTS),
+            ),
+        }
+        if self.activity_task_polls is not None:
+            kwargs["max_concurrent_activity_task_polls"] = self.activity_task_polls
+        return kwargs
+
+    def summary(self) -> list[str]:
+        """
+        Human-readable lines describing the effective concurrency
+        """
+        lines = []
+        for slot_type in SLOT_TYPES:
+            slots = self.slots[slot_type]
+            if slots == RESOURCE_BASED:
+                description = (
+                    f"resource-based (target CPU {self.target_cpu:.0%}, "
+                    f"memory {self.target_memory:.0%})"
+                )
+                if slot_type == "activity":
+                    description += ", each activity pool up to its --<class>-slots"
+            else:
+                description = f"fixed, {slots} slots"
+                if slot_type == "activity":
+                    description += " in the workflow pool; activity pools use --<class>-slots"
+            lines.append(f"{slot_type.replace('_', ' ').capitalize()} slots: {description}")
+        lines.append(f"Workflow task pollers: {self.workflow_task_polls or 'SDK default'}")
+        lines.append(f"Activity task pollers: {self.activity_task_polls or 'SDK default'}")
+        lines.append(f"Sticky workflow cache: {self.max_cached_workflows}")
+        return lines
+
+
+def _slot_setting(value: str) -> Any:
+    if value == RESOURCE_BASED:
+        return RESOURCE_BASED
+    try:
+        slots = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected '{RESOURCE_BASED}' or a slot count, got {value!r}"
+        )
+    if slots <= 0:
+        raise argparse.ArgumentTypeError(f"slot count must be positive, got {slots}")
+    return slots
+
+
+def _optional_int(env_var: str) -> Optional[int]:
+    value = os.environ.get(env_var)
+    return int(value) if value else None
+
+
+def add_tuning_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register tuning flags; each one defaults to its environment variable
+    """
+    group = parser.add_argument_group("worker tuning")
+    for slot_type, env_var in SLOT_TYPES.items():
+        group.add_argument(
+            f"--{slot_type.replace('_', '-')}-slots",
+            dest=f"{slot_type}_slots",
+            type=_slot_setting,
+            default=_slot_setting(os.environ.get(env_var, str(DEFAULT_FIXED_SLOTS))),
+            help=f"'{RESOURCE_BASED}' or a fixed slot count "
+                 f"(env {env_var}, default {DEFAULT_FIXED_SLOTS})",
+        )
+    group.add_argument(
+        "--target-cpu",
+        type=float,
+        default=float(os.environ.get("WORKER_TARGET_CPU", "0.8")),
+        help="Target CPU utilisation for resource-based slots, 0-1 (env WORKER_TARGET_CPU)",
+    )
+    group.add_argument(
+        "--target-memory",
+        type=float,
+        default=float(os.environ.get("WORKER_TARGET_MEMORY", "0.8")),
+        help="Target memory utilisation for resource-based slots, 0-1 (env WORKER_TARGET_MEMORY)",
+    )
+    group.add_argument(
+        "--workflow-task-polls",
+        type=int,
+        default=_optional_int("WORKER_WORKFLOW_TASK_POLLS"),
+        help="Concurrent workflow task pollers (env WORKER_WORKFLOW_TASK_POLLS)",
+    )
+    group.add_argument(
+        "--activity-task-polls",
+        type=int,
+        default=_optional_int("WORKER_ACTIVITY_TASK_POLLS"),
+        help="Concurrent activity task pollers (env WORKER_ACTIVITY_TASK_POLLS)",
+    )
+    group.add_argument(
+        "--max-cached-workflows",
+        type=int,
+        default=int(os.environ.get("WORKER_MAX_CACHED_WORKFLOWS", "1000")),
+        help="Sticky workflow cache size (env WORKER_MAX_CACHED_WORKFLOWS, default 1000)",
+    )
+
+
+def tuning_from_args(args: argparse.Namespace) -> TuningConfig:
+    for name in ("target_cpu", "target_memory"):
+        value = getattr(args, name)
+        if not 0 < value <= 1:
+            raise ValueError(f"--{name.replace('_', '-')} must be in (0, 1], got {value}")
+    return TuningConfig(
+        slots={slot_type: getattr(args, f"{slot_type}_slots") for slot_type in SLOT_TYPES},
+        target_cpu=args.target_cpu,
+        target_memory=args.target_memory,
+        workflow_task_polls=args.workflow_task_polls,
+        activity_task_polls=args.activity_task_polls,
+        max_cached_workflows=args.max_cached_workflows,
+    )
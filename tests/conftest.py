@@ -0,0 +1,9 @@
+"""
+Test Setup
+Makes loan_common importable from the repository root, as the apps do
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
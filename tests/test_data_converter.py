@@ -0,0 +1,229 @@
+"""
+Data Converter Tests
+Round trips through the compression codec and the compact encoding, and
+payloads and histories written by the default JSON converter
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+from google.protobuf.timestamp_pb2 import Timestamp
+from temporalio import workflow
+from temporalio.api.common.v1 import Payload, Payloads, WorkflowType
+from temporalio.api.enums.v1 import EventType
+from temporalio.api.history.v1 import (
+    HistoryEvent,
+    WorkflowExecutionCompletedEventAttributes,
+    WorkflowExecutionStartedEventAttributes,
+    WorkflowTaskCompletedEventAttributes,
+    WorkflowTaskScheduledEventAttributes,
+    WorkflowTaskStartedEventAttributes,
+)
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.client import WorkflowHistory
+from temporalio.converter import DataConverter
+from temporalio.worker import Replayer, UnsandboxedWorkflowRunner
+
+from loan_common.data_converter import (
+    COMPACT_ENCODING,
+    COMPRESSED_ENCODING,
+    CompactDataclassPayloadConverter,
+    CompressionCodec,
+    loan_data_converter,
+)
+
+
+@dataclass
+class CreditCheck:
+    applicant_name: str
+    credit_score: int
+    approved: bool
+    debt_ratio: float
+    flags: list[str]
+
+
+@dataclass
+class CreditCheckV2:
+    applicant_name: str
+    credit_score: int
+    approved: bool
+    debt_ratio: float
+    flags: list[str]
+    # Appended after CreditCheck payloads were written
+    bureau: str = "unknown"
+
+
+CHECK = CreditCheck("Zoë Ångström", -3, True, 0.375, ["thin-file", ""])
+
+
+def converter(compact: bool = False, compress: bool = False, threshold: int = 1024) -> DataConverter:
+    args = argparse.Namespace(
+        compact_payloads=compact, compress_payloads=compress, compression_threshold=threshold
+    )
+    return loan_data_converter(args, [CreditCheck])
+
+
+def round_trip(data_converter: DataConverter, value: Any, type_hint: Any = None) -> tuple[list[Payload], Any]:
+    async def run() -> tuple[list[Payload], Any]:
+        payloads = await data_converter.encode([value])
+        [decoded] = await data_converter.decode(payloads, [type_hint] if type_hint else None)
+        return payloads, decoded
+
+    return asyncio.run(run())
+
+
+def test_codec_leaves_payloads_below_threshold():
+    payload = Payload(metadata={"encoding": b"json/plain"}, data=b'"' + b"a" * 100 + b'"')
+    codec = CompressionCodec(threshold_bytes=1024)
+    [encoded] = asyncio.run(codec.encode([payload]))
+    assert encoded == payload
+    assert asyncio.run(codec.decode([encoded])) == [payload]
+
+
+def test_codec_compresses_payloads_above_threshold():
+    payload = Payload(metadata={"encoding": b"json/plain"}, data=b'"' + b"a" * 4096 + b'"')
+    codec = CompressionCodec(threshold_bytes=1024)
+    [encoded] = asyncio.run(codec.encode([payload]))
+    assert encoded.metadata["encoding"] == COMPRESSED_ENCODING
+    assert len(encoded.data) < len(payload.data)
+    assert asyncio.run(codec.decode([encoded])) == [payload]
+
+
+def test_codec_leaves_incompressible_payloads():
+    payload = Payload(metadata={"encoding": b"binary/plain"}, data=os.urandom(4096))
+    [encoded] = asyncio.run(CompressionCodec(threshold_bytes=1024).encode([payload]))
+    assert encoded == payload
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("threshold", [1, 1 << 20])
+def test_dataclass_round_trip(compact, threshold):
+    payloads, decoded = round_trip(converter(compact, compress=True, threshold=threshold), CHECK, CreditCheck)
+    assert decoded == CHECK
+    if threshold > 1:
+        expected = COMPACT_ENCODING if compact else b"json/plain"
+        assert payloads[0].metadata["encoding"] == expected
+
+
+def test_compact_decodes_without_type_hint():
+    # Activity results decoded without a declared type, e.g. handle.result()
+    payloads, decoded = round_trip(converter(compact=True), CHECK)
+    assert payloads[0].metadata["encoding"] == COMPACT_ENCODING
+    assert decoded == CHECK
+
+
+def test_unregistered_values_fall_back_to_json():
+    value = {"status": "APPROVED", "approved_amount": 350000.0}
+    payloads, decoded = round_trip(converter(compact=True, compress=True, threshold=1), value)
+    assert decoded == value
+
+
+@pytest.mark.parametrize("type_hint", [CreditCheck, None])
+def test_decodes_old_json_payloads(type_hint):
+    old_payloads = asyncio.run(DataConverter.default.encode([CHECK]))
+    [decoded] = asyncio.run(
+        converter(compact=True, compress=True, threshold=1).decode(old_payloads, [type_hint] if type_hint else None)
+    )
+    assert decoded == (CHECK if type_hint else dataclasses.asdict(CHECK))
+
+
+def test_appended_fields_take_their_defaults():
+    [payload] = asyncio.run(converter(compact=True).encode([CHECK]))
+    newer = CompactDataclassPayloadConverter([CreditCheckV2])
+    payload.metadata["type"] = CreditCheckV2.__name__.encode()
+    decoded = newer.from_payload(payload)
+    assert decoded == CreditCheckV2(**dataclasses.asdict(CHECK))
+    assert decoded.bureau == "unknown"
+
+
+@workflow.defn(name="EchoCreditCheck")
+class EchoCreditCheckWorkflow:
+    @workflow.run
+    async def run(self, check: CreditCheck) -> CreditCheck:
+        # A payload decoded into the wrong type fails the workflow task,
+        # and with it the replay
+        if not isinstance(check, CreditCheck):
+            raise TypeError(f"Expected CreditCheck, got {type(check).__name__}")
+        return check
+
+
+def history(written_by: DataConverter) -> WorkflowHistory:
+    """
+    A completed EchoCreditCheck run whose payloads written_by encoded
+    """
+    [check] = asyncio.run(written_by.encode([CHECK]))
+    started = Timestamp(seconds=1767225600)
+    task_queue = TaskQueue(name="replay")
+    events = [
+        HistoryEvent(
+            event_id=1,
+            event_time=started,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_EXECUTION_STARTED,
+            workflow_execution_started_event_attributes=WorkflowExecutionStartedEventAttributes(
+                workflow_type=WorkflowType(name="EchoCreditCheck"),
+                task_queue=task_queue,
+                input=Payloads(payloads=[check]),
+                original_execution_run_id="run-1",
+                first_execution_run_id="run-1",
+            ),
+        ),
+        HistoryEvent(
+            event_id=2,
+            event_time=started,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_TASK_SCHEDULED,
+            workflow_task_scheduled_event_attributes=WorkflowTaskScheduledEventAttributes(task_queue=task_queue),
+        ),
+        HistoryEvent(
+            event_id=3,
+            event_time=started,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_TASK_STARTED,
+            workflow_task_started_event_attributes=WorkflowTaskStartedEventAttributes(scheduled_event_id=2),
+        ),
+        HistoryEvent(
+            event_id=4,
+            event_time=started,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_TASK_COMPLETED,
+            workflow_task_completed_event_attributes=WorkflowTaskCompletedEventAttributes(
+                scheduled_event_id=2, started_event_id=3
+            ),
+        ),
+        HistoryEvent(
+            event_id=5,
+            event_time=started,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_EXECUTION_COMPLETED,
+            workflow_execution_completed_event_attributes=WorkflowExecutionCompletedEventAttributes(
+                result=Payloads(payloads=[check]), workflow_task_completed_event_id=4
+            ),
+        ),
+    ]
+    return WorkflowHistory("loan-replay", events)
+
+
+def replay(workflow_history: WorkflowHistory, data_converter: DataConverter) -> None:
+    replayer = Replayer(
+        workflows=[EchoCreditCheckWorkflow],
+        workflow_runner=UnsandboxedWorkflowRunner(),
+        data_converter=data_converter,
+    )
+    asyncio.run(replayer.replay_workflow(workflow_history))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("compress", [False, True])
+def test_old_histories_replay(compact, compress):
+    # Written before either option existed
+    replay(history(DataConverter.default), converter(compact, compress, threshold=1))
+
+
+def test_new_histories_replay():
+    replay(history(converter(compact=True, compress=True, threshold=1)), converter(compact=True, compress=True, threshold=1))
+
+
+def test_replay_detects_undecodable_payloads():
+    # Compact payloads cannot be read back by a worker without the option
+    with pytest.raises(RuntimeError, match="Failed decoding arguments"):
+        replay(history(converter(compact=True)), converter())
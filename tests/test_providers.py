@@ -0,0 +1,248 @@
+"""
+Provider Client Tests
+Response body decoding and connection reuse against a scripted local
+server, and the circuit breaker's state transitions
+"""
+import asyncio
+from typing import Optional
+
+import pytest
+
+from loan_common.providers import (
+    CircuitBreaker,
+    ProviderClient,
+    ProviderLimits,
+    ProviderUnavailableError,
+)
+
+
+class ScriptedServer:
+    """
+    Local HTTP server answering each request with the next scripted raw
+    response; None leaves the request unanswered
+    """
+
+    def __init__(self, responses: list[Optional[bytes]]):
+        self.responses = list(responses)
+        self.connections = 0
+        self.targets: list[str] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def __aenter__(self) -> "ScriptedServer":
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                self.targets.append(request_line.split()[1].decode())
+                while (await reader.readline()).strip():
+                    pass
+                response = self.responses.pop(0)
+                if response is None:
+                    await asyncio.Event().wait()
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+def chunked(*chunks: bytes, extensions: bytes = b"", trailers: bytes = b"") -> bytes:
+    body = b"".join(b"%x%s\r\n%s\r\n" % (len(chunk), extensions, chunk) for chunk in chunks)
+    return (
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+        + body + b"0\r\n" + trailers + b"\r\n"
+    )
+
+
+def sized(body: bytes, status: str = "200 OK") -> bytes:
+    return b"HTTP/1.1 %s\r\nContent-Length: %d\r\n\r\n%s" % (status.encode(), len(body), body)
+
+
+def client(url: str, **limits) -> ProviderClient:
+    return ProviderClient("bureau", url, ProviderLimits(**{"timeout_seconds": 2.0, **limits}))
+
+
+def test_chunked_body_with_extensions_and_trailers():
+    async def run():
+        response = chunked(
+            b'{"score": ', b"742}",
+            extensions=b';name="value"',
+            trailers=b"X-Checksum: abc\r\nX-Other: 1\r\n",
+        )
+        async with ScriptedServer([response, sized(b'{"score": 700}')]) as server:
+            provider = client(server.url)
+            assert await provider.get_json("/score", applicant="a b") == {"score": 742}
+            # The trailers were consumed, so the next response parses cleanly
+            # on the same connection
+            assert await provider.get_json("/score") == {"score": 700}
+            assert server.connections == 1
+            assert server.targets[0] == "/score?applicant=a+b"
+            provider.close()
+
+    asyncio.run(run())
+
+
+def test_chunked_stream_splits_large_chunks():
+    async def run():
+        async with ScriptedServer([chunked(b"a" * 10, b"b" * 3)]) as server:
+            provider = client(server.url)
+            pieces = [piece async for piece in provider.stream("/document", 4)]
+            assert b"".join(pieces) == b"a" * 10 + b"b" * 3
+            assert max(map(len, pieces)) <= 4
+            provider.close()
+
+    asyncio.run(run())
+
+
+def test_malformed_chunk_size_fails_and_drops_connection():
+    async def run():
+        malformed = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n{}\r\n0\r\n\r\n"
+        async with ScriptedServer([malformed, sized(b"{}")]) as server:
+            provider = client(server.url, failure_threshold=5)
+            with pytest.raises(ConnectionError, match="Malformed chunk size"):
+                await provider.get_json("/score")
+            assert await provider.get_json("/score") == {}
+            # The broken connection was not returned to the pool
+            assert server.connections == 2
+            assert provider.breaker.state == "closed"
+            provider.close()
+
+    asyncio.run(run())
+
+
+def test_connection_reused_after_sized_and_chunked_bodies():
+    async def run():
+        responses = [sized(b"[1]"), chunked(b"[2]"), sized(b"[3]")]
+        async with ScriptedServer(responses) as server:
+            provider = client(server.url)
+            assert [await provider.get_json("/n") for _ in range(3)] == [[1], [2], [3]]
+            assert server.connections == 1
+            provider.close()
+
+    asyncio.run(run())
+
+
+def test_connection_not_reused_when_server_closes():
+    async def run():
+        closing = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}"
+        async with ScriptedServer([closing, sized(b"{}")]) as server:
+            provider = client(server.url)
+            await provider.get_json("/a")
+            await provider.get_json("/b")
+            assert server.connections == 2
+            provider.close()
+
+    asyncio.run(run())
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def open_breaker(clock: FakeClock) -> CircuitBreaker:
+    breaker = CircuitBreaker("bureau", failure_threshold=2, reset_seconds=10, clock=clock)
+    for _ in range(2):
+        assert breaker.before_call() is False
+        breaker.record(False)
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker("bureau", failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    clock.now = 4
+    with pytest.raises(ProviderUnavailableError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == pytest.approx(6)
+
+
+def test_breaker_half_open_trial_success_closes():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+    # Only one trial at a time
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+    breaker.record(True, trial=True)
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_breaker_half_open_trial_failure_reopens():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10
+    assert breaker.before_call() is True
+    # A single failed trial reopens, below failure_threshold
+    breaker.record(False, trial=True)
+    assert breaker.state == "open"
+    clock.now = 15
+    with pytest.raises(ProviderUnavailableError):
+        breaker.before_call()
+    clock.now = 20
+    assert breaker.before_call() is True
+
+
+def test_breaker_abandoned_trial_frees_the_slot():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10
+    assert breaker.before_call() is True
+    breaker.record(None, trial=True)
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+
+
+def test_cancelled_trial_request_frees_the_slot():
+    async def run():
+        # The first request is never answered and gets cancelled
+        async with ScriptedServer([None, sized(b"{}")]) as server:
+            provider = client(server.url)
+            clock = FakeClock()
+            provider.breaker = open_breaker(clock)
+            clock.now = 10
+            trial = asyncio.create_task(provider.get_json("/score"))
+            while not server.targets:
+                await asyncio.sleep(0.01)
+            assert provider.breaker.state == "half-open"
+            with pytest.raises(ProviderUnavailableError):
+                await provider.get_json("/score")
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+            # Cancellation says nothing about the provider: still half-open,
+            # and the next call becomes the trial, which closes the circuit
+            assert provider.breaker.state == "half-open"
+            assert await provider.get_json("/score") == {}
+            assert provider.breaker.state == "closed"
+            provider.close()
+
+    asyncio.run(run())
@@ -0,0 +1,144 @@
+"""
+Underwriting Tests
+The compiled rate card against the if/elif rules it replaced and a linear
+scan of the rules, including each dimension's band boundaries
+"""
+import itertools
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cursor_made"))
+from underwriting import (
+    DECLINED,
+    DIMENSIONS,
+    RateCard,
+    UnderwritingRequest,
+    load_rate_card,
+    score_applications,
+)
+
+SHIPPED_CARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cursor_made", "rate_card.json")
+
+
+def legacy_decision(credit_score: int, property_value: float, requested_amount: float) -> tuple[str, float, float]:
+    """
+    underwriter_review's decision logic before the rate card
+    """
+    loan_to_value_ratio = requested_amount / property_value
+    if credit_score >= 750 and loan_to_value_ratio <= 0.80:
+        return "APPROVED", requested_amount, 3.5
+    elif credit_score >= 680 and loan_to_value_ratio <= 0.75:
+        return "APPROVED_WITH_CONDITIONS", requested_amount * 0.95, 4.2
+    else:
+        return "DECLINED", 0.0, 0.0
+
+
+def linear_lookup(rules: list[dict], values: tuple[float, ...]) -> str:
+    """
+    Id of the first rule whose bands all hold values, "" if none does
+    """
+    for rule in rules:
+        for (name, upper_inclusive), value in zip(DIMENSIONS, values):
+            low, high = rule.get(name) or (None, None)
+            low = -math.inf if low is None else low
+            high = math.inf if high is None else high
+            inside = low < value <= high if upper_inclusive else low <= value < high
+            if not inside:
+                break
+        else:
+            return rule["id"]
+    return ""
+
+
+@pytest.mark.parametrize(
+    "credit_score, property_value, requested_amount",
+    list(itertools.product(
+        [300, 679, 680, 681, 749, 750, 751, 850],
+        [400_000.0],
+        # LTV 0.5, just under, at and just over 0.75 and 0.80, and over 1
+        [200_000.0, 299_999.0, 300_000.0, 300_001.0, 319_999.0, 320_000.0, 320_001.0, 500_000.0],
+    )),
+)
+def test_shipped_card_matches_legacy_rules(credit_score, property_value, requested_amount):
+    card = load_rate_card(SHIPPED_CARD)
+    [outcome] = score_applications([UnderwritingRequest(credit_score, property_value, requested_amount)], card)
+    decision, loan_amount, interest_rate = legacy_decision(credit_score, property_value, requested_amount)
+    assert outcome.decision == decision
+    assert outcome.loan_amount == pytest.approx(loan_amount)
+    assert outcome.interest_rate == interest_rate
+
+
+BOUNDARY_CARD = [
+    {"id": "BAND", "credit_score": [700, 750], "loan_to_value": [0.5, 0.8], "amount": [100, 200],
+     "decision": "APPROVED", "amount_factor": 1.0, "interest_rate": 4.0},
+    {"id": "REST", "decision": DECLINED},
+]
+
+
+@pytest.mark.parametrize(
+    "credit_score, loan_to_value, amount, rule_id",
+    [
+        # Credit score bands are [low, high)
+        (699, 0.6, 150, "REST"),
+        (700, 0.6, 150, "BAND"),
+        (749, 0.6, 150, "BAND"),
+        (750, 0.6, 150, "REST"),
+        # Loan-to-value bands are (low, high]
+        (720, 0.5, 150, "REST"),
+        (720, 0.5000001, 150, "BAND"),
+        (720, 0.8, 150, "BAND"),
+        (720, 0.8000001, 150, "REST"),
+        # Amount bands are (low, high]
+        (720, 0.6, 100, "REST"),
+        (720, 0.6, 100.01, "BAND"),
+        (720, 0.6, 200, "BAND"),
+        (720, 0.6, 200.01, "REST"),
+    ],
+)
+def test_band_boundaries(credit_score, loan_to_value, amount, rule_id):
+    card = RateCard("test", BOUNDARY_CARD)
+    assert card.lookup(credit_score, loan_to_value, amount).rule_id == rule_id
+    assert linear_lookup(BOUNDARY_CARD, (credit_score, loan_to_value, amount)) == rule_id
+
+
+def test_unknown_product_has_no_rule():
+    card = RateCard("test", BOUNDARY_CARD)
+    assert card.lookup(720, 0.6, 150, product="jumbo") is None
+
+
+def _random_band(rng: random.Random, edges: list[float]) -> list:
+    low, high = sorted(rng.sample(edges, 2))
+    return [rng.choice([low, None]), rng.choice([high, None])]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_cards_match_linear_scan(seed):
+    rng = random.Random(seed)
+    edges = {
+        "credit_score": [600, 650, 680, 700, 720, 750, 800],
+        "loan_to_value": [0.5, 0.6, 0.75, 0.8, 0.9, 1.0],
+        "amount": [100_000, 250_000, 500_000, 1_000_000],
+    }
+    rules = [
+        {
+            "id": f"R{index}",
+            **{name: _random_band(rng, edges[name]) for name, _ in DIMENSIONS if rng.random() < 0.7},
+            "decision": "APPROVED",
+            "amount_factor": 1.0,
+            "interest_rate": 4.0,
+        }
+        for index in range(60)
+    ]
+    card = RateCard("random", rules)
+    # Every edge, and a point on either side of it, in every dimension
+    probes = {
+        name: sorted({edge + offset for edge in values for offset in (-0.001, 0, 0.001)})
+        for name, values in edges.items()
+    }
+    for values in itertools.product(*(probes[name] for name, _ in DIMENSIONS)):
+        rule = card.lookup(*values)
+        assert (rule.rule_id if rule else "") == linear_lookup(rules, values), values